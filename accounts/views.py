@@ -7,6 +7,8 @@ from django.conf import settings
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 from django.db.models import Q
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 from .forms import LoginForm, SignupForm, ForgotPasswordForm, VerifyOTPForm, ResetPasswordForm, UserManagementForm
 from .models import PasswordResetOTP
 from .decorators import admin_required
@@ -246,13 +248,29 @@ def dashboard(request):
         return redirect('accounts:supervisor_dashboard')
 
 
+def admin_dashboard_etag(request):
+    """ETag of the admin dashboard - today's report versions and the supervisor count"""
+    from attendance import report_cache
+    from datetime import date
+    
+    today = date.today()
+    supervisors = User.objects.filter(role='SUPERVISOR', is_active=True)
+    if request.user.role == 'ADMIN' and request.user.assigned_companies.exists():
+        supervisors = supervisors.filter(assigned_companies__in=request.user.assigned_companies.all()).distinct()
+    return report_cache.page_etag(
+        'admin_dashboard', request, {'today': today, 'supervisors': supervisors.count()}, today, today
+    )
+
+
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=admin_dashboard_etag)
 def admin_dashboard(request):
     """Admin dashboard with statistics - OPTIMIZED"""
     from companies.models import Company
     from employees.models import Employee
-    from attendance.models import Attendance
-    from django.db.models import Count, Q
+    from attendance.models import DailyAttendanceSummary
+    from attendance.rollups import summary_totals
     from datetime import date
     
     today = date.today()
@@ -265,12 +283,10 @@ def admin_dashboard(request):
         total_companies = admin_companies.count()
         total_employees = Employee.objects.filter(is_active=True, company__in=admin_companies).count()
         
-        # Today's attendance stats
-        today_attendance_qs = Attendance.objects.filter(date=today, employee__company__in=admin_companies)
-        today_attendance = today_attendance_qs.count()
-        present_today = today_attendance_qs.filter(Q(status='PRESENT') | Q(status='HALF_DAY')).count()
-        absent_today = today_attendance_qs.filter(status='ABSENT').count()
-        ot_today = today_attendance_qs.filter(has_ot=True).count()
+        # Today's attendance stats from the daily rollup
+        today_totals = summary_totals(
+            DailyAttendanceSummary.objects.filter(date=today, company__in=admin_companies)
+        )
         
         # Total supervisors for these companies
         total_supervisors = User.objects.filter(
@@ -294,12 +310,8 @@ def admin_dashboard(request):
         total_companies = Company.objects.count()
         total_employees = Employee.objects.filter(is_active=True).count()
         
-        # Today's attendance stats
-        today_attendance_qs = Attendance.objects.filter(date=today)
-        today_attendance = today_attendance_qs.count()
-        present_today = today_attendance_qs.filter(Q(status='PRESENT') | Q(status='HALF_DAY')).count()
-        absent_today = today_attendance_qs.filter(status='ABSENT').count()
-        ot_today = today_attendance_qs.filter(has_ot=True).count()
+        # Today's attendance stats from the daily rollup
+        today_totals = summary_totals(DailyAttendanceSummary.objects.filter(date=today))
         
         # Total supervisors
         total_supervisors = User.objects.filter(role='SUPERVISOR', is_active=True).count()
@@ -315,6 +327,11 @@ def admin_dashboard(request):
             'company__id', 'company__name'
         ).order_by('-created_at')[:5]
     
+    today_attendance = today_totals['total_count']
+    present_today = today_totals['present_count'] + today_totals['half_day_count']
+    absent_today = today_totals['absent_count']
+    ot_today = today_totals['ot_count']
+    
     context = {
         'total_companies': total_companies,
         'total_employees': total_employees,
@@ -330,7 +347,29 @@ def admin_dashboard(request):
     return render(request, 'accounts/admin_dashboard.html', context)
 
 
+def supervisor_dashboard_etag(request):
+    """ETag of the supervisor dashboard - today's report versions and the records the user marked"""
+    from attendance import report_cache
+    from attendance.models import Attendance
+    from django.db.models import Count, Max
+    from datetime import date
+    
+    today = date.today()
+    # Recent records can be from any month, so they are checked directly
+    marked = Attendance.objects.filter(marked_by=request.user).aggregate(
+        latest=Max('updated_at'), count=Count('id')
+    )
+    filters = {
+        'today': today,
+        'companies': list(request.user.assigned_companies.values_list('id', flat=True)),
+        **marked,
+    }
+    return report_cache.page_etag('supervisor_dashboard', request, filters, today, today)
+
+
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=supervisor_dashboard_etag)
 def supervisor_dashboard(request):
     """Supervisor dashboard"""
     from employees.models import Employee
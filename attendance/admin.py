@@ -1,9 +1,35 @@
+from django import forms
 from django.contrib import admin
-from .models import Attendance
+from .models import (
+    Attendance, DailyAttendanceSummary, MonthlyEmployeeSummary,
+    PayrollCompanySnapshot, PayrollEmployeeSnapshot, PayrollPeriod, ReportJob
+)
+
+
+class AttendanceAdminForm(forms.ModelForm):
+    class Meta:
+        model = Attendance
+        fields = '__all__'
+    
+    def clean_date(self):
+        """Records may neither be added to nor moved into or out of a closed payroll period"""
+        selected_date = self.cleaned_data.get('date')
+        dates = [selected_date]
+        if self.instance.pk:
+            dates.append(Attendance.objects.filter(pk=self.instance.pk).values_list('date', flat=True).first())
+        for day in dates:
+            # The admin saves in the same transaction, so the locked lookup holds off a concurrent close
+            period = day and PayrollPeriod.covering(day, lock=True)
+            if period:
+                raise forms.ValidationError(
+                    f'Payroll period {period} is closed. Attendance cannot be marked for {day}.'
+                )
+        return selected_date
 
 
 @admin.register(Attendance)
 class AttendanceAdmin(admin.ModelAdmin):
+    form = AttendanceAdminForm
     list_display = ['employee', 'date', 'status', 'ot_hours', 'marked_by', 'marked_at']
     list_filter = ['status', 'date', 'marked_by']
     search_fields = ['employee__first_name', 'employee__last_name', 'employee__employee_code']
@@ -14,3 +40,93 @@ class AttendanceAdmin(admin.ModelAdmin):
         if not change:  # If creating new object
             obj.marked_by = request.user
         super().save_model(request, obj, form, change)
+    
+    # Records in a closed payroll period are locked
+    def has_change_permission(self, request, obj=None):
+        if obj is not None and PayrollPeriod.covering(obj.date):
+            return False
+        return super().has_change_permission(request, obj)
+    
+    def has_delete_permission(self, request, obj=None):
+        if obj is not None and PayrollPeriod.covering(obj.date):
+            return False
+        return super().has_delete_permission(request, obj)
+
+
+@admin.register(DailyAttendanceSummary)
+class DailyAttendanceSummaryAdmin(admin.ModelAdmin):
+    """Read-only view of the rollup - it is maintained from Attendance writes"""
+    list_display = ['company', 'date', 'present_count', 'half_day_count', 'absent_count', 'ot_count', 'ot_hours', 'salary_amount', 'ot_amount']
+    list_filter = ['company']
+    date_hierarchy = 'date'
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(MonthlyEmployeeSummary)
+class MonthlyEmployeeSummaryAdmin(admin.ModelAdmin):
+    """Read-only view of the monthly rollup - rebuilt nightly and kept current from Attendance writes"""
+    list_display = ['employee', 'company', 'month', 'present_days', 'half_days', 'absent_days', 'ot_days', 'ot_hours', 'salary_amount', 'ot_amount']
+    list_filter = ['company', 'month']
+    search_fields = ['employee__first_name', 'employee__last_name', 'employee__employee_code']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+class PayrollCompanySnapshotInline(admin.TabularInline):
+    model = PayrollCompanySnapshot
+    fields = ['company_name', 'employee_count', 'present_count', 'half_day_count', 'absent_count', 'ot_hours', 'salary_amount', 'ot_amount']
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+    
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(PayrollPeriod)
+class PayrollPeriodAdmin(admin.ModelAdmin):
+    """Closed periods are created from the Payroll Periods page and never edited"""
+    list_display = ['from_date', 'to_date', 'closed_by', 'closed_at', 'remarks']
+    readonly_fields = ['from_date', 'to_date', 'closed_by', 'closed_at', 'remarks']
+    inlines = [PayrollCompanySnapshotInline]
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(PayrollEmployeeSnapshot)
+class PayrollEmployeeSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['employee_name', 'employee_code', 'company_name', 'period', 'present_days', 'half_days', 'absent_days', 'ot_hours', 'salary_amount', 'ot_amount']
+    list_filter = ['period', 'company']
+    search_fields = ['employee_name', 'employee_code']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ReportJob)
+class ReportJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'requested_by', 'status', 'progress', 'total_rows', 'created_at', 'finished_at']
+    list_filter = ['kind', 'status']
+    readonly_fields = ['requested_by', 'kind', 'params', 'dedupe_key', 'status', 'total_rows', 'rows_done', 'progress', 'file', 'error', 'created_at', 'started_at', 'heartbeat_at', 'finished_at']
+    
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,122 @@
+"""Overtime anomaly detection with SQL window functions
+
+Every attendance day's OT is compared, in one scan, with two baselines
+computed by window functions: the employee's own average over their previous
+ROLLING_DAYS marked days and the company's average for that date. Days whose
+OT is far above either baseline are flagged and summed up per employee, with
+the hours above the baseline priced at the employee's OT rate.
+"""
+from datetime import timedelta
+from decimal import Decimal
+from django.db.models import Avg, Case, Count, DecimalField, F, Value, When, Window
+from django.db.models.expressions import RowRange
+from django.db.models.functions import Coalesce, Greatest, NullIf
+from django.db.models.lookups import GreaterThanOrEqual
+
+# Days covered by the report
+ANOMALY_DAYS = 90
+
+# Marked days before a day that make up the employee's own baseline
+ROLLING_DAYS = 14
+
+# A day is flagged when its OT is at least OT_FACTOR times a baseline
+# and at least MIN_EXCESS_HOURS above it
+OT_FACTOR = 2
+MIN_EXCESS_HOURS = Decimal('2.00')
+
+ANOMALY_SORT_FIELDS = {
+    'cost': 'excess_cost',
+    'hours': 'excess_hours',
+    'days': 'anomaly_days',
+}
+
+HOURS = DecimalField(max_digits=12, decimal_places=4)
+
+
+def _day_ot():
+    zero = Value(Decimal('0.00'), output_field=HOURS)
+    return Case(When(has_ot=True, then=Coalesce('ot_hours', zero)), default=zero, output_field=HOURS)
+
+
+def _excess_over(baseline):
+    excess = F('day_ot') - baseline
+    return Case(
+        When(
+            GreaterThanOrEqual(F('day_ot'), baseline * OT_FACTOR)
+            & GreaterThanOrEqual(excess, Value(MIN_EXCESS_HOURS)),
+            then=excess
+        ),
+        default=Value(Decimal('0.00')),
+        output_field=HOURS
+    )
+
+
+def anomalous_days(attendance_records, from_date, to_date):
+    """Flagged attendance days between from_date and to_date with their baselines and excess hours
+
+    Attendance from the 2 x ROLLING_DAYS days before from_date only feeds the
+    own baseline, so the first days of the range are judged like the rest.
+    """
+    own = {
+        'partition_by': [F('employee_id')],
+        'order_by': F('date').asc(),
+        # The current day is in the frame and taken out again below
+        'frame': RowRange(start=-ROLLING_DAYS, end=0),
+    }
+    history_from = from_date - timedelta(days=ROLLING_DAYS * 2)
+    return attendance_records.filter(date__gte=history_from, date__lte=to_date).annotate(
+        day_ot=_day_ot(),
+        own_mean=Window(Avg(_day_ot()), **own),
+        own_count=Window(Count('id'), **own),
+        company_avg=Window(Avg(_day_ot()), partition_by=[F('employee__company_id'), F('date')]),
+    ).annotate(
+        own_avg=(F('own_mean') * F('own_count') - F('day_ot')) / NullIf(F('own_count') - 1, 0),
+    ).annotate(
+        excess_hours=Case(
+            # History days only feed the baselines
+            When(date__lt=from_date, then=Value(Decimal('0.00'))),
+            default=Greatest(_excess_over(F('own_avg')), _excess_over(F('company_avg'))),
+            output_field=HOURS
+        ),
+    ).filter(excess_hours__gt=0)
+
+
+def ot_anomalies(attendance_records, from_date, to_date, sort='cost'):
+    """Employees with flagged OT days, largest excess first by sort ('cost', 'hours' or 'days')"""
+    days = anomalous_days(attendance_records, from_date, to_date).values_list(
+        'employee_id', 'employee_name', 'employee__employee_code', 'employee__company__name',
+        'employee__ot_per_hour', 'date', 'day_ot', 'own_avg', 'company_avg', 'excess_hours',
+    )
+    employees = {}
+    for (employee_id, name, code, company_name, ot_rate, day, day_ot, own_avg, company_avg,
+         excess_hours) in days:
+        excess_hours = Decimal(excess_hours)
+        row = employees.setdefault(employee_id, {
+            'employee_id': employee_id,
+            'name': name,
+            'code': code,
+            'company_name': company_name,
+            'ot_rate': ot_rate or Decimal('0.00'),
+            'anomaly_days': 0,
+            'ot_hours': Decimal('0.00'),
+            'excess_hours': Decimal('0.00'),
+            'peak': None,
+        })
+        row['anomaly_days'] += 1
+        row['ot_hours'] += day_ot
+        row['excess_hours'] += excess_hours
+        # The day furthest above its baseline, shown with the baselines it broke
+        if row['peak'] is None or excess_hours > row['peak']['excess_hours']:
+            row['peak'] = {
+                'date': day,
+                'ot_hours': day_ot,
+                'own_avg': own_avg,
+                'company_avg': company_avg,
+                'excess_hours': excess_hours,
+            }
+
+    rows = list(employees.values())
+    for row in rows:
+        row['excess_cost'] = (row['excess_hours'] * row['ot_rate']).quantize(Decimal('0.01'))
+    rows.sort(key=lambda row: (row[ANOMALY_SORT_FIELDS.get(sort, 'excess_cost')], row['excess_cost']), reverse=True)
+    return rows
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class AttendanceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'attendance'
+
+    def ready(self):
+        # Register rollup maintenance signal handlers
+        from . import signals
+        # Register the report cache backend check
+        from . import checks
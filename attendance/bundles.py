@@ -0,0 +1,150 @@
+"""Export of every company's attendance report into one ZIP
+
+The work is split by company: a process pool writes one report CSV per
+company, each worker reading through its own database connection with a
+server-side cursor. The finished files are then streamed into a single ZIP on
+disk together with a manifest of row counts and totals per company.
+"""
+import csv
+import os
+import shutil
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from django.conf import settings
+from django.db import connections
+from django.db.models import F, Sum
+from django.utils.text import slugify
+from companies.models import Company
+from .exports import iter_report_rows, report_queryset, stream_csv
+from .models import DailyAttendanceSummary
+
+# Export processes of one bundle (each holds a database connection while it runs)
+REPORT_BUNDLE_WORKERS = getattr(settings, 'REPORT_BUNDLE_WORKERS', os.cpu_count() or 1)
+
+# Seconds between heartbeat() calls while the pool is busy with long company exports
+HEARTBEAT_WAIT = 30
+
+MANIFEST_NAME = 'manifest.csv'
+
+MANIFEST_HEADER = ['Company ID', 'Company', 'File', 'Rows', 'Salary Amount', 'OT Amount', 'Total Amount']
+
+
+def bundle_filename(from_date, to_date):
+    return f'attendance_all_companies_{from_date}_to_{to_date}.zip'
+
+
+def export_company(company_id, filename, from_date, to_date, staging_dir, heartbeat=None):
+    """Write one company's report CSV into staging_dir and return its row count and totals
+
+    Runs in a pool worker - forked workers open their own connection on first use.
+    heartbeat, if given, is called after every chunk (in-process runs only).
+    """
+    totals = {}
+    path = os.path.join(staging_dir, filename)
+    rows = iter_report_rows(report_queryset(from_date, to_date, company_id), totals)
+    with open(path, 'wb') as output:
+        for chunk in stream_csv(rows):
+            output.write(chunk)
+            if heartbeat:
+                heartbeat()
+    return totals
+
+
+def _expected_rows(company_ids, from_date, to_date):
+    """Records per company from the daily rollup, to hand out the biggest companies first"""
+    rows = DailyAttendanceSummary.objects.filter(
+        company_id__in=company_ids, date__gte=from_date, date__lte=to_date
+    ).order_by().values('company_id').annotate(
+        records=Sum(F('present_count') + F('half_day_count') + F('absent_count'))
+    )
+    return {row['company_id']: row['records'] for row in rows}
+
+
+def _write_bundle(path, staging_dir, entries):
+    """Stream the company files and the manifest into one ZIP"""
+    manifest = os.path.join(staging_dir, MANIFEST_NAME)
+    with open(manifest, 'w', newline='', encoding='utf-8') as output:
+        writer = csv.writer(output)
+        writer.writerow(MANIFEST_HEADER)
+        for entry in entries:
+            writer.writerow([
+                entry['company_id'], entry['company_name'], entry['file'], entry['records'],
+                entry['salary_amount'], entry['ot_amount'], entry['total_amount'],
+            ])
+        writer.writerow([])
+        writer.writerow([
+            '', 'TOTALS:', '',
+            *(sum(entry[name] for entry in entries)
+              for name in ('records', 'salary_amount', 'ot_amount', 'total_amount')),
+        ])
+
+    # Members are copied from disk in blocks, so no file is held in memory
+    with zipfile.ZipFile(f'{path}.part', 'w', zipfile.ZIP_DEFLATED, allowZip64=True) as archive:
+        archive.write(manifest, MANIFEST_NAME)
+        for entry in entries:
+            archive.write(os.path.join(staging_dir, entry['file']), entry['file'])
+    os.replace(f'{path}.part', path)
+
+
+def export_company_bundle(path, from_date, to_date, company_ids=None, workers=None, progress=None, heartbeat=None):
+    """Write the report of every company (or of company_ids) over a date range into one ZIP at path
+
+    progress, if given, is called as progress(entry) after each company's
+    file. heartbeat, if given, keeps being called while a single company's
+    export runs - per chunk in-process, every HEARTBEAT_WAIT seconds while
+    waiting for the pool. Returns the manifest entries in company name order.
+    """
+    companies = Company.objects.order_by('name', 'pk')
+    if company_ids is not None:
+        companies = companies.filter(pk__in=company_ids)
+    entries = [{
+        'company_id': pk,
+        'company_name': name,
+        'file': f"{slugify(name) or 'company'}-{pk}.csv",
+    } for pk, name in companies.values_list('pk', 'name')]
+
+    expected = _expected_rows([entry['company_id'] for entry in entries], from_date, to_date)
+    pending = sorted(entries, key=lambda entry: expected.get(entry['company_id']) or 0, reverse=True)
+
+    staging_dir = f'{path}.parts'
+    os.makedirs(staging_dir, exist_ok=True)
+    try:
+        workers = min(workers or REPORT_BUNDLE_WORKERS, len(pending)) or 1
+        if workers == 1:
+            for entry in pending:
+                entry.update(export_company(
+                    entry['company_id'], entry['file'], from_date, to_date, staging_dir, heartbeat
+                ))
+                if progress:
+                    progress(entry)
+        else:
+            # Forked workers must not inherit the open database connections
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {
+                    pool.submit(export_company, entry['company_id'], entry['file'], from_date, to_date, staging_dir): entry
+                    for entry in pending
+                }
+                running = set(futures)
+                try:
+                    while running:
+                        done, running = wait(running, timeout=HEARTBEAT_WAIT, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            entry = futures[future]
+                            entry.update(future.result())
+                            if progress:
+                                progress(entry)
+                        if heartbeat:
+                            heartbeat()
+                except BaseException:
+                    # Do not start the remaining companies of a failed bundle
+                    for future in futures:
+                        future.cancel()
+                    raise
+
+        _write_bundle(path, staging_dir, entries)
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        if os.path.exists(f'{path}.part'):
+            os.remove(f'{path}.part')
+    return entries
@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+from . import report_cache
+
+
+@register()
+def check_report_cache(app_configs, **kwargs):
+    """The report cache must be shared by every process, or it is switched off"""
+    if report_cache.enabled():
+        return []
+    backend = settings.CACHES.get(report_cache.REPORT_CACHE_ALIAS, {}).get('BACKEND', 'not configured')
+    return [Warning(
+        f"The '{report_cache.REPORT_CACHE_ALIAS}' cache ({backend}) is not shared between processes, "
+        'so report caching and ETags are disabled.',
+        hint='Point CACHES[REPORT_CACHE_ALIAS] at a database, Redis or Memcached cache.',
+        id='attendance.W001',
+    )]
@@ -0,0 +1,111 @@
+"""Period-over-period comparison of attendance, OT and cost
+
+Both periods are aggregated in a single scan of attendance: every aggregate
+carries a FILTER (WHERE date BETWEEN ...) for its period, so one grouped
+query returns the current and previous figures side by side.
+"""
+from datetime import timedelta
+from decimal import Decimal
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce
+from .models import day_salary_expression, ot_amount_expression
+from .muster import month_range
+
+PERIODS = ('current', 'previous')
+
+# Group by -> columns of a row (key identifies the group)
+GROUP_FIELDS = {
+    'company': {'key': 'employee__company_id', 'name': 'employee__company__name'},
+    'employee': {
+        'key': 'employee_id',
+        'name': 'employee_name',
+        'code': 'employee__employee_code',
+        'company_name': 'employee__company__name',
+    },
+}
+
+COUNT_FIELDS = ('records', 'present_count', 'half_day_count', 'absent_count')
+AMOUNT_FIELDS = ('ot_hours', 'salary_amount', 'ot_amount')
+
+
+def comparison_periods(month, today):
+    """(current, previous) date ranges for a month against the month before
+
+    An unfinished month is compared up to today with the same days of the
+    previous month.
+    """
+    first, last = month_range(month)
+    previous_first, previous_last = month_range(first - timedelta(days=1))
+    if last > today:
+        last = today
+        previous_last = min(previous_first + timedelta(days=today.day - 1), previous_last)
+    return (first, last), (previous_first, previous_last)
+
+
+def _period_aggregates(name, from_date, to_date):
+    period = Q(date__gte=from_date, date__lte=to_date)
+    zero = Decimal('0.00')
+    return {
+        f'{name}_records': Count('id', filter=period),
+        f'{name}_present_count': Count('id', filter=period & Q(status='PRESENT')),
+        f'{name}_half_day_count': Count('id', filter=period & Q(status='HALF_DAY')),
+        f'{name}_absent_count': Count('id', filter=period & Q(status='ABSENT')),
+        f'{name}_ot_hours': Coalesce(Sum('ot_hours', filter=period & Q(has_ot=True)), zero),
+        f'{name}_salary_amount': Coalesce(Sum(day_salary_expression(), filter=period), zero),
+        f'{name}_ot_amount': Coalesce(Sum(ot_amount_expression(), filter=period), zero),
+    }
+
+
+def attendance_rate(values):
+    """Paid days (half days count half) as a percentage of the marked days"""
+    if not values['records']:
+        return None
+    paid_days = values['present_count'] + Decimal(values['half_day_count']) / 2
+    return (paid_days * 100 / values['records']).quantize(Decimal('0.1'))
+
+
+def _compare(row):
+    for name in PERIODS:
+        values = row[name]
+        values['total_amount'] = values['salary_amount'] + values['ot_amount']
+        values['attendance_rate'] = attendance_rate(values)
+    current, previous = row['current'], row['previous']
+    row['delta'] = {
+        'attendance_rate': (
+            current['attendance_rate'] - previous['attendance_rate']
+            if current['attendance_rate'] is not None and previous['attendance_rate'] is not None else None
+        ),
+        'ot_hours': current['ot_hours'] - previous['ot_hours'],
+        'ot_amount': current['ot_amount'] - previous['ot_amount'],
+        'total_amount': current['total_amount'] - previous['total_amount'],
+    }
+    return row
+
+
+def period_comparison(attendance_records, current, previous, group_by='company'):
+    """Current and previous period figures per company or employee, plus overall totals
+
+    current and previous are (from_date, to_date) pairs. Returns (rows, totals);
+    each row has the GROUP_FIELDS columns, 'current' and 'previous' dicts of
+    counts, OT hours, amounts and attendance rate, and a 'delta' dict.
+    """
+    columns = GROUP_FIELDS[group_by]
+    in_periods = Q(date__gte=current[0], date__lte=current[1]) | Q(date__gte=previous[0], date__lte=previous[1])
+    grouped = attendance_records.filter(in_periods).order_by().values(
+        **{column: F(field) for column, field in columns.items()}
+    ).annotate(
+        **_period_aggregates('current', *current),
+        **_period_aggregates('previous', *previous),
+    ).order_by('name', 'key')
+
+    empty = dict.fromkeys(COUNT_FIELDS, 0) | dict.fromkeys(AMOUNT_FIELDS, Decimal('0.00'))
+    totals = {name: dict(empty) for name in PERIODS}
+    rows = []
+    for values in grouped:
+        row = {column: values[column] for column in columns}
+        for name in PERIODS:
+            row[name] = {field: values[f'{name}_{field}'] for field in (*COUNT_FIELDS, *AMOUNT_FIELDS)}
+            for field, value in row[name].items():
+                totals[name][field] += value
+        rows.append(_compare(row))
+    return rows, _compare(totals)
@@ -0,0 +1,73 @@
+"""Attendance completeness per company and day, for the heatmap
+
+Marked records per company-day are read from the daily rollup in one query
+and set against each company's active headcount from one grouped employee
+count, so the whole grid costs two queries however many cells it has.
+"""
+from datetime import timedelta
+from django.db.models import Count, F
+from employees.models import Employee
+from .models import DailyAttendanceSummary
+
+# Days covered by the heatmap, today included
+COMPLETENESS_DAYS = 90
+
+# Cells at or above this share of the headcount count as nearly complete
+NEARLY_COMPLETE = 0.9
+
+COMPLETENESS_SORT_FIELDS = ('name', 'gaps')
+
+
+def completeness_level(marked, headcount):
+    """CSS level of a cell: 'full', 'high', 'partial' or 'none'"""
+    if marked >= headcount:
+        return 'full'
+    if marked >= headcount * NEARLY_COMPLETE:
+        return 'high'
+    return 'partial' if marked else 'none'
+
+
+def completeness_grid(companies, from_date, to_date, sort='name'):
+    """Heatmap rows of the companies with active employees, and the dates they cover
+
+    Each row has the company, its active headcount, one (level, title) cell
+    per date, and the numbers of complete and unmarked days. sort 'gaps'
+    puts the least completely marked companies first.
+    """
+    dates = [from_date + timedelta(days=n) for n in range((to_date - from_date).days + 1)]
+    index = {day: position for position, day in enumerate(dates)}
+    headcounts = list(Employee.objects.filter(company__in=companies, is_active=True).values(
+        'company_id', 'company__name'
+    ).annotate(active=Count('id')).order_by('company__name', 'company_id').values_list(
+        'company_id', 'company__name', 'active'
+    ))
+
+    marked = {company_id: [0] * len(dates) for company_id, _, _ in headcounts}
+    summaries = DailyAttendanceSummary.objects.filter(
+        company_id__in=list(marked), date__gte=from_date, date__lte=to_date
+    ).order_by().annotate(
+        total=F('present_count') + F('half_day_count') + F('absent_count')
+    ).values_list('company_id', 'date', 'total')
+    for company_id, day, total in summaries:
+        marked[company_id][index[day]] = total
+
+    rows = []
+    for company_id, name, headcount in headcounts:
+        counts = marked[company_id]
+        levels = [completeness_level(count, headcount) for count in counts]
+        rows.append({
+            'company_id': company_id,
+            'name': name,
+            'headcount': headcount,
+            'cells': [
+                (level, f'{name}, {day:%d %b}: {count}/{headcount} marked')
+                for level, day, count in zip(levels, dates, counts)
+            ],
+            'complete_days': levels.count('full'),
+            'unmarked_days': levels.count('none'),
+            # Records of since-deactivated employees can exceed the headcount
+            'completeness': sum(min(count, headcount) for count in counts) * 100 / (headcount * len(dates)),
+        })
+    if sort == 'gaps':
+        rows.sort(key=lambda row: row['completeness'])
+    return rows, dates
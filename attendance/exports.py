@@ -0,0 +1,380 @@
+"""Streaming helpers for attendance report exports"""
+import csv
+import queue
+import threading
+import zipfile
+import zlib
+from decimal import ROUND_HALF_UP, Decimal
+from django.db import connection, connections
+from django.db.models import F
+from django.http import StreamingHttpResponse
+from .models import Attendance, day_amounts, day_salary_expression, ot_amount_expression
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_CHUNK_SIZE = 2000
+
+# COPY output is handed to the response in blocks of this many bytes
+COPY_CHUNK_SIZE = 64 * 1024
+
+# Blocks buffered between the COPY thread and the response (bounds memory)
+COPY_QUEUE_CHUNKS = 16
+
+# Downloads that are already compressed and must not be gzipped again
+COMPRESSED_CONTENT_TYPES = ('application/gzip', 'application/zip')
+
+CSV_HEADER = [
+    'Date', 'Employee Code', 'Employee Name', 'Company',
+    'Status', 'OT', 'OT Hours', 'Day Rate', 'Day Salary',
+    'OT Rate', 'OT Amount', 'Total Amount', 'Marked By'
+]
+
+# Only the columns the CSV needs - no model instances are built
+EXPORT_FIELDS = (
+    'date',
+    'employee__employee_code',
+    'employee__first_name',
+    'employee__last_name',
+    'employee__company__name',
+    'status',
+    'has_ot',
+    'ot_hours',
+    'employee__salary_per_day',
+    'employee__ot_per_hour',
+    'marked_by__username',
+    'marked_by__first_name',
+    'marked_by__last_name',
+)
+
+STATUS_LABELS = dict(Attendance.STATUS_CHOICES)
+
+CENT = Decimal('0.01')
+
+
+def report_queryset(from_date, to_date, company_id='', employee_id='', companies=None):
+    """Attendance rows of the report export - columns are picked by the exporter"""
+    attendance_records = Attendance.objects.filter(
+        date__gte=from_date,
+        date__lte=to_date
+    ).order_by('employee', 'date')
+
+    if companies is not None:
+        attendance_records = attendance_records.filter(employee__company__in=companies)
+    if company_id:
+        attendance_records = attendance_records.filter(employee__company_id=company_id)
+    if employee_id:
+        attendance_records = attendance_records.filter(employee_id=employee_id)
+    return attendance_records
+
+
+def report_content(attendance_records, mode=''):
+    """CSV byte chunks for a report queryset, via COPY on PostgreSQL when mode is 'copy'"""
+    if mode == 'copy' and copy_supported():
+        return stream_copy(build_copy_sql(attendance_records))
+    return stream_csv(iter_report_rows(attendance_records))
+
+
+class Echo:
+    """File-like object whose write() hands the value back instead of buffering it"""
+
+    def write(self, value):
+        return value
+
+
+def to_cents(amount):
+    """Round an amount to 2 places the way round(numeric, 2) does in the COPY export"""
+    return amount.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def iter_report_rows(attendance_records, totals=None):
+    """Yield CSV rows (header, one per record, totals) from a server-side cursor
+
+    Amounts are rounded to 2 places; totals are summed before rounding. If a
+    totals dict is given, it receives the record count and amount totals once
+    the last row has been yielded.
+    """
+    yield CSV_HEADER
+
+    records = 0
+    total_salary = Decimal('0.00')
+    total_ot = Decimal('0.00')
+    total_grand = Decimal('0.00')
+
+    rows = attendance_records.values_list(*EXPORT_FIELDS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    for (att_date, code, first_name, last_name, company_name, status, has_ot, ot_hours,
+         salary_per_day, ot_per_hour, marked_username, marked_first, marked_last) in rows:
+        day_salary, ot_amount = day_amounts(status, has_ot, ot_hours, salary_per_day, ot_per_hour)
+        total_amount = day_salary + ot_amount
+
+        records += 1
+        total_salary += day_salary
+        total_ot += ot_amount
+        total_grand += total_amount
+
+        if marked_username:
+            marked_by = f"{marked_first} {marked_last}".strip() or marked_username
+        else:
+            marked_by = ''
+
+        yield [
+            att_date,
+            code,
+            f"{first_name} {last_name}",
+            company_name,
+            STATUS_LABELS.get(status, status),
+            'Yes' if has_ot else 'No',
+            ot_hours if has_ot else '',
+            salary_per_day,
+            to_cents(day_salary),
+            ot_per_hour,
+            to_cents(ot_amount),
+            to_cents(total_amount),
+            marked_by,
+        ]
+
+    # Add totals row
+    total_salary, total_ot, total_grand = to_cents(total_salary), to_cents(total_ot), to_cents(total_grand)
+    yield []
+    yield ['', '', '', '', '', '', '', 'TOTALS:', total_salary, '', total_ot, total_grand, '']
+    if totals is not None:
+        totals.update(records=records, salary_amount=total_salary, ot_amount=total_ot, total_amount=total_grand)
+
+
+def stream_csv(rows):
+    """Encode rows as CSV lines, batched into blocks for the response"""
+    writer = csv.writer(Echo())
+    return buffered(writer.writerow(row) for row in rows)
+
+
+def _to_bytes(chunk):
+    return chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+
+
+def buffered(chunks, size=COPY_CHUNK_SIZE):
+    """Coalesce small chunks (e.g. one CSV line each) into blocks of about `size` bytes"""
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer += _to_bytes(chunk)
+        if len(buffer) >= size:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+def gzip_stream(chunks, level=6):
+    """Compress a byte stream into gzip format incrementally"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(_to_bytes(chunk))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class _ZipSink:
+    """Write-only, non-seekable buffer that zipfile streams into"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.offset = 0
+
+    def write(self, data):
+        self.buffer += data
+        self.offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+
+def zip_stream(chunks, arcname):
+    """Compress a byte stream into a single-member ZIP archive incrementally"""
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        with archive.open(arcname, 'w', force_zip64=True) as member:
+            for chunk in chunks:
+                member.write(_to_bytes(chunk))
+                data = sink.drain()
+                if data:
+                    yield data
+    yield sink.drain()
+
+
+def compressed(content, filename, compress='', content_type='text/csv'):
+    """Apply the requested compression, returning (chunks, filename, content_type)"""
+    if compress == 'gzip':
+        return gzip_stream(content), f'{filename}.gz', 'application/gzip'
+    if compress == 'zip':
+        return zip_stream(content, filename), f'{filename.rsplit(".", 1)[0]}.zip', 'application/zip'
+    return content, filename, content_type
+
+
+def export_response(content, filename, compress='', content_type='text/csv'):
+    """Wrap exporter output in a streaming download, optionally gzip or zip compressed"""
+    content, filename, content_type = compressed(content, filename, compress, content_type)
+    response = StreamingHttpResponse(content, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return skip_gzip(response)
+
+
+def skip_gzip(response):
+    """Keep GZipMiddleware from compressing a gzip or zip download a second time"""
+    if response['Content-Type'] in COMPRESSED_CONTENT_TYPES:
+        # GZipMiddleware leaves responses that already have an encoding alone
+        response['Content-Encoding'] = 'identity'
+    return response
+
+
+def copy_supported():
+    """COPY TO STDOUT is only available on PostgreSQL"""
+    return connection.vendor == 'postgresql'
+
+
+def build_copy_sql(attendance_records):
+    """Build a COPY statement that joins, prices and formats the whole report in SQL"""
+    rows = attendance_records.order_by().values(
+        employee_created=F('employee__created_at'),
+        sort_employee=F('employee_id'),
+        att_date=F('date'),
+        code=F('employee__employee_code'),
+        emp_first=F('employee__first_name'),
+        emp_last=F('employee__last_name'),
+        company_name=F('employee__company__name'),
+        att_status=F('status'),
+        att_has_ot=F('has_ot'),
+        att_ot_hours=F('ot_hours'),
+        day_rate=F('employee__salary_per_day'),
+        ot_rate=F('employee__ot_per_hour'),
+        marked_username=F('marked_by__username'),
+        marked_first=F('marked_by__first_name'),
+        marked_last=F('marked_by__last_name'),
+        day_salary=day_salary_expression(),
+        ot_amount=ot_amount_expression(),
+    )
+    rows_sql, rows_params = rows.query.sql_with_params()
+
+    status_cases = ' '.join('WHEN %s THEN %s' for _ in Attendance.STATUS_CHOICES)
+    status_params = [value for choice in Attendance.STATUS_CHOICES for value in choice]
+
+    sql = f"""
+        COPY (
+            WITH r AS MATERIALIZED ({rows_sql})
+            SELECT "Date", "Employee Code", "Employee Name", "Company", "Status", "OT",
+                   "OT Hours", "Day Rate", "Day Salary", "OT Rate", "OT Amount",
+                   "Total Amount", "Marked By"
+            FROM (
+                SELECT 0 AS part, employee_created, sort_employee, att_date,
+                       to_char(att_date, 'YYYY-MM-DD') AS "Date",
+                       code AS "Employee Code",
+                       emp_first || ' ' || emp_last AS "Employee Name",
+                       company_name AS "Company",
+                       CASE att_status {status_cases} ELSE att_status END AS "Status",
+                       CASE WHEN att_has_ot THEN 'Yes' ELSE 'No' END AS "OT",
+                       CASE WHEN att_has_ot THEN att_ot_hours::text END AS "OT Hours",
+                       day_rate::text AS "Day Rate",
+                       round(day_salary, 2)::text AS "Day Salary",
+                       ot_rate::text AS "OT Rate",
+                       round(ot_amount, 2)::text AS "OT Amount",
+                       round(day_salary + ot_amount, 2)::text AS "Total Amount",
+                       CASE WHEN marked_username IS NULL THEN ''
+                            ELSE COALESCE(NULLIF(trim(marked_first || ' ' || marked_last), ''), marked_username)
+                       END AS "Marked By"
+                FROM r
+                UNION ALL
+                SELECT 1, NULL, NULL, NULL, NULL, NULL, NULL, NULL, NULL, NULL, NULL,
+                       'TOTALS:',
+                       round(COALESCE(sum(day_salary), 0), 2)::text,
+                       NULL,
+                       round(COALESCE(sum(ot_amount), 0), 2)::text,
+                       round(COALESCE(sum(day_salary + ot_amount), 0), 2)::text,
+                       NULL
+                FROM r
+            ) report
+            ORDER BY part, employee_created DESC, sort_employee, att_date
+        ) TO STDOUT WITH (FORMAT csv, HEADER)
+    """
+    with connection.cursor() as cursor:
+        return cursor.mogrify(sql, [*rows_params, *status_params]).decode()
+
+
+class CopyCancelled(Exception):
+    """Raised inside the COPY thread when the client stops reading"""
+
+
+class _ChunkWriter:
+    """File-like sink for copy_expert that queues fixed-size chunks"""
+
+    def __init__(self, chunks, chunk_size):
+        self.chunks = chunks
+        self.chunk_size = chunk_size
+        self.buffer = bytearray()
+        self.cancelled = threading.Event()
+
+    def put(self, item):
+        # Block while the queue is full, but give up once the consumer is gone
+        while not self.cancelled.is_set():
+            try:
+                self.chunks.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+        raise CopyCancelled()
+
+    def write(self, data):
+        self.buffer += data
+        while len(self.buffer) >= self.chunk_size:
+            self.put(bytes(self.buffer[:self.chunk_size]))
+            del self.buffer[:self.chunk_size]
+
+    def flush(self):
+        if self.buffer:
+            self.put(bytes(self.buffer))
+            self.buffer.clear()
+
+
+_COPY_DONE = object()
+
+
+def stream_copy(copy_sql, chunk_size=COPY_CHUNK_SIZE):
+    """Yield the output of a COPY ... TO STDOUT statement in fixed-size chunks"""
+    writer = _ChunkWriter(queue.Queue(maxsize=COPY_QUEUE_CHUNKS), chunk_size)
+
+    def run():
+        # psycopg2's copy_expert blocks until COPY finishes, so it runs on its
+        # own thread (and its own connection) while the response drains the queue
+        try:
+            with connections['default'].cursor() as cursor:
+                cursor.copy_expert(copy_sql, writer)
+            writer.flush()
+            writer.put(_COPY_DONE)
+        except CopyCancelled:
+            pass
+        except Exception as e:
+            try:
+                writer.put(e)
+            except CopyCancelled:
+                pass
+        finally:
+            connections['default'].close()
+
+    worker = threading.Thread(target=run, daemon=True)
+    worker.start()
+    try:
+        while True:
+            item = writer.chunks.get()
+            if item is _COPY_DONE:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        writer.cancelled.set()
+        worker.join()
@@ -0,0 +1,350 @@
+"""Background report jobs run by the local report worker (manage.py run_report_worker)"""
+import os
+import secrets
+import shutil
+import time
+from datetime import date, timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .bundles import bundle_filename, export_company_bundle
+from .exports import compressed, report_content, report_queryset
+from .models import ReportJob
+from .salary_slips import generate_salary_slips, month_bounds
+from . import report_cache
+
+REPORT_JOB_DIR = 'report_jobs'
+
+# Jobs whose heartbeat is this old are assumed to belong to a worker that died
+REPORT_JOB_STALE_AFTER = timedelta(minutes=getattr(settings, 'REPORT_JOB_STALE_MINUTES', 30))
+
+# Finished jobs and their files are removed after this long
+REPORT_JOB_RETENTION = timedelta(days=getattr(settings, 'REPORT_JOB_RETENTION_DAYS', 7))
+
+# rows_done/progress are written at most once per this many rows
+PROGRESS_EVERY_ROWS = 2000
+
+# A running job refreshes its heartbeat at least this often (seconds) while it makes progress
+HEARTBEAT_EVERY = 60
+
+
+def _reusable_statuses():
+    # A finished job is only reusable while the cache versions in its key can tell it is current
+    return ['PENDING', 'RUNNING', 'DONE'] if report_cache.enabled() else ['PENDING', 'RUNNING']
+
+
+def _user_companies(user):
+    if user.role == 'ADMIN' and user.assigned_companies.exists():
+        return list(user.assigned_companies.values_list('id', flat=True))
+    return None
+
+
+def can_access_job(user, job):
+    """Requester, Super Admin, or an admin with the same company scope (coalesced jobs are shared)"""
+    if user.is_superadmin() or job.requested_by_id == user.pk:
+        return True
+    return user.is_admin() and job.params.get('companies') == _user_companies(user)
+
+
+@transaction.atomic
+def submit_report_job(user, from_date, to_date, company_id='', employee_id='', mode='', compress=''):
+    """Queue a report export, reusing an identical queued, running or finished job
+
+    Returns (job, created).
+    """
+    params = {
+        'from_date': from_date,
+        'to_date': to_date,
+        'company': company_id,
+        'employee': employee_id,
+        'mode': mode,
+        'compress': compress,
+        'companies': _user_companies(user),
+    }
+    # The key carries the report cache versions, so a finished job is only
+    # reused while none of its company-months have changed
+    dedupe_key = report_cache.result_key(
+        'report_job', user,
+        {name: value for name, value in params.items() if name not in ('from_date', 'to_date')},
+        from_date, to_date
+    )
+    existing = ReportJob.objects.select_for_update().filter(
+        dedupe_key=dedupe_key,
+        status__in=_reusable_statuses()
+    ).first()
+    if existing:
+        return existing, False
+    return ReportJob.objects.create(requested_by=user, params=params, dedupe_key=dedupe_key), True
+
+
+@transaction.atomic
+def submit_company_bundle_job(user, from_date, to_date):
+    """Queue an export of every company in the user's scope into one ZIP, reusing an identical job
+
+    Returns (job, created).
+    """
+    params = {
+        'from_date': from_date,
+        'to_date': to_date,
+        'companies': _user_companies(user),
+    }
+    dedupe_key = report_cache.result_key('company_bundle', user, {'companies': params['companies']}, from_date, to_date)
+    existing = ReportJob.objects.select_for_update().filter(
+        kind='COMPANY_BUNDLE',
+        dedupe_key=dedupe_key,
+        status__in=_reusable_statuses()
+    ).first()
+    if existing:
+        return existing, False
+    job = ReportJob.objects.create(requested_by=user, kind='COMPANY_BUNDLE', params=params, dedupe_key=dedupe_key)
+    return job, True
+
+
+@transaction.atomic
+def submit_salary_slip_job(user, month, company_id):
+    """Queue salary slip generation for one company-month, reusing a queued or running job
+
+    Returns (job, created).
+    """
+    first, last = month_bounds(month)
+    dedupe_key = f'salary_slips:{company_id}:{first:%Y-%m}'
+    existing = ReportJob.objects.select_for_update().filter(
+        kind='SALARY_SLIPS',
+        dedupe_key=dedupe_key,
+        status__in=['PENDING', 'RUNNING']
+    ).first()
+    if existing:
+        return existing, False
+    params = {
+        'month': f'{first:%Y-%m}',
+        'from_date': first.isoformat(),
+        'to_date': last.isoformat(),
+        'company': company_id,
+        'companies': None,
+        # Fixed at submit time so a requeued job resumes in the same directory
+        'token': secrets.token_hex(8),
+    }
+    job = ReportJob.objects.create(requested_by=user, kind='SALARY_SLIPS', params=params, dedupe_key=dedupe_key)
+    return job, True
+
+
+def claim_next_job():
+    """Mark the oldest pending job as running and return it, or None"""
+    for job in ReportJob.objects.filter(status='PENDING').order_by('created_at')[:10]:
+        # Conditional update - only one worker can move a job out of PENDING
+        now = timezone.now()
+        claimed = ReportJob.objects.filter(pk=job.pk, status='PENDING').update(
+            status='RUNNING',
+            started_at=now,
+            heartbeat_at=now
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+    return None
+
+
+def requeue_stale_jobs():
+    """Put jobs of a crashed worker (no heartbeat for REPORT_JOB_STALE_AFTER) back in the queue"""
+    stale = timezone.now() - REPORT_JOB_STALE_AFTER
+    return ReportJob.objects.filter(
+        Q(heartbeat_at__lt=stale) | Q(heartbeat_at__isnull=True, started_at__lt=stale),
+        status='RUNNING'
+    ).update(status='PENDING', started_at=None, heartbeat_at=None, rows_done=0, progress=0)
+
+
+def _report_progress(job, **fields):
+    """Record a running job's progress and refresh its heartbeat"""
+    ReportJob.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now(), **fields)
+
+
+def _heartbeat(job):
+    """Callable that refreshes a running job's heartbeat at most once per HEARTBEAT_EVERY seconds"""
+    beat = time.monotonic()
+
+    def heartbeat():
+        nonlocal beat
+        if time.monotonic() - beat >= HEARTBEAT_EVERY:
+            beat = time.monotonic()
+            _report_progress(job)
+    return heartbeat
+
+
+def purge_old_jobs():
+    """Delete finished jobs past the retention period together with their files"""
+    count = 0
+    for job in ReportJob.objects.filter(
+        status__in=['DONE', 'FAILED'],
+        finished_at__lt=timezone.now() - REPORT_JOB_RETENTION
+    ):
+        if job.kind == 'SALARY_SLIPS':
+            # Also drops the staging directory of a job that failed half way
+            shutil.rmtree(os.path.join(settings.MEDIA_ROOT, _salary_slip_dir(job)), ignore_errors=True)
+        elif job.file:
+            path = job.file.path
+            job.file.delete(save=False)
+            try:
+                os.rmdir(os.path.dirname(path))
+            except OSError:
+                pass
+        job.delete()
+        count += 1
+    return count
+
+
+def _track_progress(job, chunks):
+    """Pass chunks through while recording how many CSV lines have been produced"""
+    rows_done = 0
+    reported = 0
+    beat = time.monotonic()
+    for chunk in chunks:
+        rows_done += chunk.count(b'\n')
+        if rows_done - reported >= PROGRESS_EVERY_ROWS or time.monotonic() - beat >= HEARTBEAT_EVERY:
+            reported = rows_done
+            beat = time.monotonic()
+            progress = min(99, rows_done * 100 // max(job.total_rows, 1))
+            _report_progress(job, rows_done=rows_done, progress=progress)
+        yield chunk
+
+
+def run_report_job(job):
+    """Generate a job's file into MEDIA_ROOT/report_jobs"""
+    params = job.params
+    path = None
+    try:
+        attendance_records = report_queryset(
+            params['from_date'], params['to_date'],
+            params.get('company', ''), params.get('employee', ''),
+            companies=params.get('companies')
+        )
+        # Header, blank line and totals row come on top of the records
+        job.total_rows = attendance_records.count() + 3
+        _report_progress(job, total_rows=job.total_rows)
+
+        content = _track_progress(job, report_content(attendance_records, params.get('mode', '')))
+        content, filename, _ = compressed(
+            content,
+            f"attendance_report_{params['from_date']}_to_{params['to_date']}.csv",
+            params.get('compress', '')
+        )
+
+        # Unguessable directory - DEBUG serves MEDIA_ROOT without authentication
+        name = f'{REPORT_JOB_DIR}/{job.pk}-{secrets.token_hex(8)}/{filename}'
+        path = os.path.join(settings.MEDIA_ROOT, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary name so a half-written file is never downloadable
+        with open(f'{path}.part', 'wb') as output:
+            for chunk in content:
+                output.write(chunk)
+        os.replace(f'{path}.part', path)
+
+        job.file.name = name
+        job.status = 'DONE'
+        job.rows_done = job.total_rows
+        job.progress = 100
+        job.finished_at = timezone.now()
+        job.save(update_fields=['file', 'status', 'rows_done', 'progress', 'finished_at'])
+    except Exception as e:
+        if path and os.path.exists(f'{path}.part'):
+            os.remove(f'{path}.part')
+        job.status = 'FAILED'
+        job.error = str(e)
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'finished_at'])
+    return job
+
+
+def run_company_bundle_job(job):
+    """Export every company of the job's scope into one ZIP in MEDIA_ROOT/report_jobs"""
+    params = job.params
+    path = None
+    try:
+        attendance_records = report_queryset(
+            params['from_date'], params['to_date'], companies=params.get('companies')
+        )
+        job.total_rows = attendance_records.count()
+        _report_progress(job, total_rows=job.total_rows)
+
+        rows_done = 0
+
+        def track_progress(entry):
+            nonlocal rows_done
+            rows_done += entry['records']
+            _report_progress(job, rows_done=rows_done, progress=min(99, rows_done * 100 // max(job.total_rows, 1)))
+
+        name = f"{REPORT_JOB_DIR}/{job.pk}-{secrets.token_hex(8)}/{bundle_filename(params['from_date'], params['to_date'])}"
+        path = os.path.join(settings.MEDIA_ROOT, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        export_company_bundle(
+            path, params['from_date'], params['to_date'],
+            company_ids=params.get('companies'),
+            progress=track_progress,
+            # A single large company can take longer than REPORT_JOB_STALE_AFTER
+            heartbeat=_heartbeat(job)
+        )
+
+        job.file.name = name
+        job.status = 'DONE'
+        job.rows_done = job.total_rows
+        job.progress = 100
+        job.finished_at = timezone.now()
+        job.save(update_fields=['file', 'status', 'rows_done', 'progress', 'finished_at'])
+    except Exception as e:
+        job.status = 'FAILED'
+        job.error = str(e)
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'finished_at'])
+    return job
+
+
+def _salary_slip_dir(job):
+    return f"{REPORT_JOB_DIR}/{job.pk}-{job.params['token']}"
+
+
+def run_salary_slip_job(job):
+    """Generate a company's salary slip archive into MEDIA_ROOT/report_jobs"""
+    params = job.params
+    directory = _salary_slip_dir(job)
+
+    beat = time.monotonic()
+
+    def track_progress(done, total):
+        nonlocal beat
+        if done == total or done % 100 == 0 or time.monotonic() - beat >= HEARTBEAT_EVERY:
+            beat = time.monotonic()
+            _report_progress(job, total_rows=total, rows_done=done, progress=min(99, done * 100 // total))
+
+    try:
+        results = generate_salary_slips(
+            date.fromisoformat(params['from_date']),
+            company_ids=[params['company']],
+            output_dir=os.path.join(settings.MEDIA_ROOT, directory),
+            force=True,
+            progress=track_progress
+        )
+        if not results:
+            raise ValueError(f"No attendance recorded for this company in {params['month']}.")
+        result = results[0]
+
+        job.file.name = f"{directory}/{os.path.basename(result['path'])}"
+        job.status = 'DONE'
+        job.total_rows = job.rows_done = result['slips']
+        job.progress = 100
+        job.finished_at = timezone.now()
+        job.save(update_fields=['file', 'status', 'total_rows', 'rows_done', 'progress', 'finished_at'])
+    except Exception as e:
+        job.status = 'FAILED'
+        job.error = str(e)
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'finished_at'])
+    return job
+
+
+def run_job(job):
+    """Run a claimed job with the runner for its kind"""
+    if job.kind == 'SALARY_SLIPS':
+        return run_salary_slip_job(job)
+    if job.kind == 'COMPANY_BUNDLE':
+        return run_company_bundle_job(job)
+    return run_report_job(job)
@@ -0,0 +1,98 @@
+import json
+import statistics
+import time
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from attendance.partitions import TABLE, is_partitioned, partitioning_supported, partitions
+
+# Report results are not cached while benchmarking, so every run hits the table
+NO_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+def _relations(plan, names, found):
+    """Attendance tables (the table or its partitions) a query plan reads"""
+    if plan.get('Relation Name') in names:
+        found.add(plan['Relation Name'])
+    for child in plan.get('Plans', []):
+        _relations(child, names, found)
+    return found
+
+
+class Command(BaseCommand):
+    help = ('Benchmark the reports and attendance list pages against the attendance table '
+            '(page time, and the partitions each query reads when it is partitioned)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Username to request the pages as (default: the first Super Admin)')
+        parser.add_argument('--runs', type=int, default=5, help='Requests per page; the median time is shown')
+
+    def handle(self, *args, **options):
+        if not partitioning_supported():
+            raise CommandError('This benchmark needs PostgreSQL.')
+        users = get_user_model().objects.filter(is_active=True)
+        user = (users.filter(username=options['user']) if options['user'] else users.filter(role='SUPERADMIN')).first()
+        if user is None:
+            raise CommandError('No such active user.')
+
+        with connection.cursor() as cursor:
+            partitioned = is_partitioned(cursor)
+            months, has_default = partitions(cursor) if partitioned else ({}, False)
+        names = {TABLE, *months.values()} | ({f'{TABLE}_default'} if has_default else set())
+        self.stdout.write(
+            f'{TABLE}: ' + (f'{len(names) - 1} partitions' if partitioned else 'not partitioned')
+        )
+
+        today = timezone.localdate()
+        last_month = today.replace(day=1) - relativedelta(months=1)
+        last_month_end = today.replace(day=1) - relativedelta(days=1)
+        pages = [
+            ('reports, this month', reverse('attendance:reports'), {}),
+            ('reports, last month', reverse('attendance:reports'),
+             {'from_date': last_month.isoformat(), 'to_date': last_month_end.isoformat()}),
+            ('attendance list, this month', reverse('attendance:attendance_list'), {}),
+            ('attendance list, last month', reverse('attendance:attendance_list'),
+             {'start_date': last_month.isoformat(), 'end_date': last_month_end.isoformat()}),
+        ]
+
+        hosts = [host.lstrip('.') for host in settings.ALLOWED_HOSTS if host not in ('', '*')]
+        client = Client(HTTP_HOST=hosts[0] if hosts else 'localhost')
+        client.force_login(user)
+        with override_settings(CACHES=NO_CACHE):
+            for label, url, params in pages:
+                timings = []
+                for run in range(options['runs']):
+                    with CaptureQueriesContext(connection) as queries:
+                        started = time.perf_counter()
+                        response = client.get(url, params)
+                        if response.streaming:
+                            b''.join(response.streaming_content)
+                        timings.append(time.perf_counter() - started)
+                    if response.status_code != 200:
+                        raise CommandError(f'{label}: HTTP {response.status_code}')
+                    if run == 0:
+                        captured = [query['sql'] for query in queries.captured_queries]
+
+                self.stdout.write(f'\n{label}: {statistics.median(timings) * 1000:.1f} ms (median of {len(timings)})')
+                self._explain(captured, names, len(names) - 1 if partitioned else 1)
+
+    def _explain(self, statements, names, total):
+        with connection.cursor() as cursor:
+            for sql in statements:
+                if not sql.lstrip().upper().startswith('SELECT') or f'"{TABLE}"' not in sql:
+                    continue
+                cursor.execute(f'EXPLAIN (ANALYZE, FORMAT JSON) {sql}')
+                result = cursor.fetchone()[0]
+                explain = (json.loads(result) if isinstance(result, str) else result)[0]
+                scanned = sorted(_relations(explain['Plan'], names, set()))
+                summary = ', '.join(scanned) if len(scanned) <= 4 else f'{scanned[0]} .. {scanned[-1]}'
+                self.stdout.write(
+                    f"  {explain['Execution Time']:8.1f} ms  reads {len(scanned)}/{total} "
+                    f"[{summary}]  {sql[:70]}..."
+                )
@@ -0,0 +1,55 @@
+import os
+import time
+import tracemalloc
+from datetime import date, timedelta
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from attendance.exports import CSV_HEADER
+from attendance.pdf_exports import write_report_pdf
+
+
+def synthetic_rows(count):
+    """iter_report_rows()-shaped rows without touching the database"""
+    yield CSV_HEADER
+    start = date(2024, 1, 1)
+    total = Decimal('0.00')
+    for i in range(count):
+        day_salary = Decimal('500.00') if i % 5 else Decimal('250.00')
+        ot_amount = Decimal('150.00') if i % 3 == 0 else Decimal('0.00')
+        total += day_salary + ot_amount
+        yield [
+            start + timedelta(days=i % 90), f'EMP{i % 2000:05d}', f'Employee Number {i % 2000}',
+            f'Company {i % 25}', 'Present' if i % 5 else 'Half Day', 'Yes' if i % 3 == 0 else 'No',
+            Decimal('2.00') if i % 3 == 0 else '', Decimal('500.00'), day_salary, Decimal('75.00'),
+            ot_amount, day_salary + ot_amount, 'Supervisor Name',
+        ]
+    yield []
+    yield ['', '', '', '', '', '', '', 'TOTALS:', total, '', Decimal('0.00'), total, '']
+
+
+class Command(BaseCommand):
+    help = 'Benchmark PDF report rendering (rows/second and peak Python memory)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, action='append',
+                            help='Row count to render (repeatable, default: 1000, 5000 and 20000)')
+        parser.add_argument('--memory', action='store_true',
+                            help='Also measure peak Python memory (a second, traced and much slower run)')
+        parser.add_argument('--output', help='Keep the PDF of the last run at this path')
+
+    def handle(self, *args, **options):
+        for count in options['rows'] or [1000, 5000, 20000]:
+            with open(options['output'] or os.devnull, 'wb') as output:
+                started = time.perf_counter()
+                write_report_pdf(synthetic_rows(count), output, 'Attendance Report', 'Benchmark')
+                elapsed = time.perf_counter() - started
+            line = f'{count:>7} rows: {elapsed:6.2f}s  {count / elapsed:8.0f} rows/s'
+
+            if options['memory']:
+                with open(os.devnull, 'wb') as output:
+                    tracemalloc.start()
+                    write_report_pdf(synthetic_rows(count), output, 'Attendance Report', 'Benchmark')
+                    _, peak = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+                line += f'  peak {peak / 1024 / 1024:6.1f} MB'
+            self.stdout.write(line)
@@ -0,0 +1,46 @@
+from datetime import datetime
+from dateutil.relativedelta import relativedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from companies.models import Company
+from attendance import report_cache
+from attendance.models import Attendance
+from attendance.rollups import build_monthly_summaries
+
+
+def parse_month(value):
+    try:
+        return datetime.strptime(value, '%Y-%m').date()
+    except ValueError:
+        raise CommandError(f'Invalid month "{value}", expected YYYY-MM')
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the monthly per-employee attendance rollup (run nightly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', dest='months', type=parse_month, action='append',
+                            help='Month to rebuild (YYYY-MM, repeatable)')
+        parser.add_argument('--recent', type=int, default=2,
+                            help='Rebuild the current month and the months before it (default: 2 months)')
+        parser.add_argument('--all', action='store_true', help='Rebuild every month that has attendance')
+
+    def handle(self, *args, **options):
+        if options['all']:
+            months = list(Attendance.objects.dates('date', 'month'))
+        elif options['months']:
+            months = options['months']
+        else:
+            current = timezone.localdate().replace(day=1)
+            months = [current - relativedelta(months=offset) for offset in range(options['recent'])]
+
+        total = 0
+        for month in sorted(set(months)):
+            count = build_monthly_summaries(month)
+            total += count
+            self.stdout.write(f'{month:%Y-%m}: {count} employee rows')
+        # Cached employee-wise reports and page ETags of the rebuilt months must not outlive the old rows
+        company_ids = list(Company.objects.values_list('id', flat=True))
+        for month in set(months):
+            report_cache.bump_months(company_ids, month, month)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {total} monthly summary rows'))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from attendance import report_cache
+from attendance.rollups import find_summary_mismatches, rebuild_daily_summaries
+from .rebuild_daily_summary import parse_date
+
+
+class Command(BaseCommand):
+    help = 'Compare the daily attendance rollup table with raw attendance records'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='from_date', type=parse_date, help='First date to check (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='to_date', type=parse_date, help='Last date to check (YYYY-MM-DD)')
+        parser.add_argument('--company', dest='company_ids', type=int, action='append',
+                            help='Only check this company id (repeatable)')
+        parser.add_argument('--repair', action='store_true', help='Rebuild the days that do not match')
+
+    def handle(self, *args, **options):
+        mismatches = find_summary_mismatches(
+            from_date=options['from_date'],
+            to_date=options['to_date'],
+            company_ids=options['company_ids'],
+        )
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS('Daily summaries are consistent'))
+            return
+
+        for company_id, day, field, stored, expected in mismatches:
+            self.stdout.write(f'company={company_id} date={day} {field}: stored {stored}, expected {expected}')
+
+        if options['repair']:
+            for company_id in {mismatch[0] for mismatch in mismatches}:
+                rebuild_daily_summaries(
+                    company_ids=[company_id],
+                    dates=sorted({mismatch[1] for mismatch in mismatches if mismatch[0] == company_id}),
+                )
+            for company_id, day in {mismatch[:2] for mismatch in mismatches}:
+                report_cache.bump_month(company_id, day)
+            self.stdout.write(self.style.SUCCESS(f'Repaired {len(mismatches)} mismatched values'))
+        else:
+            raise CommandError(f'{len(mismatches)} mismatched values found (run with --repair to fix)')
@@ -0,0 +1,62 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from attendance.models import Attendance
+from attendance.payroll import PayrollFrame
+from attendance.rollups import MONTHLY_FIELDS, employee_totals
+from .rebuild_daily_summary import parse_date
+
+
+class Command(BaseCommand):
+    help = 'Compare the vectorized payroll engine with the per-record Decimal amounts and time both'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='from_date', type=parse_date, help='First date to check (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='to_date', type=parse_date, help='Last date to check (YYYY-MM-DD)')
+        parser.add_argument('--company', dest='company_ids', type=int, action='append',
+                            help='Only check this company id (repeatable)')
+
+    def handle(self, *args, **options):
+        attendance_records = Attendance.objects.all()
+        if options['from_date']:
+            attendance_records = attendance_records.filter(date__gte=options['from_date'])
+        if options['to_date']:
+            attendance_records = attendance_records.filter(date__lte=options['to_date'])
+        if options['company_ids']:
+            attendance_records = attendance_records.filter(employee__company_id__in=options['company_ids'])
+
+        started = time.monotonic()
+        payroll = PayrollFrame.load(attendance_records)
+        totals = payroll.totals()
+        engine_time = time.monotonic() - started
+
+        started = time.monotonic()
+        expected = {}
+        for record in attendance_records.select_related('employee').iterator(chunk_size=2000):
+            expected[record.pk] = (record.day_salary, record.ot_amount)
+        decimal_time = time.monotonic() - started
+
+        mismatches = 0
+        for pk, amounts in payroll.row_amounts().items():
+            decimal_amounts = expected.pop(pk, None)
+            if amounts != decimal_amounts:
+                mismatches += 1
+                self.stdout.write(f'attendance={pk}: engine {amounts}, expected {decimal_amounts}')
+        mismatches += len(expected)
+
+        # Per employee totals against the grouped SQL aggregate the rollups use
+        grouped = {row['employee_id']: row for row in employee_totals(attendance_records)}
+        sql_names = [('total_ot_hours' if name == 'ot_hours' else name) for name in MONTHLY_FIELDS]
+        for employee_id, values in payroll.group_totals('employee').items():
+            row = grouped.pop(employee_id, None)
+            if row is None or [values[name] for name in MONTHLY_FIELDS] != [row[name] for name in sql_names]:
+                mismatches += 1
+                self.stdout.write(f'employee={employee_id}: engine totals differ from the grouped aggregate')
+        mismatches += len(grouped)
+
+        self.stdout.write(
+            f'{len(payroll)} records: engine {engine_time:.3f}s, Decimal properties {decimal_time:.3f}s, '
+            f"salary {totals['salary_amount']}, OT {totals['ot_amount']}"
+        )
+        if mismatches:
+            raise CommandError(f'{mismatches} records differ from the Decimal amounts')
+        self.stdout.write(self.style.SUCCESS('Payroll engine matches the Decimal amounts'))
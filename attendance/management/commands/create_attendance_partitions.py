@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+from attendance.partitions import PARTITION_MONTHS_AHEAD, PartitioningError, ensure_partitions
+
+
+class Command(BaseCommand):
+    help = 'Create the monthly attendance partitions of the coming months (run daily, e.g. from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, default=PARTITION_MONTHS_AHEAD,
+                            help=f'Months after the current one that must have a partition (default: {PARTITION_MONTHS_AHEAD})')
+
+    def handle(self, *args, **options):
+        try:
+            created = ensure_partitions(options['months_ahead'])
+        except PartitioningError as e:
+            raise CommandError(str(e))
+
+        for name, moved in created:
+            note = f' ({moved} rows moved from the default partition)' if moved else ''
+            self.stdout.write(f'Created {name}{note}')
+        self.stdout.write(self.style.SUCCESS(f'{len(created)} partitions created'))
@@ -0,0 +1,50 @@
+import os
+import time
+from dateutil.relativedelta import relativedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from attendance.salary_slips import generate_salary_slips
+from .build_monthly_summary import parse_month
+
+
+class Command(BaseCommand):
+    help = 'Render salary slip PDFs for a month in parallel, one ZIP per company (resumes interrupted runs)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', type=parse_month,
+                            help='Month to generate (YYYY-MM, default: last month)')
+        parser.add_argument('--company', dest='companies', type=int, action='append',
+                            help='Company id (repeatable, default: every company with attendance)')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='Rendering processes (default: one per CPU core)')
+        parser.add_argument('--output-dir', help='Directory for the archives (default: SALARY_SLIP_ROOT/YYYY-MM)')
+        parser.add_argument('--force', action='store_true', help='Regenerate archives that already exist')
+
+    def handle(self, *args, **options):
+        month = options['month'] or timezone.localdate().replace(day=1) - relativedelta(months=1)
+
+        started = time.monotonic()
+        results = generate_salary_slips(
+            month,
+            company_ids=options['companies'],
+            output_dir=options['output_dir'],
+            workers=options['workers'],
+            force=options['force']
+        )
+        elapsed = time.monotonic() - started
+
+        rendered = 0
+        for result in results:
+            if result['skipped']:
+                self.stdout.write(f"{result['company_name']}: already generated -> {result['path']}")
+                continue
+            rendered += result['rendered']
+            resumed = result['slips'] - result['rendered']
+            note = f' ({resumed} reused from an interrupted run)' if resumed else ''
+            self.stdout.write(f"{result['company_name']}: {result['slips']} slips{note} -> {result['path']}")
+
+        rate = f', {rendered / elapsed:.0f} slips/s' if rendered and elapsed else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'{month:%Y-%m}: {len(results)} companies, rendered {rendered} slips in {elapsed:.1f}s '
+            f'with {options["workers"]} workers{rate}'
+        ))
@@ -0,0 +1,35 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from attendance.partitions import (
+    PARTITION_MONTHS_AHEAD, PartitioningError, partition_attendance, unpartition_attendance
+)
+
+
+class Command(BaseCommand):
+    help = 'Convert the attendance table to monthly range partitions on PostgreSQL (or back with --undo)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--undo', action='store_true',
+                            help='Turn a partitioned attendance table back into a plain table')
+        parser.add_argument('--months-ahead', type=int, default=PARTITION_MONTHS_AHEAD,
+                            help=f'Months after the current one to create partitions for (default: {PARTITION_MONTHS_AHEAD})')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        try:
+            if options['undo']:
+                copied = unpartition_attendance()
+                created = []
+            else:
+                copied, created = partition_attendance(options['months_ahead'])
+        except PartitioningError as e:
+            raise CommandError(str(e))
+        elapsed = time.monotonic() - started
+
+        if options['undo']:
+            self.stdout.write(self.style.SUCCESS(f'Copied {copied} rows into a plain attendance table in {elapsed:.1f}s'))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'Copied {copied} rows into {len(created)} monthly partitions '
+                f'({created[0]} to {created[-1]}) and a default partition in {elapsed:.1f}s'
+            ))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from attendance.report_cache import REPORT_CACHE_ALIAS, cache_stats, enabled, reset_stats
+
+
+class Command(BaseCommand):
+    help = 'Show hit/miss counts of the report result cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after printing them')
+
+    def handle(self, *args, **options):
+        if not enabled():
+            self.stdout.write(self.style.WARNING(
+                f"Report caching is disabled - the '{REPORT_CACHE_ALIAS}' cache is not shared between processes"
+            ))
+        for name, stats in cache_stats().items():
+            self.stdout.write(
+                f"{name}: {stats['hits']} hits, {stats['misses']} misses "
+                f"({stats['hit_rate']:.1%} hit rate)"
+            )
+        if options['reset']:
+            reset_stats()
+            self.stdout.write(self.style.SUCCESS('Counters reset'))
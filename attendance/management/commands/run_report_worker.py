@@ -0,0 +1,49 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from attendance.jobs import claim_next_job, purge_old_jobs, requeue_stale_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = 'Run the background report worker (polls the database, no message broker needed)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=2.0,
+                            help='Seconds to wait between polls when the queue is empty')
+        parser.add_argument('--once', action='store_true',
+                            help='Process the queued jobs and exit instead of polling forever')
+        parser.add_argument('--maintenance-interval', type=float, default=300.0,
+                            help='Seconds between requeueing stale jobs and purging expired ones')
+
+    def _maintenance(self):
+        requeued = requeue_stale_jobs()
+        if requeued:
+            self.stdout.write(f'Requeued {requeued} stale jobs')
+        purged = purge_old_jobs()
+        if purged:
+            self.stdout.write(f'Purged {purged} expired jobs')
+
+    def handle(self, *args, **options):
+        maintained = None
+
+        while True:
+            close_old_connections()
+            if maintained is None or time.monotonic() - maintained >= options['maintenance_interval']:
+                self._maintenance()
+                maintained = time.monotonic()
+            job = claim_next_job()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+                continue
+
+            started = time.monotonic()
+            run_job(job)
+            elapsed = time.monotonic() - started
+            if job.status == 'DONE':
+                self.stdout.write(self.style.SUCCESS(
+                    f'{job}: {job.total_rows} rows in {elapsed:.1f}s -> {job.file.name}'
+                ))
+            else:
+                self.stdout.write(self.style.ERROR(f'{job}: {job.error}'))
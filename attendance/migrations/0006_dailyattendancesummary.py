@@ -0,0 +1,92 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:08
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Case, Count, DecimalField, F, Q, Sum, Value, When
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def backfill_daily_summaries(apps, schema_editor):
+    # Same GROUP BY as rollups.rebuild_daily_summaries - writes after this
+    # migration only apply deltas, so the table has to start out complete
+    Attendance = apps.get_model('attendance', 'Attendance')
+    DailyAttendanceSummary = apps.get_model('attendance', 'DailyAttendanceSummary')
+    zero = Value(Decimal('0.00'))
+    amount = DecimalField(max_digits=16, decimal_places=4)
+    rate = Coalesce('employee__salary_per_day', zero)
+    rows = Attendance.objects.order_by().values(
+        summary_company=F('employee__company_id'),
+        summary_date=F('date'),
+    ).annotate(
+        present=Count('id', filter=Q(status='PRESENT')),
+        half_days=Count('id', filter=Q(status='HALF_DAY')),
+        absent=Count('id', filter=Q(status='ABSENT')),
+        ot_days=Count('id', filter=Q(has_ot=True)),
+        total_ot_hours=Coalesce(Sum('ot_hours', filter=Q(has_ot=True)), zero),
+        salary=Sum(Case(
+            When(status='PRESENT', then=rate),
+            When(status='HALF_DAY', then=rate / 2),
+            default=zero,
+            output_field=amount
+        )),
+        ot=Sum(Case(
+            When(has_ot=True, then=Coalesce('ot_hours', zero) * Coalesce('employee__ot_per_hour', zero)),
+            default=zero,
+            output_field=amount
+        )),
+    )
+    DailyAttendanceSummary.objects.bulk_create(
+        [
+            DailyAttendanceSummary(
+                company_id=row['summary_company'],
+                date=row['summary_date'],
+                present_count=row['present'],
+                half_day_count=row['half_days'],
+                absent_count=row['absent'],
+                ot_count=row['ot_days'],
+                ot_hours=row['total_ot_hours'],
+                salary_amount=row['salary'],
+                ot_amount=row['ot'],
+            )
+            for row in rows.iterator()
+        ],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0001_initial'),
+        ('employees', '0004_alter_employee_ot_per_hour_and_more'),
+        ('attendance', '0005_alter_attendance_ot_hours'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyAttendanceSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('present_count', models.IntegerField(default=0)),
+                ('half_day_count', models.IntegerField(default=0)),
+                ('absent_count', models.IntegerField(default=0)),
+                ('ot_count', models.IntegerField(default=0)),
+                ('ot_hours', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('salary_amount', models.DecimalField(decimal_places=4, default=Decimal('0.00'), max_digits=16)),
+                ('ot_amount', models.DecimalField(decimal_places=4, default=Decimal('0.00'), max_digits=16)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_summaries', to='companies.company')),
+            ],
+            options={
+                'verbose_name': 'Daily Attendance Summary',
+                'verbose_name_plural': 'Daily Attendance Summaries',
+                'db_table': 'attendance_daily_summary',
+                'ordering': ['-date', 'company'],
+                'indexes': [models.Index(fields=['date'], name='attendance__date_c70d6c_idx')],
+                'unique_together': {('company', 'date')},
+            },
+        ),
+        migrations.RunPython(backfill_daily_summaries, migrations.RunPython.noop),
+    ]
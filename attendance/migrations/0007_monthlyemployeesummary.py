@@ -0,0 +1,95 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:13
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Case, Count, DecimalField, F, Q, Sum, Value, When
+from django.db.models.functions import Coalesce, TruncMonth
+import django.db.models.deletion
+
+
+def backfill_monthly_summaries(apps, schema_editor):
+    # Same GROUP BY as rollups.build_monthly_summaries over every month - writes
+    # after this migration only apply deltas, so the table has to start out complete
+    Attendance = apps.get_model('attendance', 'Attendance')
+    MonthlyEmployeeSummary = apps.get_model('attendance', 'MonthlyEmployeeSummary')
+    zero = Value(Decimal('0.00'))
+    amount = DecimalField(max_digits=16, decimal_places=4)
+    rate = Coalesce('employee__salary_per_day', zero)
+    rows = Attendance.objects.order_by().values(
+        'employee_id',
+        summary_company=F('employee__company_id'),
+        summary_month=TruncMonth('date'),
+    ).annotate(
+        present=Count('id', filter=Q(status='PRESENT')),
+        half=Count('id', filter=Q(status='HALF_DAY')),
+        absent=Count('id', filter=Q(status='ABSENT')),
+        ot_count=Count('id', filter=Q(has_ot=True)),
+        total_ot_hours=Coalesce(Sum('ot_hours', filter=Q(has_ot=True)), zero),
+        salary=Sum(Case(
+            When(status='PRESENT', then=rate),
+            When(status='HALF_DAY', then=rate / 2),
+            default=zero,
+            output_field=amount
+        )),
+        ot=Sum(Case(
+            When(has_ot=True, then=Coalesce('ot_hours', zero) * Coalesce('employee__ot_per_hour', zero)),
+            default=zero,
+            output_field=amount
+        )),
+    )
+    MonthlyEmployeeSummary.objects.bulk_create(
+        [
+            MonthlyEmployeeSummary(
+                employee_id=row['employee_id'],
+                company_id=row['summary_company'],
+                month=row['summary_month'],
+                present_days=row['present'],
+                half_days=row['half'],
+                absent_days=row['absent'],
+                ot_days=row['ot_count'],
+                ot_hours=row['total_ot_hours'],
+                salary_amount=row['salary'],
+                ot_amount=row['ot'],
+            )
+            for row in rows.iterator()
+        ],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0005_employee_whatsapp_number'),
+        ('companies', '0001_initial'),
+        ('attendance', '0006_dailyattendancesummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyEmployeeSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('present_days', models.IntegerField(default=0)),
+                ('half_days', models.IntegerField(default=0)),
+                ('absent_days', models.IntegerField(default=0)),
+                ('ot_days', models.IntegerField(default=0)),
+                ('ot_hours', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('salary_amount', models.DecimalField(decimal_places=4, default=Decimal('0.00'), max_digits=16)),
+                ('ot_amount', models.DecimalField(decimal_places=4, default=Decimal('0.00'), max_digits=16)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_summaries', to='companies.company')),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_summaries', to='employees.employee')),
+            ],
+            options={
+                'verbose_name': 'Monthly Employee Summary',
+                'verbose_name_plural': 'Monthly Employee Summaries',
+                'db_table': 'attendance_monthly_summary',
+                'ordering': ['-month', 'employee'],
+                'indexes': [models.Index(fields=['month', 'company'], name='attendance__month_ac7d8d_idx')],
+                'unique_together': {('employee', 'month')},
+            },
+        ),
+        migrations.RunPython(backfill_monthly_summaries, migrations.RunPython.noop),
+    ]
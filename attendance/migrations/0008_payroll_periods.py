@@ -0,0 +1,98 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:17
+
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('employees', '0005_employee_whatsapp_number'),
+        ('attendance', '0007_monthlyemployeesummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayrollPeriod',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_date', models.DateField()),
+                ('to_date', models.DateField()),
+                ('closed_at', models.DateTimeField(auto_now_add=True)),
+                ('remarks', models.CharField(blank=True, max_length=255, null=True)),
+                ('closed_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='payroll_periods_closed', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Payroll Period',
+                'verbose_name_plural': 'Payroll Periods',
+                'db_table': 'payroll_periods',
+                'ordering': ['-from_date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PayrollEmployeeSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('employee_code', models.CharField(max_length=50)),
+                ('employee_name', models.CharField(max_length=201)),
+                ('company_name', models.CharField(max_length=200)),
+                ('salary_per_day', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('ot_per_hour', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('present_days', models.IntegerField(default=0)),
+                ('half_days', models.IntegerField(default=0)),
+                ('absent_days', models.IntegerField(default=0)),
+                ('ot_days', models.IntegerField(default=0)),
+                ('ot_hours', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('salary_amount', models.DecimalField(decimal_places=4, default=Decimal('0.00'), max_digits=16)),
+                ('ot_amount', models.DecimalField(decimal_places=4, default=Decimal('0.00'), max_digits=16)),
+                ('company', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='payroll_employee_snapshots', to='companies.company')),
+                ('employee', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='payroll_snapshots', to='employees.employee')),
+                ('period', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='employee_snapshots', to='attendance.payrollperiod')),
+            ],
+            options={
+                'verbose_name': 'Payroll Employee Snapshot',
+                'verbose_name_plural': 'Payroll Employee Snapshots',
+                'db_table': 'payroll_employee_snapshots',
+                'ordering': ['period', 'company_name', 'employee_code'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PayrollCompanySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('company_name', models.CharField(max_length=200)),
+                ('employee_count', models.IntegerField(default=0)),
+                ('present_count', models.IntegerField(default=0)),
+                ('half_day_count', models.IntegerField(default=0)),
+                ('absent_count', models.IntegerField(default=0)),
+                ('ot_count', models.IntegerField(default=0)),
+                ('ot_hours', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('salary_amount', models.DecimalField(decimal_places=4, default=Decimal('0.00'), max_digits=16)),
+                ('ot_amount', models.DecimalField(decimal_places=4, default=Decimal('0.00'), max_digits=16)),
+                ('company', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='payroll_snapshots', to='companies.company')),
+                ('period', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='company_snapshots', to='attendance.payrollperiod')),
+            ],
+            options={
+                'verbose_name': 'Payroll Company Snapshot',
+                'verbose_name_plural': 'Payroll Company Snapshots',
+                'db_table': 'payroll_company_snapshots',
+                'ordering': ['period', 'company_name'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='payrollperiod',
+            index=models.Index(fields=['from_date', 'to_date'], name='payroll_per_from_da_e7f57b_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='payrollemployeesnapshot',
+            unique_together={('period', 'employee')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='payrollcompanysnapshot',
+            unique_together={('period', 'company')},
+        ),
+    ]
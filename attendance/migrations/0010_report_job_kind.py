@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0009_report_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportjob',
+            name='kind',
+            field=models.CharField(choices=[('REPORT', 'Attendance report'), ('SALARY_SLIPS', 'Salary slips')], default='REPORT', max_length=20),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:43
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Concat
+
+
+def copy_employee_names(apps, schema_editor):
+    Attendance = apps.get_model('attendance', 'Attendance')
+    Employee = apps.get_model('employees', 'Employee')
+    full_name = Employee.objects.filter(pk=OuterRef('employee_id')).annotate(
+        full_name=Concat('first_name', Value(' '), 'last_name')
+    ).values('full_name')[:1]
+    Attendance.objects.update(employee_name=Subquery(full_name))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0010_report_job_kind'),
+        ('employees', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendance',
+            name='employee_name',
+            field=models.CharField(blank=True, default='', editable=False, max_length=201),
+        ),
+        migrations.RunPython(copy_employee_names, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['-date', 'employee_name', 'id'], name='attendance_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 12:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0011_attendance_keyset'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reportjob',
+            name='kind',
+            field=models.CharField(choices=[('REPORT', 'Attendance report'), ('SALARY_SLIPS', 'Salary slips'), ('COMPANY_BUNDLE', 'All companies export')], default='REPORT', max_length=20),
+        ),
+    ]
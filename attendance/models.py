@@ -1,9 +1,54 @@
 from django.db import models
+from django.db.models import Case, DecimalField, F, Value, When
+from django.db.models.functions import Coalesce
 from django.conf import settings
+from companies.models import Company
 from employees.models import Employee
 from decimal import Decimal
 
 
+def day_amounts(status, has_ot, ot_hours, salary_per_day, ot_per_hour):
+    """Calculate (day_salary, ot_amount) from raw values, same rules as Attendance properties"""
+    salary_per_day = salary_per_day or Decimal('0.00')
+    if status == 'PRESENT':
+        day_salary = salary_per_day
+    elif status == 'HALF_DAY':
+        day_salary = salary_per_day / 2
+    else:
+        day_salary = Decimal('0.00')
+    
+    if has_ot and ot_hours:
+        ot_amount = ot_hours * (ot_per_hour or Decimal('0.00'))
+    else:
+        ot_amount = Decimal('0.00')
+    return day_salary, ot_amount
+
+
+def day_salary_expression(prefix=''):
+    """SQL expression for Attendance.day_salary (prefix is the path to Attendance)"""
+    zero = Value(Decimal('0.00'))
+    rate = Coalesce(f'{prefix}employee__salary_per_day', zero)
+    return Case(
+        When(**{f'{prefix}status': 'PRESENT'}, then=rate),
+        When(**{f'{prefix}status': 'HALF_DAY'}, then=rate / 2),
+        default=zero,
+        output_field=DecimalField(max_digits=16, decimal_places=4)
+    )
+
+
+def ot_amount_expression(prefix=''):
+    """SQL expression for Attendance.ot_amount (prefix is the path to Attendance)"""
+    zero = Value(Decimal('0.00'))
+    return Case(
+        When(
+            **{f'{prefix}has_ot': True},
+            then=Coalesce(f'{prefix}ot_hours', zero) * Coalesce(f'{prefix}employee__ot_per_hour', zero)
+        ),
+        default=zero,
+        output_field=DecimalField(max_digits=16, decimal_places=4)
+    )
+
+
 class Attendance(models.Model):
     """Attendance model for tracking employee attendance"""
     
@@ -20,6 +65,8 @@ class Attendance(models.Model):
     )
     date = models.DateField()
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PRESENT')
+    # Copy of the employee's full name - second key of the keyset pagination order
+    employee_name = models.CharField(max_length=201, blank=True, default='', editable=False)
     
     # OT as separate Yes/No field
     has_ot = models.BooleanField(default=False, help_text='Did employee work overtime?')
@@ -53,6 +100,9 @@ class Attendance(models.Model):
     )
     edited_at = models.DateTimeField(null=True, blank=True)
     
+    # Fields that determine an attendance record's share of the rollup tables
+    ROLLUP_FIELDS = ('employee_id', 'date', 'status', 'has_ot', 'ot_hours')
+    
     class Meta:
         db_table = 'attendance'
         verbose_name = 'Attendance'
@@ -65,17 +115,31 @@ class Attendance(models.Model):
             models.Index(fields=['status']),
             models.Index(fields=['marked_by']),
             models.Index(fields=['-date', 'employee']),
+            models.Index(fields=['-date', 'employee_name', 'id'], name='attendance_keyset_idx'),
         ]
     
     def __str__(self):
         ot_str = " + OT" if self.has_ot else ""
         return f"{self.employee.get_full_name()} - {self.date} - {self.get_status_display()}{ot_str}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored values so rollups can apply only the difference
+        if all(name in field_names for name in cls.ROLLUP_FIELDS):
+            instance._rollup_state = instance.get_rollup_state()
+        return instance
+    
+    def get_rollup_state(self):
+        """Current values of ROLLUP_FIELDS as a tuple"""
+        return tuple(getattr(self, name) for name in self.ROLLUP_FIELDS)
+    
     def save(self, *args, **kwargs):
         # Clear OT hours if no OT
         if not self.has_ot:
             self.ot_hours = None
             self.ot_remarks = None
+        self.employee_name = self.employee.get_full_name()
         super().save(*args, **kwargs)
     
     @property
@@ -100,3 +164,277 @@ class Attendance(models.Model):
     def total_amount(self):
         """Calculate total amount (day salary + OT)"""
         return self.day_salary + self.ot_amount
+
+
+class DailyAttendanceSummary(models.Model):
+    """Per company, per day attendance totals kept in step with Attendance writes"""
+    
+    company = models.ForeignKey(
+        Company,
+        on_delete=models.CASCADE,
+        related_name='daily_summaries'
+    )
+    date = models.DateField()
+    present_count = models.IntegerField(default=0)
+    half_day_count = models.IntegerField(default=0)
+    absent_count = models.IntegerField(default=0)
+    ot_count = models.IntegerField(default=0)
+    ot_hours = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    
+    # Four decimals so half-day and OT amounts are stored exactly
+    salary_amount = models.DecimalField(max_digits=16, decimal_places=4, default=Decimal('0.00'))
+    ot_amount = models.DecimalField(max_digits=16, decimal_places=4, default=Decimal('0.00'))
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'attendance_daily_summary'
+        verbose_name = 'Daily Attendance Summary'
+        verbose_name_plural = 'Daily Attendance Summaries'
+        ordering = ['-date', 'company']
+        unique_together = ['company', 'date']
+        indexes = [
+            models.Index(fields=['date']),
+        ]
+    
+    def __str__(self):
+        return f"{self.company} - {self.date}"
+    
+    @property
+    def total_count(self):
+        return self.present_count + self.half_day_count + self.absent_count
+    
+    @property
+    def total_amount(self):
+        return self.salary_amount + self.ot_amount
+
+
+class MonthlyEmployeeSummary(models.Model):
+    """Per employee, per month payroll totals built with one INSERT ... SELECT per month"""
+    
+    employee = models.ForeignKey(
+        Employee,
+        on_delete=models.CASCADE,
+        related_name='monthly_summaries'
+    )
+    company = models.ForeignKey(
+        Company,
+        on_delete=models.CASCADE,
+        related_name='monthly_summaries'
+    )
+    month = models.DateField(help_text='First day of the month')
+    present_days = models.IntegerField(default=0)
+    half_days = models.IntegerField(default=0)
+    absent_days = models.IntegerField(default=0)
+    ot_days = models.IntegerField(default=0)
+    ot_hours = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    salary_amount = models.DecimalField(max_digits=16, decimal_places=4, default=Decimal('0.00'))
+    ot_amount = models.DecimalField(max_digits=16, decimal_places=4, default=Decimal('0.00'))
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'attendance_monthly_summary'
+        verbose_name = 'Monthly Employee Summary'
+        verbose_name_plural = 'Monthly Employee Summaries'
+        ordering = ['-month', 'employee']
+        unique_together = ['employee', 'month']
+        indexes = [
+            models.Index(fields=['month', 'company']),
+        ]
+    
+    def __str__(self):
+        return f"{self.employee} - {self.month:%b %Y}"
+    
+    @property
+    def total_amount(self):
+        return self.salary_amount + self.ot_amount
+
+
+class PayrollPeriod(models.Model):
+    """A paid date range - its attendance is locked and its totals are frozen in snapshots"""
+    
+    from_date = models.DateField()
+    to_date = models.DateField()
+    closed_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='payroll_periods_closed'
+    )
+    closed_at = models.DateTimeField(auto_now_add=True)
+    remarks = models.CharField(max_length=255, blank=True, null=True)
+    
+    class Meta:
+        db_table = 'payroll_periods'
+        verbose_name = 'Payroll Period'
+        verbose_name_plural = 'Payroll Periods'
+        ordering = ['-from_date']
+        indexes = [
+            models.Index(fields=['from_date', 'to_date']),
+        ]
+    
+    def __str__(self):
+        return f"{self.from_date} to {self.to_date}"
+    
+    @classmethod
+    def covering(cls, day, lock=False):
+        """The closed period that contains day, or None
+
+        lock=True is for attendance writes and must run inside their
+        transaction: on PostgreSQL the FOR UPDATE lookup waits for a period
+        being closed and keeps close_period() out until the write commits.
+        """
+        periods = cls.objects.filter(from_date__lte=day, to_date__gte=day)
+        if lock:
+            periods = periods.select_for_update()
+        return periods.first()
+
+
+class PayrollEmployeeSnapshot(models.Model):
+    """Frozen per employee totals of a closed payroll period"""
+    
+    period = models.ForeignKey(
+        PayrollPeriod,
+        on_delete=models.CASCADE,
+        related_name='employee_snapshots'
+    )
+    # Names, codes and rates are copied so later edits to the employee don't change history
+    employee = models.ForeignKey(
+        Employee,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='payroll_snapshots'
+    )
+    company = models.ForeignKey(
+        Company,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='payroll_employee_snapshots'
+    )
+    employee_code = models.CharField(max_length=50)
+    employee_name = models.CharField(max_length=201)
+    company_name = models.CharField(max_length=200)
+    salary_per_day = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    ot_per_hour = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    present_days = models.IntegerField(default=0)
+    half_days = models.IntegerField(default=0)
+    absent_days = models.IntegerField(default=0)
+    ot_days = models.IntegerField(default=0)
+    ot_hours = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    salary_amount = models.DecimalField(max_digits=16, decimal_places=4, default=Decimal('0.00'))
+    ot_amount = models.DecimalField(max_digits=16, decimal_places=4, default=Decimal('0.00'))
+    
+    class Meta:
+        db_table = 'payroll_employee_snapshots'
+        verbose_name = 'Payroll Employee Snapshot'
+        verbose_name_plural = 'Payroll Employee Snapshots'
+        ordering = ['period', 'company_name', 'employee_code']
+        unique_together = ['period', 'employee']
+    
+    def __str__(self):
+        return f"{self.employee_name} - {self.period}"
+    
+    @property
+    def total_amount(self):
+        return self.salary_amount + self.ot_amount
+
+
+class PayrollCompanySnapshot(models.Model):
+    """Frozen per company totals of a closed payroll period"""
+    
+    period = models.ForeignKey(
+        PayrollPeriod,
+        on_delete=models.CASCADE,
+        related_name='company_snapshots'
+    )
+    company = models.ForeignKey(
+        Company,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='payroll_snapshots'
+    )
+    company_name = models.CharField(max_length=200)
+    employee_count = models.IntegerField(default=0)
+    present_count = models.IntegerField(default=0)
+    half_day_count = models.IntegerField(default=0)
+    absent_count = models.IntegerField(default=0)
+    ot_count = models.IntegerField(default=0)
+    ot_hours = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    salary_amount = models.DecimalField(max_digits=16, decimal_places=4, default=Decimal('0.00'))
+    ot_amount = models.DecimalField(max_digits=16, decimal_places=4, default=Decimal('0.00'))
+    
+    class Meta:
+        db_table = 'payroll_company_snapshots'
+        verbose_name = 'Payroll Company Snapshot'
+        verbose_name_plural = 'Payroll Company Snapshots'
+        ordering = ['period', 'company_name']
+        unique_together = ['period', 'company']
+    
+    def __str__(self):
+        return f"{self.company_name} - {self.period}"
+    
+    @property
+    def total_count(self):
+        return self.present_count + self.half_day_count + self.absent_count
+    
+    @property
+    def total_amount(self):
+        return self.salary_amount + self.ot_amount
+
+
+class ReportJob(models.Model):
+    """A report export generated in the background by the report worker"""
+    
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('RUNNING', 'Running'),
+        ('DONE', 'Done'),
+        ('FAILED', 'Failed'),
+    ]
+    
+    KIND_CHOICES = [
+        ('REPORT', 'Attendance report'),
+        ('SALARY_SLIPS', 'Salary slips'),
+        ('COMPANY_BUNDLE', 'All companies export'),
+    ]
+    
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='report_jobs'
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default='REPORT')
+    # Normalized filters the worker runs with
+    params = models.JSONField(default=dict)
+    # Identical requests (same filters, scope and data versions) share one job
+    dedupe_key = models.CharField(max_length=128, db_index=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    total_rows = models.IntegerField(default=0)
+    rows_done = models.IntegerField(default=0)
+    progress = models.IntegerField(default=0, help_text='Percent complete')
+    file = models.FileField(upload_to='report_jobs/', blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Refreshed by the worker while the job runs - a stale heartbeat means the worker died
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'report_jobs'
+        verbose_name = 'Report Job'
+        verbose_name_plural = 'Report Jobs'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"Report job #{self.pk} ({self.get_status_display()})"
+    
+    @property
+    def filename(self):
+        return self.file.name.rsplit('/', 1)[-1] if self.file else ''
+    
+    @property
+    def is_finished(self):
+        return self.status in ('DONE', 'FAILED')
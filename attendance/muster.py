@@ -0,0 +1,112 @@
+"""Monthly muster roll - one row per employee with a status code for every day of the month
+
+A company's month is read in one query ordered by employee and date and
+pivoted in a single pass, so rows can be streamed to the page or a CSV while
+only the current employee's days are held in memory.
+"""
+import calendar
+from decimal import Decimal
+from .exports import EXPORT_CHUNK_SIZE
+from .models import Attendance, DailyAttendanceSummary
+from .rows import CompactRow
+
+# Cell codes of the muster roll; days without a record stay blank
+STATUS_CODES = {'PRESENT': 'P', 'HALF_DAY': 'H', 'ABSENT': 'A'}
+
+MUSTER_FIELDS = (
+    'employee_id', 'employee__employee_code', 'employee_name', 'employee__designation',
+    'date', 'status', 'has_ot', 'ot_hours',
+)
+
+
+class MusterRow(CompactRow):
+    __slots__ = (
+        'employee_id', 'employee_code', 'employee_name', 'designation', 'days',
+        'present_count', 'half_day_count', 'absent_count', 'ot_hours',
+    )
+
+    @property
+    def paid_days(self):
+        return self.present_count + Decimal(self.half_day_count) / 2
+
+
+def month_range(month):
+    """First and last day of the month of a date"""
+    first = month.replace(day=1)
+    return first, first.replace(day=calendar.monthrange(first.year, first.month)[1])
+
+
+def muster_rows(company_id, month):
+    """MusterRows of a company's month, one per employee with attendance, in name order"""
+    first, last = month_range(month)
+    records = Attendance.objects.filter(
+        employee__company_id=company_id,
+        date__gte=first,
+        date__lte=last
+    ).order_by('employee_name', 'employee_id', 'date').values_list(*MUSTER_FIELDS)
+
+    row = None
+    for employee_id, code, name, designation, day, status, has_ot, ot_hours in records.iterator(
+        chunk_size=EXPORT_CHUNK_SIZE
+    ):
+        if row is None or row.employee_id != employee_id:
+            if row is not None:
+                yield row
+            row = MusterRow(employee_id, code, name, designation, [''] * last.day, 0, 0, 0, Decimal('0.00'))
+        row.days[day.day - 1] = STATUS_CODES.get(status, '')
+        if status == 'PRESENT':
+            row.present_count += 1
+        elif status == 'HALF_DAY':
+            row.half_day_count += 1
+        elif status == 'ABSENT':
+            row.absent_count += 1
+        if has_ot and ot_hours:
+            row.ot_hours += ot_hours
+    if row is not None:
+        yield row
+
+
+def muster_totals(company_id, month):
+    """Per-day present counts and month totals of a company, from the daily rollup"""
+    first, last = month_range(month)
+    totals = {
+        'day_present': [0] * last.day,
+        'present_count': 0,
+        'half_day_count': 0,
+        'absent_count': 0,
+        'ot_hours': Decimal('0.00'),
+    }
+    summaries = DailyAttendanceSummary.objects.filter(
+        company_id=company_id, date__gte=first, date__lte=last
+    ).values_list('date', 'present_count', 'half_day_count', 'absent_count', 'ot_hours')
+    for day, present_count, half_day_count, absent_count, ot_hours in summaries:
+        totals['day_present'][day.day - 1] = present_count
+        totals['present_count'] += present_count
+        totals['half_day_count'] += half_day_count
+        totals['absent_count'] += absent_count
+        totals['ot_hours'] += ot_hours
+    totals['paid_days'] = totals['present_count'] + Decimal(totals['half_day_count']) / 2
+    totals['total_count'] = totals['present_count'] + totals['half_day_count'] + totals['absent_count']
+    return totals
+
+
+def iter_muster_csv_rows(company_id, month):
+    """Yield CSV rows (header, one per employee, per-day present counts and totals)"""
+    first, last = month_range(month)
+    yield [
+        'Employee Code', 'Employee Name', 'Designation', *range(1, last.day + 1),
+        'Present', 'Half Day', 'Absent', 'Paid Days', 'OT Hours',
+    ]
+    for row in muster_rows(company_id, first):
+        yield [
+            row.employee_code, row.employee_name, row.designation, *row.days,
+            row.present_count, row.half_day_count, row.absent_count, row.paid_days, row.ot_hours,
+        ]
+
+    totals = muster_totals(company_id, first)
+    yield []
+    yield [
+        '', '', 'PRESENT PER DAY:', *totals['day_present'],
+        totals['present_count'], totals['half_day_count'], totals['absent_count'],
+        totals['paid_days'], totals['ot_hours'],
+    ]
@@ -0,0 +1,109 @@
+"""Keyset (seek) pagination of attendance on (-date, employee_name, id)
+
+A page is found by seeking past the last row of the previous page through
+the matching attendance index, so every page costs the same as the first.
+Cursors carry the sort key of a boundary row and are passed in the URL as
+?after=... (next page) or ?before=... (previous page).
+"""
+import base64
+import json
+from datetime import date
+from django.db.models import Q
+
+PAGE_SIZE = 100
+
+ORDERING = ('-date', 'employee_name', 'id')
+REVERSE_ORDERING = ('date', '-employee_name', '-id')
+
+
+def encode_cursor(row):
+    key = [row.date.isoformat(), row.employee_name, row.pk]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """(date, employee_name, id) of a cursor, or None when it is missing or malformed"""
+    if not token:
+        return None
+    try:
+        day, name, pk = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        return date.fromisoformat(day), str(name), int(pk)
+    except (ValueError, TypeError):
+        return None
+
+
+def _after(key):
+    day, name, pk = key
+    # The plain date bound is what the index scan starts from, the rest filters the boundary day
+    return Q(date__lte=day) & (
+        Q(date__lt=day) | Q(employee_name__gt=name) | Q(employee_name=name, id__gt=pk)
+    )
+
+
+def _before(key):
+    day, name, pk = key
+    return Q(date__gte=day) & (
+        Q(date__gt=day) | Q(employee_name__lt=name) | Q(employee_name=name, id__lt=pk)
+    )
+
+
+class KeysetPage:
+    """One page of rows with the cursors of its neighbours"""
+
+    def __init__(self, rows, next_cursor=None, prev_cursor=None):
+        self.rows = rows
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_other_pages(self):
+        return bool(self.next_cursor or self.prev_cursor)
+
+
+def keyset_page(attendance_records, build_rows, after='', before='', page_size=PAGE_SIZE):
+    """Page of attendance_records after or before a cursor (the first page without one)
+
+    build_rows turns the sliced queryset into rows with date, employee_name
+    and pk attributes, e.g. rows.list_rows.
+    """
+    before_key = decode_cursor(before)
+    after_key = None if before_key else decode_cursor(after)
+
+    if before_key:
+        page = attendance_records.filter(_before(before_key)).order_by(*REVERSE_ORDERING)
+        rows = build_rows(page[:page_size + 1])
+        has_prev = len(rows) > page_size
+        if not has_prev:
+            # Back at the start - show a full first page rather than the remainder
+            return keyset_page(attendance_records, build_rows, page_size=page_size)
+        rows = rows[:page_size][::-1]
+        has_next = True
+    else:
+        page = attendance_records.order_by(*ORDERING)
+        if after_key:
+            page = page.filter(_after(after_key))
+        rows = build_rows(page[:page_size + 1])
+        has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        has_prev = after_key is not None
+
+    if not rows:
+        return KeysetPage(rows)
+    return KeysetPage(
+        rows,
+        next_cursor=encode_cursor(rows[-1]) if has_next else None,
+        prev_cursor=encode_cursor(rows[0]) if has_prev else None,
+    )
+
+
+def page_urls(query_params, page):
+    """Query strings of the next and previous page, keeping the other filters"""
+    urls = {}
+    for name, cursor in (('next', page.next_cursor), ('prev', page.prev_cursor)):
+        if cursor:
+            params = query_params.copy()
+            params.pop('after', None)
+            params.pop('before', None)
+            params['after' if name == 'next' else 'before'] = cursor
+            urls[f'{name}_url'] = f'?{params.urlencode()}'
+    return urls
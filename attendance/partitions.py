@@ -0,0 +1,258 @@
+"""Optional monthly range partitioning of the attendance table (PostgreSQL only)
+
+partition_attendance() rebuilds `attendance` as a table partitioned by month
+on `date`, with one partition per month plus a default partition for dates
+no monthly partition covers, and unpartition_attendance() turns it back into
+a plain table. Both copy the rows in one transaction and recreate every
+constraint and index under its old name. A partitioned table's primary key
+and unique constraints have to include `date`, so the primary key becomes
+(id, date); the (employee, date) unique constraint already includes it and
+stays exactly as it was.
+
+Partitions for coming months are created ahead of time by
+ensure_partitions() (manage.py create_attendance_partitions).
+"""
+import re
+from datetime import date
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from .models import Attendance
+
+TABLE = Attendance._meta.db_table
+PK_COLUMN = Attendance._meta.pk.column
+DATE_COLUMN = Attendance._meta.get_field('date').column
+DEFAULT_PARTITION = f'{TABLE}_default'
+
+# Months after the current one that always have a partition
+PARTITION_MONTHS_AHEAD = getattr(settings, 'ATTENDANCE_PARTITION_MONTHS_AHEAD', 3)
+
+_partition_name = re.compile(rf'^{re.escape(TABLE)}_y(\d{{4}})m(\d{{2}})$')
+
+
+class PartitioningError(Exception):
+    """Raised when the attendance table cannot be (un)partitioned as asked"""
+
+
+def partitioning_supported():
+    """Declarative partitioning is only available on PostgreSQL"""
+    return connection.vendor == 'postgresql'
+
+
+def _quote(name):
+    return connection.ops.quote_name(name)
+
+
+def partition_name(month):
+    return f'{TABLE}_y{month:%Y}m{month:%m}'
+
+
+def is_partitioned(cursor):
+    cursor.execute('SELECT relkind FROM pg_class WHERE oid = %s::regclass', [TABLE])
+    return cursor.fetchone()[0] == 'p'
+
+
+def partitions(cursor):
+    """Names of the table's partitions - {first day of month: name} and whether the default one exists"""
+    cursor.execute("""
+        SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = %s::regclass
+    """, [TABLE])
+    months = {}
+    has_default = False
+    for (name,) in cursor.fetchall():
+        if name == DEFAULT_PARTITION:
+            has_default = True
+        elif match := _partition_name.match(name):
+            months[date(int(match[1]), int(match[2]), 1)] = name
+    return months, has_default
+
+
+def _definitions(cursor):
+    """Constraints and plain indexes of the table, to recreate them on its replacement"""
+    cursor.execute("""
+        SELECT c.conname, c.contype, pg_get_constraintdef(c.oid),
+               ARRAY(SELECT a.attname::text FROM pg_attribute a
+                     WHERE a.attrelid = c.conrelid AND a.attnum = ANY(c.conkey))
+        FROM pg_constraint c
+        WHERE c.conrelid = %s::regclass AND c.contype IN ('p', 'u', 'f', 'c')
+        ORDER BY c.contype = 'f', c.conname
+    """, [TABLE])
+    constraints = cursor.fetchall()
+    cursor.execute("""
+        SELECT i.relname, pg_get_indexdef(i.oid), x.indisunique,
+               ARRAY(SELECT a.attname::text FROM pg_attribute a
+                     WHERE a.attrelid = x.indrelid AND a.attnum = ANY(x.indkey))
+        FROM pg_index x JOIN pg_class i ON i.oid = x.indexrelid
+        WHERE x.indrelid = %s::regclass
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = x.indexrelid AND c.conrelid = x.indrelid)
+        ORDER BY i.relname
+    """, [TABLE])
+    # Indexes of a partitioned table are defined ON ONLY the parent
+    indexes = [(name, definition.replace(' ON ONLY ', ' ON '), unique, columns)
+               for name, definition, unique, columns in cursor.fetchall()]
+    return constraints, indexes
+
+
+def _sequence_state(cursor):
+    cursor.execute('SELECT pg_get_serial_sequence(%s, %s)', [TABLE, PK_COLUMN])
+    sequence = cursor.fetchone()[0]
+    cursor.execute(f'SELECT last_value, is_called FROM {sequence}')
+    return cursor.fetchone()
+
+
+def _recreate(cursor, constraints, indexes, primary_key):
+    """Add the saved constraints and indexes to the (new) table under their old names"""
+    table = _quote(TABLE)
+    for name, kind, definition, _ in constraints:
+        if kind == 'p':
+            definition = f"PRIMARY KEY ({', '.join(_quote(column) for column in primary_key)})"
+        cursor.execute(f'ALTER TABLE {table} ADD CONSTRAINT {_quote(name)} {definition}')
+    for _, definition, _, _ in indexes:
+        cursor.execute(definition)
+
+
+def _copy_into(cursor, new_table):
+    """Move all rows into new_table, drop the old table and give new_table its name"""
+    cursor.execute(f'INSERT INTO {_quote(new_table)} SELECT * FROM {_quote(TABLE)}')
+    copied = cursor.rowcount
+    cursor.execute(f'DROP TABLE {_quote(TABLE)}')
+    cursor.execute(f'ALTER TABLE {_quote(new_table)} RENAME TO {_quote(TABLE)}')
+    return copied
+
+
+def _create_partition(cursor, month, has_default):
+    """Create the partition of a month, moving its rows out of the default partition"""
+    start, end = month, month + relativedelta(months=1)
+    table, name, default = _quote(TABLE), _quote(partition_name(month)), _quote(DEFAULT_PARTITION)
+    strays = 0
+    if has_default:
+        cursor.execute(
+            f'SELECT count(*) FROM {default} WHERE {_quote(DATE_COLUMN)} >= %s AND {_quote(DATE_COLUMN)} < %s',
+            [start, end]
+        )
+        strays = cursor.fetchone()[0]
+    if strays:
+        # A new partition may not overlap rows of the default one - take them out first
+        cursor.execute(f'ALTER TABLE {table} DETACH PARTITION {default}')
+    cursor.execute(f'CREATE TABLE {name} PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)', [start, end])
+    if strays:
+        where = f'{_quote(DATE_COLUMN)} >= %s AND {_quote(DATE_COLUMN)} < %s'
+        cursor.execute(f'INSERT INTO {name} SELECT * FROM {default} WHERE {where}', [start, end])
+        cursor.execute(f'DELETE FROM {default} WHERE {where}', [start, end])
+        cursor.execute(f'ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT')
+    return strays
+
+
+def _months(first, last):
+    month = first
+    while month <= last:
+        yield month
+        month += relativedelta(months=1)
+
+
+@transaction.atomic
+def ensure_partitions(months_ahead=PARTITION_MONTHS_AHEAD):
+    """Create the missing monthly partitions up to months_ahead months after the current one
+
+    Returns [(partition name, rows moved out of the default partition)].
+    """
+    if not partitioning_supported():
+        raise PartitioningError('Table partitioning needs PostgreSQL.')
+    with connection.cursor() as cursor:
+        if not is_partitioned(cursor):
+            raise PartitioningError(f'The {TABLE} table is not partitioned.')
+        cursor.execute(f'LOCK TABLE {_quote(TABLE)} IN SHARE ROW EXCLUSIVE MODE')
+        existing, has_default = partitions(cursor)
+        this_month = timezone.localdate().replace(day=1)
+        first = min(existing, default=this_month)
+        created = []
+        for month in _months(first, this_month + relativedelta(months=months_ahead)):
+            if month not in existing:
+                created.append((partition_name(month), _create_partition(cursor, month, has_default)))
+        return created
+
+
+@transaction.atomic
+def partition_attendance(months_ahead=PARTITION_MONTHS_AHEAD):
+    """Rebuild the attendance table as a monthly range-partitioned table
+
+    Writes to attendance are blocked while the rows are copied. Returns the
+    number of rows copied and the partitions created.
+    """
+    if not partitioning_supported():
+        raise PartitioningError('Table partitioning needs PostgreSQL.')
+    new_table = f'{TABLE}_partitioned'
+    with connection.cursor() as cursor:
+        if is_partitioned(cursor):
+            raise PartitioningError(f'The {TABLE} table is already partitioned.')
+        cursor.execute(f'LOCK TABLE {_quote(TABLE)} IN ACCESS EXCLUSIVE MODE')
+        constraints, indexes = _definitions(cursor)
+        for name, kind, _, columns in constraints:
+            if kind == 'u' and DATE_COLUMN not in columns:
+                raise PartitioningError(f'Unique constraint {name} does not include {DATE_COLUMN}.')
+        for name, _, unique, columns in indexes:
+            if unique and DATE_COLUMN not in columns:
+                raise PartitioningError(f'Unique index {name} does not include {DATE_COLUMN}.')
+        last_value, is_called = _sequence_state(cursor)
+
+        # NOT NULL carries over; identity, constraints and indexes are added afterwards
+        cursor.execute(
+            f'CREATE TABLE {_quote(new_table)} (LIKE {_quote(TABLE)} INCLUDING STORAGE INCLUDING COMMENTS) '
+            f'PARTITION BY RANGE ({_quote(DATE_COLUMN)})'
+        )
+        cursor.execute(f'SELECT min({_quote(DATE_COLUMN)}) FROM {_quote(TABLE)}')
+        oldest = cursor.fetchone()[0]
+        this_month = timezone.localdate().replace(day=1)
+        first = min(oldest.replace(day=1), this_month) if oldest else this_month
+        created = []
+        for month in _months(first, this_month + relativedelta(months=months_ahead)):
+            cursor.execute(
+                f'CREATE TABLE {_quote(partition_name(month))} PARTITION OF {_quote(new_table)} '
+                f'FOR VALUES FROM (%s) TO (%s)',
+                [month, month + relativedelta(months=1)]
+            )
+            created.append(partition_name(month))
+        cursor.execute(f'CREATE TABLE {_quote(DEFAULT_PARTITION)} PARTITION OF {_quote(new_table)} DEFAULT')
+
+        copied = _copy_into(cursor, new_table)
+        _recreate(cursor, constraints, indexes, primary_key=[PK_COLUMN, DATE_COLUMN])
+
+        # Identity columns on partitioned tables need PostgreSQL 17 - use an owned sequence
+        sequence = _quote(f'{TABLE}_{PK_COLUMN}_seq')
+        cursor.execute(f'CREATE SEQUENCE {sequence} AS bigint OWNED BY {_quote(TABLE)}.{_quote(PK_COLUMN)}')
+        cursor.execute(f"SELECT setval('{sequence}', %s, %s)", [last_value, is_called])
+        cursor.execute(
+            f"ALTER TABLE {_quote(TABLE)} ALTER COLUMN {_quote(PK_COLUMN)} SET DEFAULT nextval('{sequence}')"
+        )
+        cursor.execute(f'ANALYZE {_quote(TABLE)}')
+    return copied, created
+
+
+@transaction.atomic
+def unpartition_attendance():
+    """Turn a partitioned attendance table back into one plain table (the schema the migrations create)"""
+    if not partitioning_supported():
+        raise PartitioningError('Table partitioning needs PostgreSQL.')
+    new_table = f'{TABLE}_unpartitioned'
+    with connection.cursor() as cursor:
+        if not is_partitioned(cursor):
+            raise PartitioningError(f'The {TABLE} table is not partitioned.')
+        cursor.execute(f'LOCK TABLE {_quote(TABLE)} IN ACCESS EXCLUSIVE MODE')
+        constraints, indexes = _definitions(cursor)
+        last_value, is_called = _sequence_state(cursor)
+
+        cursor.execute(
+            f'CREATE TABLE {_quote(new_table)} (LIKE {_quote(TABLE)} INCLUDING STORAGE INCLUDING COMMENTS)'
+        )
+        # Dropping the partitioned table also drops its partitions and sequence
+        copied = _copy_into(cursor, new_table)
+        _recreate(cursor, constraints, indexes, primary_key=[PK_COLUMN])
+
+        cursor.execute(
+            f'ALTER TABLE {_quote(TABLE)} ALTER COLUMN {_quote(PK_COLUMN)} ADD GENERATED BY DEFAULT AS IDENTITY'
+        )
+        cursor.execute('SELECT setval(pg_get_serial_sequence(%s, %s), %s, %s)', [TABLE, PK_COLUMN, last_value, is_called])
+        cursor.execute(f'ANALYZE {_quote(TABLE)}')
+    return copied
@@ -0,0 +1,144 @@
+"""PDF rendering of the attendance report, one page at a time"""
+import tempfile
+from decimal import Decimal
+from django.http import FileResponse
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.units import mm
+from reportlab.pdfgen import canvas
+from reportlab.platypus import Table, TableStyle
+from .exports import CSV_HEADER, iter_report_rows
+
+PAGE_SIZE = landscape(A4)
+MARGIN = 10 * mm
+ROW_HEIGHT = 5 * mm
+HEADER_HEIGHT = 18 * mm
+FOOTER_HEIGHT = 8 * mm
+
+# Fixed row height means a page always holds the same number of rows,
+# so pages are filled straight from the row iterator without measuring
+ROWS_PER_PAGE = int((PAGE_SIZE[1] - 2 * MARGIN - HEADER_HEIGHT - FOOTER_HEIGHT) // ROW_HEIGHT) - 1
+
+# Column widths (mm) and the longest text that fits, in CSV_HEADER order
+COLUMN_WIDTHS = [18, 22, 38, 34, 15, 8, 15, 16, 18, 14, 18, 20, 0]
+COLUMN_WIDTHS[-1] = (PAGE_SIZE[0] - 2 * MARGIN) / mm - sum(COLUMN_WIDTHS)
+MAX_CHARS = [int(width / 1.6) for width in COLUMN_WIDTHS]
+
+AMOUNT_COLUMNS = range(6, 12)
+FONT = 'Helvetica'
+FONT_BOLD = 'Helvetica-Bold'
+FONT_SIZE = 7
+
+# One style object shared by every page table
+TABLE_STYLE = TableStyle([
+    ('FONT', (0, 0), (-1, -1), FONT, FONT_SIZE),
+    ('FONT', (0, 0), (-1, 0), FONT_BOLD, FONT_SIZE),
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0d6efd')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('ALIGN', (AMOUNT_COLUMNS[0], 0), (AMOUNT_COLUMNS[-1], -1), 'RIGHT'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f2f2f2')]),
+    ('LINEBELOW', (0, 0), (-1, -1), 0.25, colors.HexColor('#cccccc')),
+    ('TOPPADDING', (0, 0), (-1, -1), 1),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 1),
+])
+TOTALS_STYLE = TableStyle([
+    ('FONT', (0, 0), (-1, -1), FONT_BOLD, FONT_SIZE + 1),
+    ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
+    ('LINEABOVE', (0, 0), (-1, 0), 1, colors.black),
+])
+
+
+def _cell(value, column):
+    if value is None:
+        return ''
+    if isinstance(value, Decimal):
+        return f'{value:.2f}'
+    text = str(value)
+    limit = MAX_CHARS[column]
+    return text if len(text) <= limit else text[:limit - 1] + '…'
+
+
+class ReportPdfWriter:
+    """Draws report rows onto a canvas, flushing a page table every ROWS_PER_PAGE rows"""
+
+    def __init__(self, output, title, subtitle=''):
+        self.canvas = canvas.Canvas(output, pagesize=PAGE_SIZE, pageCompression=1)
+        self.canvas.setTitle(title)
+        self.title = title
+        self.subtitle = subtitle
+        self.header = [_cell(name, column) for column, name in enumerate(CSV_HEADER)]
+        self.col_widths = [width * mm for width in COLUMN_WIDTHS]
+        self.page_number = 0
+        self.rows = []
+        self.row_count = 0
+
+    def add_row(self, row):
+        self.rows.append([_cell(value, column) for column, value in enumerate(row)])
+        self.row_count += 1
+        if len(self.rows) == ROWS_PER_PAGE:
+            self._flush_page()
+
+    def _draw_page_frame(self):
+        self.page_number += 1
+        width, height = PAGE_SIZE
+        self.canvas.setFont(FONT_BOLD, 12)
+        self.canvas.drawString(MARGIN, height - MARGIN - 5 * mm, self.title)
+        if self.subtitle:
+            self.canvas.setFont(FONT, 8)
+            self.canvas.drawString(MARGIN, height - MARGIN - 10 * mm, self.subtitle)
+        self.canvas.setFont(FONT, 7)
+        self.canvas.drawRightString(width - MARGIN, MARGIN, f'Page {self.page_number}')
+
+    def _draw_page(self):
+        """Draw the page frame and the buffered rows, returning the y of the table bottom"""
+        self._draw_page_frame()
+        top = PAGE_SIZE[1] - MARGIN - HEADER_HEIGHT
+        if not self.rows and self.page_number > 1:
+            return top
+        table = Table([self.header] + self.rows, colWidths=self.col_widths, rowHeights=ROW_HEIGHT)
+        table.setStyle(TABLE_STYLE)
+        _, table_height = table.wrapOn(self.canvas, *PAGE_SIZE)
+        table.drawOn(self.canvas, MARGIN, top - table_height)
+        self.rows = []
+        return top - table_height
+
+    def _flush_page(self):
+        self._draw_page()
+        self.canvas.showPage()
+
+    def finish(self, totals_row=None):
+        """Draw the last page with the totals line and write the file"""
+        bottom = self._draw_page()
+        if totals_row:
+            totals = Table([[_cell(value, column) for column, value in enumerate(totals_row)]],
+                           colWidths=self.col_widths, rowHeights=ROW_HEIGHT + 1 * mm)
+            totals.setStyle(TOTALS_STYLE)
+            totals.wrapOn(self.canvas, *PAGE_SIZE)
+            totals.drawOn(self.canvas, MARGIN, bottom - ROW_HEIGHT - 2 * mm)
+        self.canvas.showPage()
+        self.canvas.save()
+
+
+def write_report_pdf(rows, output, title, subtitle=''):
+    """Render iter_report_rows()-style rows (header, records, blank, totals) as PDF into output"""
+    rows = iter(rows)
+    next(rows, None)  # header - the writer draws its own on every page
+    writer = ReportPdfWriter(output, title, subtitle)
+    totals_row = None
+    for row in rows:
+        if not row:
+            # Blank separator, the totals row follows
+            totals_row = next(rows, None)
+            break
+        writer.add_row(row)
+    writer.finish(totals_row)
+    return writer.row_count
+
+
+def pdf_response(attendance_records, filename, title, subtitle=''):
+    """Render the report into a temporary file and send it as a download"""
+    output = tempfile.TemporaryFile()
+    write_report_pdf(iter_report_rows(attendance_records), output, title, subtitle)
+    output.seek(0)
+    return FileResponse(output, as_attachment=True, filename=filename, content_type='application/pdf')
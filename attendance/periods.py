@@ -0,0 +1,123 @@
+"""Closing payroll periods into frozen snapshots"""
+from decimal import Decimal
+from django.db import connection, transaction
+from companies.models import Company
+from employees.models import Employee
+from .models import Attendance, PayrollCompanySnapshot, PayrollEmployeeSnapshot, PayrollPeriod
+from .rollups import employee_totals
+from . import report_cache
+
+COMPANY_TOTAL_FIELDS = ('present_count', 'half_day_count', 'absent_count', 'ot_count', 'ot_hours', 'salary_amount', 'ot_amount')
+
+
+class PeriodError(Exception):
+    """The requested period cannot be closed"""
+
+
+def overlapping_periods(from_date, to_date):
+    return PayrollPeriod.objects.filter(from_date__lte=to_date, to_date__gte=from_date)
+
+
+@transaction.atomic
+def close_period(from_date, to_date, user=None, remarks=''):
+    """Freeze per employee and per company totals for a date range and lock its attendance"""
+    if from_date > to_date:
+        raise PeriodError('From date must be on or before to date.')
+    if connection.vendor == 'postgresql':
+        # Serializes closes, and waits for attendance writes that hold
+        # PayrollPeriod.covering(lock=True) - the snapshot below sees them
+        # all, and later writes see this period once it is committed
+        cursor = connection.cursor()
+        cursor.execute(f'LOCK TABLE {PayrollPeriod._meta.db_table} IN EXCLUSIVE MODE')
+    overlap = overlapping_periods(from_date, to_date).first()
+    if overlap:
+        raise PeriodError(f'The range overlaps the closed payroll period {overlap}.')
+
+    period = PayrollPeriod.objects.create(
+        from_date=from_date,
+        to_date=to_date,
+        closed_by=user,
+        remarks=remarks
+    )
+
+    # One grouped query over the raw records - the snapshot never depends on rollup state
+    totals = {
+        row['employee_id']: row
+        for row in employee_totals(Attendance.objects.filter(date__gte=from_date, date__lte=to_date))
+    }
+    employees = Employee.objects.filter(pk__in=totals).select_related('company')
+
+    employee_snapshots = []
+    company_totals = {}
+    for employee in employees:
+        row = totals[employee.pk]
+        employee_snapshots.append(PayrollEmployeeSnapshot(
+            period=period,
+            employee=employee,
+            company=employee.company,
+            employee_code=employee.employee_code,
+            employee_name=employee.get_full_name(),
+            company_name=employee.company.name,
+            salary_per_day=employee.salary_per_day,
+            ot_per_hour=employee.ot_per_hour,
+            present_days=row['present_count'],
+            half_days=row['half_day_count'],
+            absent_days=row['absent_count'],
+            ot_days=row['ot_count'],
+            ot_hours=row['total_ot_hours'],
+            salary_amount=row['salary_amount'] or Decimal('0.00'),
+            ot_amount=row['ot_amount'] or Decimal('0.00'),
+        ))
+
+        company = company_totals.setdefault(employee.company_id, PayrollCompanySnapshot(
+            period=period,
+            company=employee.company,
+            company_name=employee.company.name,
+        ))
+        company.employee_count += 1
+        company.present_count += row['present_count']
+        company.half_day_count += row['half_day_count']
+        company.absent_count += row['absent_count']
+        company.ot_count += row['ot_count']
+        company.ot_hours += row['total_ot_hours']
+        company.salary_amount += row['salary_amount'] or Decimal('0.00')
+        company.ot_amount += row['ot_amount'] or Decimal('0.00')
+
+    PayrollEmployeeSnapshot.objects.bulk_create(employee_snapshots, batch_size=1000)
+    PayrollCompanySnapshot.objects.bulk_create(company_totals.values())
+
+    # Reports for the period switch to the snapshots
+    company_ids = list(Company.objects.values_list('id', flat=True))
+    transaction.on_commit(lambda: report_cache.bump_months(company_ids, from_date, to_date))
+    return period
+
+
+def closed_period_for(from_date, to_date):
+    """The closed period with exactly these dates, or None"""
+    return PayrollPeriod.objects.filter(from_date=from_date, to_date=to_date).first()
+
+
+def period_employee_snapshots(period, companies=None, company_id=''):
+    """Employee snapshots of a period, limited to the companies a user may see"""
+    snapshots = period.employee_snapshots.all()
+    if companies is not None:
+        snapshots = snapshots.filter(company__in=companies)
+    if company_id:
+        snapshots = snapshots.filter(company_id=company_id)
+    return snapshots
+
+
+def period_company_totals(period, companies=None, company_id=''):
+    """Summed company snapshots of a period, keyed like rollups.summary_totals()"""
+    snapshots = period.company_snapshots.all()
+    if companies is not None:
+        snapshots = snapshots.filter(company__in=companies)
+    if company_id:
+        snapshots = snapshots.filter(company_id=company_id)
+    totals = dict.fromkeys(COMPANY_TOTAL_FIELDS, 0)
+    for snapshot in snapshots:
+        for name in COMPANY_TOTAL_FIELDS:
+            totals[name] += getattr(snapshot, name)
+    totals['total_count'] = totals['present_count'] + totals['half_day_count'] + totals['absent_count']
+    totals['total_amount'] = totals['salary_amount'] + totals['ot_amount']
+    return totals
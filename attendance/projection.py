@@ -0,0 +1,95 @@
+"""Month-end payroll projection from the daily rollup
+
+Month-to-date cost per company comes from one aggregate over
+DailyAttendanceSummary and the daily run-rate from the company's last
+RUN_RATE_DAYS completed days, so no attendance row is read. Results are cached
+per company until the next attendance write in that company.
+"""
+import math
+from datetime import timedelta
+from decimal import Decimal
+from django.db.models import Count, Sum
+from .models import DailyAttendanceSummary
+from .muster import month_range
+from . import report_cache
+
+# Completed days the daily run-rate is averaged over (two full weeks)
+RUN_RATE_DAYS = 14
+
+# Width of the projected range in standard deviations of the remaining cost
+RANGE_DEVIATIONS = 1
+
+
+def _money(value):
+    return Decimal(value).quantize(Decimal('0.01'))
+
+
+def _project(mtd, daily_costs, days_remaining):
+    """Projection of one company from its month-to-date totals and recent daily costs"""
+    run_rate = sum(daily_costs) / len(daily_costs)
+    spread = math.sqrt(sum((cost - run_rate) ** 2 for cost in daily_costs) / len(daily_costs))
+    # Days are treated as independent draws, so the spread of their sum grows with the square root
+    margin = Decimal(RANGE_DEVIATIONS * spread * math.sqrt(days_remaining))
+    mtd_total = mtd['salary_amount'] + mtd['ot_amount']
+    projected = mtd_total + Decimal(run_rate) * days_remaining
+    return {
+        'mtd_salary': _money(mtd['salary_amount']),
+        'mtd_ot': _money(mtd['ot_amount']),
+        'mtd_total': _money(mtd_total),
+        'days_marked': mtd['days'],
+        'run_rate': _money(run_rate),
+        'projected': _money(projected),
+        'low': _money(max(projected - margin, mtd_total)),
+        'high': _money(projected + margin),
+    }
+
+
+def _compute(company_ids, today):
+    first, last = month_range(today)
+    mtd_rows = DailyAttendanceSummary.objects.filter(
+        company_id__in=company_ids, date__gte=first, date__lt=today
+    ).order_by().values('company_id').annotate(
+        salary_amount=Sum('salary_amount'),
+        ot_amount=Sum('ot_amount'),
+        days=Count('id'),
+    )
+    mtd = {row['company_id']: row for row in mtd_rows}
+
+    # Days without attendance (e.g. weekly offs) count as zero cost
+    window_start = today - timedelta(days=RUN_RATE_DAYS)
+    daily = {pk: [0.0] * RUN_RATE_DAYS for pk in company_ids}
+    recent = DailyAttendanceSummary.objects.filter(
+        company_id__in=company_ids, date__gte=window_start, date__lt=today
+    ).values_list('company_id', 'date', 'salary_amount', 'ot_amount')
+    for company_id, day, salary_amount, ot_amount in recent:
+        daily[company_id][(day - window_start).days] = float(salary_amount + ot_amount)
+
+    empty = {'salary_amount': Decimal('0'), 'ot_amount': Decimal('0'), 'days': 0}
+    days_remaining = (last - today).days + 1
+    return {pk: _project(mtd.get(pk, empty), daily[pk], days_remaining) for pk in company_ids}
+
+
+def payroll_projection(companies, today):
+    """Month-end cost projection per company, as a list of dicts in company order
+
+    Month-to-date totals and the run-rate cover the days before today, which
+    is still being marked; today and the rest of the month are projected.
+    """
+    companies = list(companies.order_by('name').values_list('id', 'name'))
+    company_ids = [pk for pk, _ in companies]
+    # The run-rate window can reach into the previous month
+    keys = report_cache.company_keys(
+        'payroll_projection', company_ids, today - timedelta(days=RUN_RATE_DAYS), today, today=today
+    )
+    cached = report_cache.get_results('payroll_projection', list(keys.values()))
+    missing = [pk for pk in company_ids if keys[pk] not in cached]
+    computed = _compute(missing, today) if missing else {}
+    report_cache.set_results({keys[pk]: projection for pk, projection in computed.items()})
+
+    days_remaining = (month_range(today)[1] - today).days + 1
+    return [{
+        'company_id': pk,
+        'company_name': name,
+        'days_remaining': days_remaining,
+        **(computed[pk] if pk in computed else cached[keys[pk]]),
+    } for pk, name in companies]
@@ -0,0 +1,253 @@
+"""Versioned result cache for the report views
+
+Cached results are keyed by the view, its normalized filters, the user's
+company scope and the current version of every (company, month) the result
+covers. Writes bump only the versions they touch, so a changed month makes
+its own results unreachable while every other cached report stays valid.
+The same versions give the report pages their ETags for conditional GET.
+
+Versions, results and hit/miss counts live in the REPORT_CACHE_ALIAS cache,
+which every web, worker and management command process must share. With a
+per-process backend (local memory or dummy) caching and ETags are disabled -
+a write in one process could not invalidate what the others hold.
+"""
+import hashlib
+import json
+import time
+from datetime import date
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import caches
+from companies.models import Company
+
+# Cache alias of the versions, results and stats - must be shared by all processes
+REPORT_CACHE_ALIAS = getattr(settings, 'REPORT_CACHE_ALIAS', 'reports')
+
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+# How long a computed report stays cached (versions make it safe to keep longer)
+REPORT_CACHE_TIMEOUT = getattr(settings, 'REPORT_CACHE_TIMEOUT', 60 * 60)
+
+VERSION_PREFIX = 'report_version'
+RESULT_PREFIX = 'report_result'
+STATS_PREFIX = 'report_cache_stats'
+
+CACHED_VIEWS = ('reports', 'employee_wise_report', 'payroll_projection', 'attendance_trends')
+
+
+def enabled():
+    """Whether the report cache has a backend shared between processes"""
+    backend = settings.CACHES.get(REPORT_CACHE_ALIAS, {}).get('BACKEND')
+    return backend is not None and backend not in PROCESS_LOCAL_BACKENDS
+
+
+def _cache():
+    return caches[REPORT_CACHE_ALIAS]
+
+
+def _month_key(company_id, month):
+    return f'{VERSION_PREFIX}:{company_id}:{month:%Y-%m}'
+
+
+def _roster_key(company_id):
+    # Employee list and rates of a company - they show up in every month
+    return f'{VERSION_PREFIX}:{company_id}:employees'
+
+
+def _as_month(value):
+    if isinstance(value, str):
+        value = date.fromisoformat(value)
+    return value.replace(day=1)
+
+
+def months_between(from_date, to_date):
+    month, last = _as_month(from_date), _as_month(to_date)
+    months = []
+    while month <= last:
+        months.append(month)
+        month += relativedelta(months=1)
+    return months
+
+
+def _bump(keys):
+    # Every bump writes a fresh clock value rather than incrementing, so
+    # concurrent bumps from different processes cannot collapse into one
+    # and an evicted version never comes back with a value it had before
+    if enabled():
+        _cache().set_many({key: time.time_ns() for key in keys}, timeout=None)
+
+
+def bump_month(company_id, day):
+    """Invalidate cached reports for one company-month"""
+    _bump([_month_key(company_id, _as_month(day))])
+
+
+def bump_months(company_ids, from_date, to_date):
+    """Invalidate cached reports for every month of a range in the given companies"""
+    months = months_between(from_date, to_date)
+    _bump([_month_key(company_id, month) for company_id in company_ids for month in months])
+
+
+def bump_roster(company_id):
+    """Invalidate cached reports of a company after an employee or rate change"""
+    _bump([_roster_key(company_id)])
+
+
+def _scope_company_ids(user, company_id=''):
+    # Supervisors only ever see their assigned companies, even when they have none
+    if user.is_supervisor() or (user.role == 'ADMIN' and user.assigned_companies.exists()):
+        scope = sorted(user.assigned_companies.values_list('id', flat=True))
+    else:
+        scope = sorted(Company.objects.values_list('id', flat=True))
+    if company_id:
+        scope = [pk for pk in scope if str(pk) == str(company_id)]
+    return scope
+
+
+def _current_versions(version_keys):
+    if not enabled():
+        return {}
+    versions = _cache().get_many(version_keys)
+    missing = [key for key in version_keys if key not in versions]
+    if missing:
+        # add() keeps the value of a process that seeded the same key first
+        for key in missing:
+            _cache().add(key, time.time_ns(), timeout=None)
+        versions.update(_cache().get_many(missing))
+    return versions
+
+
+def _versions(company_ids, from_date, to_date):
+    """Current roster versions of the companies, then their versions for every month of the range"""
+    version_keys = [_roster_key(pk) for pk in company_ids]
+    version_keys += [
+        _month_key(pk, month) for pk in company_ids for month in months_between(from_date, to_date)
+    ]
+    versions = _current_versions(version_keys)
+    return [versions.get(key) for key in version_keys]
+
+
+def _digest(view_name, user, filters, from_date, to_date, **extra):
+    company_ids = _scope_company_ids(user, filters.get('company', ''))
+    payload = json.dumps({
+        'view': view_name,
+        'role': user.role,
+        'scope': company_ids,
+        'filters': sorted((name, str(value)) for name, value in filters.items()),
+        'versions': _versions(company_ids, from_date, to_date),
+        **extra,
+    })
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def result_key(view_name, user, filters, from_date, to_date):
+    """Cache key for a report result, or None when the result should not be cached"""
+    return f'{RESULT_PREFIX}:{view_name}:{_digest(view_name, user, filters, from_date, to_date)}'
+
+
+def page_etag(view_name, request, filters, from_date, to_date):
+    """ETag of a page showing the user's companies over a date range, or None when it must be rendered
+
+    Same inputs as result_key() plus the user shown in the page header and the
+    CSRF secret of its forms - it changes whenever a covered company-month or
+    roster version is bumped.
+    """
+    if not enabled():
+        # Without shared versions an ETag could outlive a write made elsewhere
+        return None
+    if len(messages.get_messages(request)):
+        # Flash messages are shown once - a 304 would drop them
+        return None
+    user = request.user
+    return _digest(
+        view_name, user, filters, from_date, to_date,
+        viewer=[user.pk, user.username], csrf=request.META.get('CSRF_COOKIE', '')
+    )
+
+
+def company_keys(view_name, company_ids, from_date, to_date, **filters):
+    """Cache keys of per-company results that do not depend on the user, keyed by company id
+
+    Each key only covers its own company's roster and months, so a write
+    invalidates the result of that company alone.
+    """
+    months = months_between(from_date, to_date)
+    version_keys = {
+        pk: [_roster_key(pk)] + [_month_key(pk, month) for month in months] for pk in company_ids
+    }
+    versions = _current_versions([key for keys in version_keys.values() for key in keys])
+    result_keys = {}
+    for pk, keys in version_keys.items():
+        payload = json.dumps({
+            'view': view_name,
+            'company': pk,
+            'filters': sorted((name, str(value)) for name, value in filters.items()),
+            'versions': [versions.get(key) for key in keys],
+        })
+        result_keys[pk] = f'{RESULT_PREFIX}:{view_name}:{hashlib.sha1(payload.encode()).hexdigest()}'
+    return result_keys
+
+
+def get_results(view_name, keys):
+    """Look up several cached results at once, counting a hit or miss for each key"""
+    if not enabled():
+        return {}
+    results = _cache().get_many(keys)
+    if results:
+        _count(view_name, 'hits', len(results))
+    if len(results) < len(keys):
+        _count(view_name, 'misses', len(keys) - len(results))
+    return results
+
+
+def set_results(results):
+    if enabled():
+        _cache().set_many(results, timeout=REPORT_CACHE_TIMEOUT)
+
+
+def get_result(view_name, key):
+    """Look up a cached result and count the hit or miss"""
+    if not enabled():
+        return None
+    result = _cache().get(key)
+    _count(view_name, 'hits' if result is not None else 'misses')
+    return result
+
+
+def set_result(key, result):
+    if enabled():
+        _cache().set(key, result, timeout=REPORT_CACHE_TIMEOUT)
+
+
+def _count(view_name, outcome, amount=1):
+    key = f'{STATS_PREFIX}:{view_name}:{outcome}'
+    _cache().add(key, 0, timeout=None)
+    try:
+        _cache().incr(key, amount)
+    except ValueError:
+        _cache().set(key, amount, timeout=None)
+
+
+def cache_stats():
+    """Hit and miss counts per cached view"""
+    keys = [f'{STATS_PREFIX}:{name}:{outcome}' for name in CACHED_VIEWS for outcome in ('hits', 'misses')]
+    counts = _cache().get_many(keys)
+    stats = {}
+    for name in CACHED_VIEWS:
+        hits = counts.get(f'{STATS_PREFIX}:{name}:hits', 0)
+        misses = counts.get(f'{STATS_PREFIX}:{name}:misses', 0)
+        total = hits + misses
+        stats[name] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / total if total else 0.0,
+        }
+    return stats
+
+
+def reset_stats():
+    _cache().delete_many([f'{STATS_PREFIX}:{name}:{outcome}' for name in CACHED_VIEWS for outcome in ('hits', 'misses')])
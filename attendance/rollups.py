@@ -0,0 +1,339 @@
+"""Maintenance of the attendance rollup tables"""
+from datetime import date, timedelta
+from decimal import Decimal
+from dateutil.relativedelta import relativedelta
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+from employees.models import Employee
+from .models import (
+    Attendance, DailyAttendanceSummary, MonthlyEmployeeSummary,
+    day_amounts, day_salary_expression, ot_amount_expression
+)
+from .payroll import PayrollFrame
+
+SUMMARY_COUNT_FIELDS = ('present_count', 'half_day_count', 'absent_count', 'ot_count')
+SUMMARY_AMOUNT_FIELDS = ('ot_hours', 'salary_amount', 'ot_amount')
+SUMMARY_FIELDS = SUMMARY_COUNT_FIELDS + SUMMARY_AMOUNT_FIELDS
+
+# DailyAttendanceSummary field -> MonthlyEmployeeSummary field
+MONTHLY_FIELDS = {
+    'present_count': 'present_days',
+    'half_day_count': 'half_days',
+    'absent_count': 'absent_days',
+    'ot_count': 'ot_days',
+    'ot_hours': 'ot_hours',
+    'salary_amount': 'salary_amount',
+    'ot_amount': 'ot_amount',
+}
+
+
+def _as_date(value):
+    # update_or_create() leaves a string date on freshly created records
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _contribution(employee, status, has_ot, ot_hours):
+    """Rollup values a single attendance record adds to its company-day"""
+    if isinstance(ot_hours, str):
+        ot_hours = Decimal(ot_hours)
+    day_salary, ot_amount = day_amounts(status, has_ot, ot_hours, employee.salary_per_day, employee.ot_per_hour)
+    return {
+        'present_count': int(status == 'PRESENT'),
+        'half_day_count': int(status == 'HALF_DAY'),
+        'absent_count': int(status == 'ABSENT'),
+        'ot_count': int(bool(has_ot)),
+        'ot_hours': (ot_hours or Decimal('0.00')) if has_ot else Decimal('0.00'),
+        'salary_amount': day_salary,
+        'ot_amount': ot_amount,
+    }
+
+
+def _apply_delta(company_id, day, delta):
+    """Add delta to a (company, date) row with F() expressions, creating it when needed"""
+    if not any(delta.values()):
+        return
+    changes = {name: F(name) + value for name, value in delta.items()}
+    summaries = DailyAttendanceSummary.objects.filter(company_id=company_id, date=day)
+    if summaries.update(updated_at=timezone.now(), **changes):
+        return
+
+    # Nothing to subtract from - the row is created only when a record is added
+    if sum(delta[name] for name in SUMMARY_COUNT_FIELDS) <= 0:
+        return
+    try:
+        with transaction.atomic():
+            DailyAttendanceSummary.objects.create(company_id=company_id, date=day, **delta)
+    except IntegrityError:
+        # Another request created the row first
+        summaries.update(updated_at=timezone.now(), **changes)
+
+
+def _apply_monthly_delta(employee_id, month, delta):
+    """Add delta to an employee-month row, building the row from raw attendance when missing"""
+    if not any(delta.values()):
+        return
+    changes = {MONTHLY_FIELDS[name]: F(MONTHLY_FIELDS[name]) + value for name, value in delta.items()}
+    summaries = MonthlyEmployeeSummary.objects.filter(employee_id=employee_id, month=month)
+    if not summaries.update(updated_at=timezone.now(), **changes):
+        # Raw attendance already reflects this write, so a rebuild is exact
+        build_monthly_summaries(month, employee_ids=[employee_id])
+
+
+def apply_attendance_change(old_state, new_state, employee=None):
+    """Move an attendance record's rollup contribution from old_state to new_state
+
+    States are Attendance.get_rollup_state() tuples, None for "no record".
+    Returns the (company_id, date) pairs the change touched.
+    """
+    deltas = {}
+    monthly_deltas = {}
+    for state, sign in ((old_state, -1), (new_state, 1)):
+        if state is None:
+            continue
+        employee_id, day, status, has_ot, ot_hours = state
+        day = _as_date(day)
+        if employee is None or employee.pk != employee_id:
+            employee = Employee.objects.only('company_id', 'salary_per_day', 'ot_per_hour').get(pk=employee_id)
+        delta = deltas.setdefault((employee.company_id, day), dict.fromkeys(SUMMARY_FIELDS, 0))
+        monthly_delta = monthly_deltas.setdefault((employee_id, day.replace(day=1)), dict.fromkeys(SUMMARY_FIELDS, 0))
+        for name, value in _contribution(employee, status, has_ot, ot_hours).items():
+            delta[name] += sign * value
+            monthly_delta[name] += sign * value
+
+    for (company_id, day), delta in deltas.items():
+        _apply_delta(company_id, day, delta)
+    for (employee_id, month), delta in monthly_deltas.items():
+        _apply_monthly_delta(employee_id, month, delta)
+    return list(deltas)
+
+
+def _raw_aggregates():
+    """Aggregates over raw attendance that produce the rollup values"""
+    return {
+        'present_count': Count('id', filter=Q(status='PRESENT')),
+        'half_day_count': Count('id', filter=Q(status='HALF_DAY')),
+        'absent_count': Count('id', filter=Q(status='ABSENT')),
+        'ot_count': Count('id', filter=Q(has_ot=True)),
+        'total_ot_hours': Coalesce(Sum('ot_hours', filter=Q(has_ot=True)), Decimal('0.00')),
+        'salary_amount': Sum(day_salary_expression()),
+        'ot_amount': Sum(ot_amount_expression()),
+    }
+
+
+def employee_totals(attendance_records, *fields):
+    """Aggregate raw attendance into rollup values, one row per employee (plus any extra per-employee fields)"""
+    return attendance_records.order_by().values('employee_id', *fields).annotate(**_raw_aggregates())
+
+
+def daily_totals(attendance_records):
+    """Aggregate raw attendance into rollup values, one row per (company, date)"""
+    return attendance_records.order_by().values(
+        summary_company=F('employee__company_id'),
+        summary_date=F('date'),
+    ).annotate(**_raw_aggregates())
+
+
+def _summary_values(row):
+    return {
+        'present_count': row['present_count'],
+        'half_day_count': row['half_day_count'],
+        'absent_count': row['absent_count'],
+        'ot_count': row['ot_count'],
+        'ot_hours': row['total_ot_hours'],
+        'salary_amount': row['salary_amount'],
+        'ot_amount': row['ot_amount'],
+    }
+
+
+def _scoped(from_date=None, to_date=None, company_ids=None, dates=None):
+    """Matching Attendance and DailyAttendanceSummary querysets for a scope"""
+    records = Attendance.objects.all()
+    summaries = DailyAttendanceSummary.objects.all()
+    if from_date:
+        records = records.filter(date__gte=from_date)
+        summaries = summaries.filter(date__gte=from_date)
+    if to_date:
+        records = records.filter(date__lte=to_date)
+        summaries = summaries.filter(date__lte=to_date)
+    if company_ids is not None:
+        records = records.filter(employee__company_id__in=company_ids)
+        summaries = summaries.filter(company_id__in=company_ids)
+    if dates is not None:
+        records = records.filter(date__in=dates)
+        summaries = summaries.filter(date__in=dates)
+    return records, summaries
+
+
+def scope_months(from_date=None, to_date=None, company_ids=None):
+    """(company id, month) pairs with attendance or stored rollups in a scope
+
+    Read before a rebuild, these are the company-months whose cached reports
+    the rebuild can change - including months whose stale rows it drops.
+    """
+    records, summaries = _scoped(from_date, to_date, company_ids)
+    pairs = set(records.order_by().values_list('employee__company_id', TruncMonth('date')).distinct())
+    pairs.update(summaries.order_by().values_list('company_id', TruncMonth('date')).distinct())
+    return pairs
+
+
+@transaction.atomic
+def rebuild_daily_summaries(from_date=None, to_date=None, company_ids=None, dates=None):
+    """Recompute DailyAttendanceSummary rows for a scope from raw attendance"""
+    records, summaries = _scoped(from_date, to_date, company_ids, dates)
+    summaries.delete()
+    created = DailyAttendanceSummary.objects.bulk_create(
+        [
+            DailyAttendanceSummary(
+                company_id=row['summary_company'],
+                date=row['summary_date'],
+                **_summary_values(row)
+            )
+            for row in daily_totals(records)
+        ],
+        batch_size=1000
+    )
+    return len(created)
+
+
+def find_summary_mismatches(from_date=None, to_date=None, company_ids=None):
+    """Compare stored rollups with raw attendance
+
+    Returns a list of (company_id, date, field, stored, expected) tuples.
+    """
+    records, summaries = _scoped(from_date, to_date, company_ids)
+    expected = {
+        (row['summary_company'], row['summary_date']): _summary_values(row)
+        for row in daily_totals(records)
+    }
+    stored = {
+        (summary.company_id, summary.date): {name: getattr(summary, name) for name in SUMMARY_FIELDS}
+        for summary in summaries
+    }
+
+    empty = dict.fromkeys(SUMMARY_FIELDS, 0)
+    mismatches = []
+    for key in sorted(expected.keys() | stored.keys()):
+        stored_values = stored.get(key, empty)
+        expected_values = expected.get(key, empty)
+        for name in SUMMARY_FIELDS:
+            if stored_values[name] != expected_values[name]:
+                mismatches.append((*key, name, stored_values[name], expected_values[name]))
+    return mismatches
+
+
+def summary_totals(summaries):
+    """Sum a DailyAttendanceSummary queryset into report totals"""
+    totals = summaries.aggregate(
+        present_count=Coalesce(Sum('present_count'), 0),
+        half_day_count=Coalesce(Sum('half_day_count'), 0),
+        absent_count=Coalesce(Sum('absent_count'), 0),
+        ot_count=Coalesce(Sum('ot_count'), 0),
+        ot_hours=Coalesce(Sum('ot_hours'), Decimal('0.00')),
+        salary_amount=Coalesce(Sum('salary_amount'), Decimal('0.00')),
+        ot_amount=Coalesce(Sum('ot_amount'), Decimal('0.00')),
+    )
+    totals['total_count'] = totals['present_count'] + totals['half_day_count'] + totals['absent_count']
+    totals['total_amount'] = totals['salary_amount'] + totals['ot_amount']
+    return totals
+
+
+@transaction.atomic
+def build_monthly_summaries(month, employee_ids=None):
+    """Rebuild MonthlyEmployeeSummary rows for one month with a single INSERT ... SELECT ... GROUP BY"""
+    month = month.replace(day=1)
+    summaries = MonthlyEmployeeSummary.objects.filter(month=month)
+    employee_filter = ''
+    params = [month, month, month + relativedelta(months=1)]
+    if employee_ids is not None:
+        employee_ids = list(employee_ids)
+        if not employee_ids:
+            return 0
+        summaries = summaries.filter(employee_id__in=employee_ids)
+        employee_filter = f"AND a.employee_id IN ({', '.join(['%s'] * len(employee_ids))})"
+        params += employee_ids
+    summaries.delete()
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            INSERT INTO {MonthlyEmployeeSummary._meta.db_table} (
+                employee_id, company_id, month, present_days, half_days, absent_days,
+                ot_days, ot_hours, salary_amount, ot_amount, updated_at
+            )
+            SELECT a.employee_id, e.company_id, %s,
+                   SUM(CASE WHEN a.status = 'PRESENT' THEN 1 ELSE 0 END),
+                   SUM(CASE WHEN a.status = 'HALF_DAY' THEN 1 ELSE 0 END),
+                   SUM(CASE WHEN a.status = 'ABSENT' THEN 1 ELSE 0 END),
+                   SUM(CASE WHEN a.has_ot THEN 1 ELSE 0 END),
+                   COALESCE(SUM(CASE WHEN a.has_ot THEN a.ot_hours END), 0),
+                   SUM(CASE a.status
+                           WHEN 'PRESENT' THEN COALESCE(e.salary_per_day, 0)
+                           WHEN 'HALF_DAY' THEN COALESCE(e.salary_per_day, 0) / 2
+                           ELSE 0
+                       END),
+                   SUM(CASE WHEN a.has_ot THEN COALESCE(a.ot_hours, 0) * COALESCE(e.ot_per_hour, 0) ELSE 0 END),
+                   CURRENT_TIMESTAMP
+            FROM {Attendance._meta.db_table} a
+            JOIN {Employee._meta.db_table} e ON e.id = a.employee_id
+            WHERE a.date >= %s AND a.date < %s {employee_filter}
+            GROUP BY a.employee_id, e.company_id
+        """, params)
+        return cursor.rowcount
+
+
+def split_whole_months(from_date, to_date):
+    """Split a date range into whole calendar months and the partial-month edges
+
+    Returns (first_month, last_month, edges); the months are None when the
+    range holds no whole month, edges is a list of (start, end) date ranges.
+    """
+    first_month = from_date if from_date.day == 1 else from_date.replace(day=1) + relativedelta(months=1)
+    months_end = (to_date + timedelta(days=1)).replace(day=1)
+    if first_month >= months_end:
+        return None, None, [(from_date, to_date)]
+
+    edges = []
+    if from_date < first_month:
+        edges.append((from_date, first_month - timedelta(days=1)))
+    if months_end <= to_date:
+        edges.append((months_end, to_date))
+    return first_month, months_end - relativedelta(months=1), edges
+
+
+def employee_period_totals(employees, from_date, to_date):
+    """Per employee totals for a date range, keyed by employee id
+
+    Whole months are read from MonthlyEmployeeSummary; only the partial
+    months at either end of the range touch raw attendance.
+    """
+    from_date, to_date = _as_date(from_date), _as_date(to_date)
+    first_month, last_month, edges = split_whole_months(from_date, to_date)
+    totals = {}
+
+    def add(employee_id, values):
+        current = totals.setdefault(employee_id, dict.fromkeys(MONTHLY_FIELDS.values(), 0))
+        for name, value in values.items():
+            current[name] += value
+
+    if first_month:
+        monthly = MonthlyEmployeeSummary.objects.filter(
+            employee__in=employees,
+            month__gte=first_month,
+            month__lte=last_month
+        ).order_by().values('employee_id').annotate(
+            **{f'sum_{name}': Sum(name) for name in MONTHLY_FIELDS.values()}
+        )
+        for row in monthly:
+            add(row['employee_id'], {name: row[f'sum_{name}'] for name in MONTHLY_FIELDS.values()})
+
+    if edges:
+        in_edges = Q()
+        for start, end in edges:
+            in_edges |= Q(date__gte=start, date__lte=end)
+        # Up to two partial months of every employee - priced by the vectorized payroll engine
+        payroll = PayrollFrame.load(Attendance.objects.filter(in_edges, employee__in=employees))
+        for employee_id, values in payroll.group_totals('employee').items():
+            add(employee_id, {monthly: values[name] for name, monthly in MONTHLY_FIELDS.items()})
+
+    return totals
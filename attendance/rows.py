@@ -0,0 +1,83 @@
+"""Compact row types for the report and list templates
+
+Rows are loaded with values_list() and carry only the fields a template
+renders, instead of model instances with their employee, company and user
+objects attached.
+"""
+from .models import day_amounts
+
+
+class CompactRow:
+    """Fixed-field row with __slots__ - no per-row __dict__"""
+    __slots__ = ()
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    def __getitem__(self, name):
+        # Templates try item[name] before getattr(item, name); answering it
+        # here saves a raised and caught TypeError per rendered field
+        try:
+            return getattr(self, name)
+        except AttributeError:
+            raise KeyError(name)
+
+    def __reduce__(self):
+        # Cached report results pickle as plain value tuples
+        return self.__class__, tuple(getattr(self, name) for name in self.__slots__)
+
+
+class ReportRow(CompactRow):
+    __slots__ = (
+        'pk', 'date', 'employee_name', 'designation', 'company_name', 'status', 'has_ot', 'ot_hours',
+        'salary_per_day', 'ot_per_hour', 'day_salary', 'ot_amount', 'total_amount',
+    )
+
+
+class ListRow(CompactRow):
+    __slots__ = (
+        'pk', 'date', 'employee_name', 'employee_code', 'company_name', 'status', 'has_ot', 'ot_hours',
+        'remarks', 'marked_by_name', 'marked_at',
+    )
+
+
+REPORT_ROW_FIELDS = (
+    'id', 'date', 'employee_name', 'employee__designation',
+    'employee__company__name', 'status', 'has_ot', 'ot_hours',
+    'employee__salary_per_day', 'employee__ot_per_hour',
+)
+
+LIST_ROW_FIELDS = (
+    'id', 'date', 'employee_name', 'employee__employee_code',
+    'employee__company__name', 'status', 'has_ot', 'ot_hours', 'remarks',
+    'marked_by__first_name', 'marked_by__last_name', 'marked_by__username', 'marked_at',
+)
+
+
+def report_rows(attendance_records):
+    """ReportRows of a queryset, priced like the model properties"""
+    rows = []
+    for row in attendance_records.values_list(*REPORT_ROW_FIELDS):
+        (pk, day, employee_name, designation, company_name, status, has_ot, ot_hours,
+         salary_per_day, ot_per_hour) = row
+        day_salary, ot_amount = day_amounts(status, has_ot, ot_hours, salary_per_day, ot_per_hour)
+        rows.append(ReportRow(
+            pk, day, employee_name, designation, company_name, status, has_ot, ot_hours,
+            salary_per_day, ot_per_hour, day_salary, ot_amount, day_salary + ot_amount,
+        ))
+    return rows
+
+
+def list_rows(attendance_records):
+    """ListRows of a queryset for the attendance list"""
+    rows = []
+    for row in attendance_records.values_list(*LIST_ROW_FIELDS):
+        (pk, day, employee_name, employee_code, company_name, status, has_ot, ot_hours, remarks,
+         marked_by_first_name, marked_by_last_name, marked_by_username, marked_at) = row
+        marked_by_name = f'{marked_by_first_name or ""} {marked_by_last_name or ""}'.strip() or marked_by_username or ''
+        rows.append(ListRow(
+            pk, day, employee_name, employee_code, company_name, status, has_ot, ot_hours,
+            remarks, marked_by_name, marked_at,
+        ))
+    return rows
@@ -0,0 +1,168 @@
+"""Batch salary slip generation - one ZIP of PDF slips per company and month
+
+The slip data comes from a single grouped query, the PDFs are rendered by a
+process pool (slip_pdf needs no database) and each company's slips are then
+packed into one archive. Rendered slips are kept in a staging directory until
+their archive is written, so an interrupted run resumes where it stopped.
+"""
+import glob
+import hashlib
+import os
+import shutil
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.db import connections
+from django.utils.text import slugify
+from .models import Attendance
+from .rollups import employee_totals
+from .slip_pdf import render_slip, slip_filename
+
+# Default output of manage.py generate_salary_slips - outside MEDIA_ROOT,
+# which DEBUG serves without authentication
+SALARY_SLIP_ROOT = getattr(settings, 'SALARY_SLIP_ROOT', settings.BASE_DIR / 'salary_slips')
+
+EMPLOYEE_FIELDS = (
+    'employee__employee_code',
+    'employee__first_name',
+    'employee__last_name',
+    'employee__designation',
+    'employee__uan_number',
+    'employee__salary_per_day',
+    'employee__ot_per_hour',
+    'employee__company_id',
+    'employee__company__name',
+    'employee__company__address',
+)
+
+
+def month_bounds(month):
+    first = month.replace(day=1)
+    return first, first + relativedelta(months=1, days=-1)
+
+
+def slip_data(month, company_ids=None):
+    """Plain slip dicts for every employee with attendance in the month, from one grouped query"""
+    first, last = month_bounds(month)
+    attendance_records = Attendance.objects.filter(date__gte=first, date__lte=last)
+    if company_ids:
+        attendance_records = attendance_records.filter(employee__company_id__in=company_ids)
+    rows = employee_totals(attendance_records, *EMPLOYEE_FIELDS).order_by(
+        'employee__company_id', 'employee__employee_code'
+    )
+    return [{
+        'month': first,
+        'employee_id': row['employee_id'],
+        'employee_code': row['employee__employee_code'],
+        'employee_name': f"{row['employee__first_name']} {row['employee__last_name']}",
+        'designation': row['employee__designation'],
+        'uan_number': row['employee__uan_number'],
+        'salary_per_day': row['employee__salary_per_day'],
+        'ot_per_hour': row['employee__ot_per_hour'],
+        'company_id': row['employee__company_id'],
+        'company_name': row['employee__company__name'],
+        'company_address': row['employee__company__address'],
+        'present_count': row['present_count'],
+        'half_day_count': row['half_day_count'],
+        'absent_count': row['absent_count'],
+        'total_ot_hours': row['total_ot_hours'],
+        'salary_amount': row['salary_amount'],
+        'ot_amount': row['ot_amount'],
+    } for row in rows]
+
+
+def archive_name(company_id, company_name, month):
+    return f"salary_slips_{slugify(company_name) or 'company'}-{company_id}_{month:%Y-%m}.zip"
+
+
+def _fingerprint(slips):
+    # Staged slips are only reused while the data they were rendered from is unchanged
+    return hashlib.sha1(repr(slips).encode()).hexdigest()[:12]
+
+
+def _staging_dir(output_dir, name, slips):
+    """Staging directory for a company's rendered slips, dropping ones left over from older data"""
+    current = os.path.join(output_dir, f'.{name}.{_fingerprint(slips)}.parts')
+    for stale in glob.glob(os.path.join(glob.escape(output_dir), glob.escape(f'.{name}.') + '*.parts')):
+        if stale != current:
+            shutil.rmtree(stale, ignore_errors=True)
+    os.makedirs(current, exist_ok=True)
+    return current
+
+
+def _write_archive(path, staging_dir, names):
+    with zipfile.ZipFile(f'{path}.part', 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name in names:
+            archive.write(os.path.join(staging_dir, name), name)
+    os.replace(f'{path}.part', path)
+    shutil.rmtree(staging_dir)
+
+
+def generate_salary_slips(month, company_ids=None, output_dir=None, workers=None, force=False, progress=None):
+    """Render the month's salary slips into one ZIP per company
+
+    Companies whose archive already exists are skipped unless force is set.
+    progress, if given, is called as progress(done, total) after each slip.
+    Returns one dict per company with its archive path and slip counts.
+    """
+    output_dir = str(output_dir or os.path.join(SALARY_SLIP_ROOT, f'{month:%Y-%m}'))
+    os.makedirs(output_dir, exist_ok=True)
+
+    companies = {}
+    for slip in slip_data(month, company_ids):
+        companies.setdefault(slip['company_id'], []).append(slip)
+
+    results = []
+    pending = []
+    for company_id, slips in companies.items():
+        name = archive_name(company_id, slips[0]['company_name'], month)
+        path = os.path.join(output_dir, name)
+        result = {
+            'company_id': company_id,
+            'company_name': slips[0]['company_name'],
+            'path': path,
+            'slips': len(slips),
+            'rendered': 0,
+            'skipped': False,
+        }
+        results.append(result)
+        if os.path.exists(path):
+            if not force:
+                result['skipped'] = True
+                continue
+            os.remove(path)
+
+        result['staging_dir'] = _staging_dir(output_dir, name, slips)
+        result['names'] = [slip_filename(slip) for slip in slips]
+        done = set(os.listdir(result['staging_dir']))
+        pending.extend(
+            (slip, result) for slip, slip_name in zip(slips, result['names']) if slip_name not in done
+        )
+
+    total = len(pending)
+    if pending:
+        workers = workers or os.cpu_count() or 1
+        slips = [slip for slip, _ in pending]
+        directories = [result['staging_dir'] for _, result in pending]
+        if workers == 1:
+            rendered = map(render_slip, slips, directories)
+            _collect(rendered, pending, total, progress)
+        else:
+            # Forked workers must not inherit the open database connections
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                chunksize = max(1, min(50, total // (workers * 4)))
+                _collect(pool.map(render_slip, slips, directories, chunksize=chunksize), pending, total, progress)
+
+    for result in results:
+        if not result['skipped']:
+            _write_archive(result['path'], result.pop('staging_dir'), result.pop('names'))
+    return results
+
+
+def _collect(rendered, pending, total, progress):
+    for done, ((_, result), _) in enumerate(zip(pending, rendered), start=1):
+        result['rendered'] += 1
+        if progress:
+            progress(done, total)
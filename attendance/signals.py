@@ -0,0 +1,117 @@
+"""Keep the attendance rollup tables and report cache versions in step with every write path (views, admin, cascades)"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from companies.models import Company
+from employees.models import Employee
+from .models import Attendance
+from .rollups import apply_attendance_change, build_monthly_summaries, rebuild_daily_summaries
+from . import report_cache
+
+
+def _invalidate_reports(touched):
+    # After commit, so a report computed from the old rows is never stored under the new version
+    def bump():
+        for company_id, day in touched:
+            report_cache.bump_month(company_id, day)
+    transaction.on_commit(bump)
+
+
+def _cached_employee(instance):
+    # Avoid a query when the view already loaded the employee
+    if Attendance._meta.get_field('employee').is_cached(instance):
+        return instance.employee
+    return None
+
+
+@receiver(pre_save, sender=Attendance)
+def remember_attendance_state(sender, instance, raw=False, **kwargs):
+    """Read the stored values for records that were not loaded with all rollup fields"""
+    if raw or instance._state.adding or hasattr(instance, '_rollup_state'):
+        return
+    instance._rollup_state = Attendance.objects.filter(pk=instance.pk).values_list(
+        *Attendance.ROLLUP_FIELDS
+    ).first()
+
+
+@receiver(post_save, sender=Attendance)
+def update_summary_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old_state = None if created else getattr(instance, '_rollup_state', None)
+    new_state = instance.get_rollup_state()
+    _invalidate_reports(apply_attendance_change(old_state, new_state, _cached_employee(instance)))
+    instance._rollup_state = new_state
+
+
+@receiver(post_delete, sender=Attendance)
+def update_summary_on_delete(sender, instance, **kwargs):
+    old_state = getattr(instance, '_rollup_state', None) or instance.get_rollup_state()
+    _invalidate_reports(apply_attendance_change(old_state, None, _cached_employee(instance)))
+
+
+@receiver(pre_save, sender=Employee)
+def remember_employee_rates(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding:
+        return
+    stored = Employee.objects.filter(pk=instance.pk).values_list(
+        'company_id', 'salary_per_day', 'ot_per_hour', 'first_name', 'last_name'
+    ).first()
+    instance._stored_rates = stored[:3] if stored else None
+    instance._stored_name = f'{stored[3]} {stored[4]}' if stored else None
+
+
+@receiver(post_save, sender=Employee)
+def sync_attendance_employee_name(sender, instance, created, raw=False, **kwargs):
+    """Attendance keeps a copy of the name as its pagination sort key"""
+    stored = getattr(instance, '_stored_name', None)
+    name = instance.get_full_name()
+    if raw or created or stored is None or stored == name:
+        return
+    # update() skips the attendance signals - the rollups do not depend on the name
+    instance.attendance_records.update(employee_name=name)
+    instance._stored_name = name
+
+
+@receiver(post_save, sender=Employee)
+def invalidate_reports_on_employee_change(sender, instance, raw=False, **kwargs):
+    """Names, rates and the active flag show up in every month of the company's reports"""
+    if raw:
+        return
+    stored = getattr(instance, '_stored_rates', None)
+    company_ids = {instance.company_id, stored[0] if stored else instance.company_id}
+
+    def bump():
+        for company_id in company_ids:
+            report_cache.bump_roster(company_id)
+    transaction.on_commit(bump)
+
+
+@receiver(post_save, sender=Employee)
+def refresh_summary_on_rate_change(sender, instance, created, raw=False, **kwargs):
+    """A new rate or company re-prices every day the employee has attendance on"""
+    stored = getattr(instance, '_stored_rates', None)
+    current = (instance.company_id, instance.salary_per_day, instance.ot_per_hour)
+    if raw or created or stored is None or stored == current:
+        return
+    dates = list(instance.attendance_records.values_list('date', flat=True))
+    if dates:
+        rebuild_daily_summaries(company_ids={stored[0], instance.company_id}, dates=dates)
+        for month in {day.replace(day=1) for day in dates}:
+            build_monthly_summaries(month, employee_ids=[instance.pk])
+    instance._stored_rates = current
+
+
+@receiver(post_delete, sender=Employee)
+def invalidate_reports_on_employee_delete(sender, instance, **kwargs):
+    company_id = instance.company_id
+    transaction.on_commit(lambda: report_cache.bump_roster(company_id))
+
+
+@receiver(post_save, sender=Company)
+def invalidate_reports_on_company_change(sender, instance, raw=False, **kwargs):
+    """Company names show up in every month of its reports and on the dashboards"""
+    if raw:
+        return
+    company_id = instance.pk
+    transaction.on_commit(lambda: report_cache.bump_roster(company_id))
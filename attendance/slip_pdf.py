@@ -0,0 +1,100 @@
+"""Salary slip PDF rendering
+
+Runs inside process pool workers, so it only depends on ReportLab and the
+plain slip dicts built by salary_slips.slip_data() - never on Django or the
+database.
+"""
+import os
+from decimal import Decimal
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A5
+from reportlab.lib.units import mm
+from reportlab.pdfgen import canvas
+from reportlab.platypus import Table, TableStyle
+
+PAGE_SIZE = A5
+MARGIN = 12 * mm
+FONT = 'Helvetica'
+FONT_BOLD = 'Helvetica-Bold'
+
+# Built once per worker process and shared by every slip it renders
+DETAIL_STYLE = TableStyle([
+    ('FONT', (0, 0), (-1, -1), FONT, 9),
+    ('FONT', (0, 0), (0, -1), FONT_BOLD, 9),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+    ('TOPPADDING', (0, 0), (-1, -1), 2),
+])
+EARNINGS_STYLE = TableStyle([
+    ('FONT', (0, 0), (-1, -1), FONT, 9),
+    ('FONT', (0, 0), (-1, 0), FONT_BOLD, 9),
+    ('FONT', (0, -1), (-1, -1), FONT_BOLD, 10),
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0d6efd')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+    ('GRID', (0, 0), (-1, -1), 0.25, colors.HexColor('#999999')),
+    ('LINEABOVE', (0, -1), (-1, -1), 1, colors.black),
+])
+
+
+def _money(value):
+    return f'{Decimal(value or 0).quantize(Decimal("0.01")):,}'
+
+
+def slip_filename(slip):
+    code = ''.join(ch if ch.isalnum() or ch in '-_' else '_' for ch in slip['employee_code'])
+    return f"{code}_{slip['month']:%Y-%m}.pdf"
+
+
+def draw_slip(pdf, slip):
+    """Draw one salary slip on the current page of a canvas"""
+    width, height = PAGE_SIZE
+    y = height - MARGIN
+
+    pdf.setFont(FONT_BOLD, 13)
+    pdf.drawCentredString(width / 2, y - 4 * mm, slip['company_name'])
+    pdf.setFont(FONT, 8)
+    pdf.drawCentredString(width / 2, y - 9 * mm, (slip['company_address'] or '').replace('\n', ', ')[:110])
+    pdf.setFont(FONT_BOLD, 11)
+    pdf.drawCentredString(width / 2, y - 17 * mm, f"Salary Slip - {slip['month']:%B %Y}")
+
+    details = Table([
+        ['Employee', slip['employee_name'], 'Code', slip['employee_code']],
+        ['Designation', slip['designation'] or '-', 'UAN', slip['uan_number'] or '-'],
+    ], colWidths=[24 * mm, 50 * mm, 14 * mm, 36 * mm])
+    details.setStyle(DETAIL_STYLE)
+    _, details_height = details.wrapOn(pdf, width, height)
+    top = y - 22 * mm
+    details.drawOn(pdf, MARGIN, top - details_height)
+
+    earnings = Table([
+        ['Particulars', 'Days / Hours', 'Rate', 'Amount'],
+        ['Present days', slip['present_count'], _money(slip['salary_per_day']), ''],
+        ['Half days', slip['half_day_count'], _money(Decimal(slip['salary_per_day'] or 0) / 2), ''],
+        ['Absent days', slip['absent_count'], '', ''],
+        ['Salary', '', '', _money(slip['salary_amount'])],
+        ['Overtime (hours)', f"{slip['total_ot_hours']:.2f}", _money(slip['ot_per_hour']), _money(slip['ot_amount'])],
+        ['Net Payable', '', '', _money(Decimal(slip['salary_amount'] or 0) + Decimal(slip['ot_amount'] or 0))],
+    ], colWidths=[44 * mm, 28 * mm, 24 * mm, 28 * mm])
+    earnings.setStyle(EARNINGS_STYLE)
+    _, earnings_height = earnings.wrapOn(pdf, width, height)
+    earnings.drawOn(pdf, MARGIN, top - details_height - 8 * mm - earnings_height)
+
+    pdf.setFont(FONT, 7)
+    pdf.drawString(MARGIN, MARGIN, 'This is a computer generated salary slip.')
+
+
+def render_slip(slip, directory):
+    """Write one slip PDF into directory (process pool task), returning its file name
+
+    The file appears under its final name only once complete, so an
+    interrupted run can resume by skipping the files that exist.
+    """
+    name = slip_filename(slip)
+    path = os.path.join(directory, name)
+    pdf = canvas.Canvas(f'{path}.part', pagesize=PAGE_SIZE, pageCompression=1)
+    pdf.setTitle(f"Salary Slip {slip['employee_code']} {slip['month']:%Y-%m}")
+    draw_slip(pdf, slip)
+    pdf.showPage()
+    pdf.save()
+    os.replace(f'{path}.part', path)
+    return name
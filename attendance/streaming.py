@@ -0,0 +1,64 @@
+"""Streamed rendering of report pages - page head at once, table rows in chunks, then the page foot"""
+import re
+import zlib
+from itertools import islice
+from django.http import StreamingHttpResponse
+from django.template.loader import get_template, render_to_string
+from django.utils.cache import patch_vary_headers
+from django.utils.safestring import mark_safe
+
+# Placeholder the page template renders where the table rows go
+ROWS_MARKER = '<!-- streamed rows -->'
+
+# Table rows rendered per chunk
+STREAM_CHUNK_ROWS = 200
+
+accepts_gzip = re.compile(r'\bgzip\b')
+
+
+def _chunks(rows, size):
+    rows = iter(rows)
+    while chunk := list(islice(rows, size)):
+        yield chunk
+
+
+def _gzip(chunks):
+    # Sync flush after every chunk so the browser can show it right away -
+    # GZipMiddleware would hold the output back until zlib's buffer fills
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        yield compressor.compress(chunk.encode()) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def streamed_response(request, template_name, rows_template_name, context, rows):
+    """Render template_name with rows streamed into its {{ streamed_rows }} placeholder
+
+    Everything before the placeholder is sent first, rows_template_name is
+    then rendered with each chunk of rows as `rows`, and the rest of the page
+    follows. rows may be any iterable; only one chunk is rendered at a time.
+    The rows template also gets `offset`, the number of rows before the chunk.
+    """
+    page = render_to_string(template_name, {**context, 'streamed_rows': mark_safe(ROWS_MARKER)}, request)
+    head, marker, foot = page.partition(ROWS_MARKER)
+    if not marker:
+        # Nothing to stream into (e.g. the empty-result branch of the template)
+        rows = []
+    rows_template = get_template(rows_template_name)
+
+    def content():
+        yield head
+        offset = 0
+        for chunk in _chunks(rows, STREAM_CHUNK_ROWS):
+            # offset lets the rows template number rows across chunks
+            yield rows_template.render({'rows': chunk, 'offset': offset}, request)
+            offset += len(chunk)
+        yield foot
+
+    if accepts_gzip.search(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+        response = StreamingHttpResponse(_gzip(content()), content_type='text/html; charset=utf-8')
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = StreamingHttpResponse(content(), content_type='text/html; charset=utf-8')
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
@@ -0,0 +1,106 @@
+"""Marking activity and timeliness per supervisor
+
+One grouped query over attendance per period gives, for everyone who marked
+attendance: records marked, days marked, the median time of day of marking,
+how many records were marked late and how many were edited afterwards.
+"""
+from datetime import time
+from django.conf import settings
+from django.db import connection
+from django.db.models import Aggregate, Count, F, FloatField, Q
+from django.db.models.functions import ExtractHour, ExtractMinute, ExtractSecond
+
+# Records marked after this time of day (local) on their own date, or on a later date, count as late
+LATE_MARKING_TIME = getattr(settings, 'ATTENDANCE_LATE_MARKING_TIME', time(11, 0))
+
+SORT_FIELDS = {
+    'name': 'name',
+    'records': 'records',
+    'late': 'late_rate',
+    'edits': 'edit_rate',
+}
+
+
+class Median(Aggregate):
+    """Median of a numeric expression (PostgreSQL percentile_cont)"""
+    function = 'PERCENTILE_CONT'
+    name = 'Median'
+    template = '%(function)s(0.5) WITHIN GROUP (ORDER BY %(expressions)s)'
+    output_field = FloatField()
+
+
+def median_supported():
+    """percentile_cont is only available on PostgreSQL"""
+    return connection.vendor == 'postgresql'
+
+
+def _seconds_of_day(field):
+    # Extract* convert to the current time zone, so this is local time
+    return ExtractHour(field) * 3600 + ExtractMinute(field) * 60 + ExtractSecond(field)
+
+
+def _median(values):
+    values = sorted(values)
+    if not values:
+        return None
+    middle = len(values) // 2
+    return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2
+
+
+def _clock(seconds):
+    if seconds is None:
+        return None
+    seconds = round(seconds)
+    return time(seconds // 3600 % 24, seconds // 60 % 60)
+
+
+def supervisor_activity(attendance_records, sort='name'):
+    """Per marker activity rows, ordered by sort ('name', 'records', 'late' or 'edits')"""
+    late = Q(marked_at__date__gt=F('date')) | Q(marked_at__date=F('date'), marked_at__time__gt=LATE_MARKING_TIME)
+    aggregates = {
+        'records': Count('id'),
+        'days': Count('date', distinct=True),
+        'late_count': Count('id', filter=late),
+        'edited_count': Count('id', filter=Q(is_edited=True)),
+    }
+    if median_supported():
+        aggregates['median_seconds'] = Median(_seconds_of_day('marked_at'))
+    grouped = attendance_records.filter(marked_by__isnull=False).order_by().values(
+        'marked_by_id', 'marked_by__username', 'marked_by__first_name', 'marked_by__last_name', 'marked_by__role'
+    ).annotate(**aggregates)
+
+    rows = []
+    for values in grouped:
+        rows.append({
+            'user_id': values['marked_by_id'],
+            'name': (
+                f"{values['marked_by__first_name']} {values['marked_by__last_name']}".strip()
+                or values['marked_by__username']
+            ),
+            'username': values['marked_by__username'],
+            'role': values['marked_by__role'],
+            'records': values['records'],
+            'days': values['days'],
+            'records_per_day': values['records'] / values['days'],
+            'median_seconds': values.get('median_seconds'),
+            'late_count': values['late_count'],
+            'late_rate': values['late_count'] * 100 / values['records'],
+            'edited_count': values['edited_count'],
+            'edit_rate': values['edited_count'] * 100 / values['records'],
+        })
+
+    if rows and not median_supported():
+        # Other databases have no median aggregate - read the marking times instead
+        times = {}
+        for user_id, seconds in attendance_records.filter(marked_by__isnull=False).order_by().values_list(
+            'marked_by_id', _seconds_of_day('marked_at')
+        ):
+            times.setdefault(user_id, []).append(seconds)
+        for row in rows:
+            row['median_seconds'] = _median(times.get(row['user_id'], []))
+
+    for row in rows:
+        row['median_time'] = _clock(row.pop('median_seconds'))
+    field = SORT_FIELDS.get(sort, 'name')
+    rows.sort(key=lambda row: (row[field], row['name']) if field == 'name' else (-row[field], row['name']))
+    return rows
@@ -0,0 +1,159 @@
+import gzip
+import io
+import zipfile
+from datetime import date, timedelta
+from decimal import Decimal
+from dateutil.relativedelta import relativedelta
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from accounts.models import User
+from companies.models import Company
+from employees.models import Employee
+from .comparison import period_comparison
+from .exports import iter_report_rows
+from .models import Attendance
+from .views import build_employee_summary
+
+# Report results are not cached, so every request runs its queries
+NO_REPORT_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'reports': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
+
+
+@override_settings(CACHES=NO_REPORT_CACHE)
+class ReportQueryCountTests(TestCase):
+    """Report queries must not grow with the number of employees"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('superadmin', password='x', role='SUPERADMIN')
+        cls.companies = [
+            Company.objects.create(name=name, address='-', contact_number='-', email=f'{name}@example.com')
+            for name in ('Alpha', 'Beta')
+        ]
+        cls.today = date.today()
+        cls.this_month = cls.today.replace(day=1)
+        cls.last_month = cls.this_month - relativedelta(months=1)
+
+    def add_employees(self, count):
+        """count employees spread over both companies, each with a record on both months' first days"""
+        start = Employee.objects.count()
+        employees = []
+        for n in range(start, start + count):
+            employee = Employee.objects.create(
+                employee_code=f'E{n:04d}', first_name='Worker', last_name=str(n),
+                company=self.companies[n % 2], designation='Helper', contact_number='-',
+                date_of_joining=self.last_month, salary_per_day=Decimal('500.00'), ot_per_hour=Decimal('62.50'),
+            )
+            Attendance.objects.create(employee=employee, date=self.last_month, status='PRESENT', has_ot=True, ot_hours=Decimal('2.00'))
+            Attendance.objects.create(employee=employee, date=self.this_month, status='HALF_DAY')
+            employees.append(employee)
+        return employees
+
+    def count_queries(self, func):
+        with CaptureQueriesContext(connection) as queries:
+            func()
+        return len(queries)
+
+    def get_page(self, url, params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        if response.streaming:
+            b''.join(response.streaming_content)
+
+    def test_employee_summary_queries_are_constant(self):
+        # A whole month from the monthly rollup plus a partial one from raw records
+        to_date = self.this_month + timedelta(days=9)
+        self.add_employees(2)
+        with self.assertNumQueries(3):
+            build_employee_summary(self.user, self.last_month, to_date)
+        self.add_employees(20)
+        with self.assertNumQueries(3):
+            result = build_employee_summary(self.user, self.last_month, to_date)
+
+        self.assertEqual(len(result['employee_summary']), 22)
+        row = result['employee_summary'][0]
+        self.assertEqual((row['present_days'], row['half_days'], row['ot_days']), (1, 1, 1))
+        # A half day is paid half the day rate
+        self.assertEqual(row['total_salary'], Decimal('750.00'))
+        self.assertEqual(row['total_ot_amount'], Decimal('125.00'))
+        self.assertEqual(result['grand_total'], Decimal('875.00') * 22)
+
+    def test_employee_wise_report_page_queries_are_constant(self):
+        self.client.force_login(self.user)
+        url = reverse('attendance:employee_wise_report')
+        params = {'from_date': self.last_month.isoformat(), 'to_date': self.today.isoformat()}
+        self.add_employees(2)
+        few = self.count_queries(lambda: self.get_page(url, params))
+        self.add_employees(20)
+        many = self.count_queries(lambda: self.get_page(url, params))
+        self.assertEqual(few, many)
+
+    def test_period_comparison_is_one_query(self):
+        self.add_employees(4)
+        current = (self.this_month, self.today)
+        previous = (self.last_month, self.this_month - timedelta(days=1))
+
+        with self.assertNumQueries(1):
+            rows, totals = period_comparison(Attendance.objects.all(), current, previous, 'company')
+        self.assertEqual([row['name'] for row in rows], ['Alpha', 'Beta'])
+        self.assertEqual(totals['current']['half_day_count'], 4)
+        self.assertEqual(totals['previous']['present_count'], 4)
+        self.assertEqual(totals['previous']['ot_hours'], Decimal('8.00'))
+
+        self.add_employees(10)
+        with self.assertNumQueries(1):
+            rows, totals = period_comparison(Attendance.objects.all(), current, previous, 'employee')
+        self.assertEqual(len(rows), 14)
+        self.assertEqual(totals['current']['half_day_count'], 14)
+        self.assertEqual(totals['previous']['present_count'], 14)
+
+    def test_comparison_report_page_queries_are_constant(self):
+        self.client.force_login(self.user)
+        url = reverse('attendance:comparison_report')
+        for group_by in ('company', 'employee'):
+            with self.subTest(group_by=group_by):
+                params = {'month': self.this_month.strftime('%Y-%m'), 'group_by': group_by}
+                few = self.count_queries(lambda: self.get_page(url, params))
+                self.add_employees(10)
+                many = self.count_queries(lambda: self.get_page(url, params))
+                self.assertEqual(few, many)
+
+
+class ReportExportTests(TestCase):
+    def test_amounts_are_rounded_like_the_copy_export(self):
+        company = Company.objects.create(name='Alpha', address='-', contact_number='-', email='alpha@example.com')
+        employee = Employee.objects.create(
+            employee_code='E0001', first_name='Worker', last_name='One', company=company, designation='Helper',
+            contact_number='-', date_of_joining=date(2026, 1, 1),
+            salary_per_day=Decimal('733.33'), ot_per_hour=Decimal('60.10'),
+        )
+        for day in (1, 2, 3):
+            Attendance.objects.create(employee=employee, date=date(2026, 2, day), status='HALF_DAY', has_ot=True, ot_hours=Decimal('1.25'))
+
+        totals = {}
+        rows = list(iter_report_rows(Attendance.objects.all(), totals))
+        # Day Salary, OT Amount and Total Amount of one record
+        self.assertEqual([str(rows[1][i]) for i in (8, 10, 11)], ['366.67', '75.13', '441.79'])
+        # Totals are rounded after summing, as round(sum(...), 2) does
+        self.assertEqual([str(rows[-1][i]) for i in (8, 10, 11)], ['1100.00', '225.38', '1325.37'])
+        self.assertEqual(totals['total_amount'], Decimal('1325.37'))
+
+    def test_compressed_exports_are_not_gzipped_again(self):
+        self.client.force_login(User.objects.create_user('superadmin', password='x', role='SUPERADMIN'))
+        url = reverse('attendance:export_report_csv')
+        params = {'from_date': (date.today() - timedelta(days=7)).isoformat(), 'to_date': date.today().isoformat()}
+
+        response = self.client.get(url, {**params, 'compress': 'gzip'}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'identity')
+        content = gzip.decompress(b''.join(response.streaming_content))
+        self.assertTrue(content.startswith(b'Date,Employee Code'))
+
+        response = self.client.get(url, {**params, 'compress': 'zip'}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'identity')
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as archive:
+            name, = archive.namelist()
+            self.assertTrue(archive.read(name).startswith(b'Date,Employee Code'))
@@ -0,0 +1,112 @@
+"""Daily or weekly trend series per company for the dashboard charts
+
+The series come from one query over the daily rollup grouped by company and
+day (or week) and are returned column-wise: one dates array and, per metric,
+one value array per company aligned with it. Each company's arrays are cached
+until the next attendance write in that company, so every admin scope is
+assembled from the same cached entries.
+"""
+from datetime import timedelta
+from django.db.models import F, Sum
+from django.db.models.functions import TruncWeek
+from .models import DailyAttendanceSummary
+from . import report_cache
+
+# Days covered by the trend charts, today included
+TREND_DAYS = 90
+
+BUCKETS = ('day', 'week')
+
+METRICS = ('attendance_rate', 'present', 'ot_cost')
+
+
+def trend_range(today):
+    return today - timedelta(days=TREND_DAYS - 1), today
+
+
+def _bucket_dates(from_date, to_date, bucket):
+    """Start date of every bucket in the range - weeks start on Monday"""
+    if bucket == 'week':
+        first = from_date - timedelta(days=from_date.weekday())
+        return [first + timedelta(weeks=n) for n in range((to_date - first).days // 7 + 1)]
+    return [from_date + timedelta(days=n) for n in range((to_date - from_date).days + 1)]
+
+
+def _compute(company_ids, from_date, to_date, bucket):
+    dates = _bucket_dates(from_date, to_date, bucket)
+    index = {day: position for position, day in enumerate(dates)}
+    raw = {
+        pk: {'marked': [0] * len(dates), 'paid': [0.0] * len(dates), 'present': [0] * len(dates),
+             'ot_cost': [0.0] * len(dates)}
+        for pk in company_ids
+    }
+    rows = DailyAttendanceSummary.objects.filter(
+        company_id__in=company_ids, date__gte=from_date, date__lte=to_date
+    ).order_by().values(
+        'company_id', period=TruncWeek('date') if bucket == 'week' else F('date')
+    ).annotate(
+        present_count=Sum('present_count'),
+        half_day_count=Sum('half_day_count'),
+        absent_count=Sum('absent_count'),
+        ot_amount=Sum('ot_amount'),
+    )
+    for row in rows:
+        position = index[row['period']]
+        series = raw[row['company_id']]
+        series['marked'][position] = row['present_count'] + row['half_day_count'] + row['absent_count']
+        series['paid'][position] = row['present_count'] + row['half_day_count'] / 2
+        # Half-day employees were at work, so they count towards the headcount present
+        series['present'][position] = row['present_count'] + row['half_day_count']
+        series['ot_cost'][position] = float(row['ot_amount'])
+    return raw
+
+
+def _metrics(series):
+    """Chart values from a company's (or the scope's summed) raw arrays"""
+    return {
+        'attendance_rate': [
+            round(paid * 100 / marked, 1) if marked else None
+            for paid, marked in zip(series['paid'], series['marked'])
+        ],
+        'present': series['present'],
+        'ot_cost': [round(cost, 2) for cost in series['ot_cost']],
+    }
+
+
+def attendance_trends(companies, today, bucket='day'):
+    """Columnar trend payload of the companies over the last TREND_DAYS days
+
+    {'dates': [...], 'companies': {'id': [...], 'name': [...]}, and for each
+    of METRICS a list with one value array per company, plus 'total' with the
+    same metrics over all the companies}. Attendance rate is paid days (half
+    days count half) as a percentage of marked records, None where nothing was
+    marked.
+    """
+    from_date, to_date = trend_range(today)
+    companies = list(companies.order_by('name', 'pk').values_list('id', 'name'))
+    company_ids = [pk for pk, _ in companies]
+    keys = report_cache.company_keys('attendance_trends', company_ids, from_date, to_date, today=today, bucket=bucket)
+    cached = report_cache.get_results('attendance_trends', list(keys.values()))
+    missing = [pk for pk in company_ids if keys[pk] not in cached]
+    computed = _compute(missing, from_date, to_date, bucket) if missing else {}
+    report_cache.set_results({keys[pk]: series for pk, series in computed.items()})
+
+    raw = [computed[pk] if pk in computed else cached[keys[pk]] for pk in company_ids]
+    per_company = [_metrics(series) for series in raw]
+    dates = _bucket_dates(from_date, to_date, bucket)
+    total = {
+        name: [sum(values) for values in zip(*(series[name] for series in raw))] if raw else [0] * len(dates)
+        for name in ('marked', 'paid', 'present', 'ot_cost')
+    }
+    return {
+        'from_date': from_date.isoformat(),
+        'to_date': to_date.isoformat(),
+        'bucket': bucket,
+        'dates': [day.isoformat() for day in dates],
+        'companies': {
+            'id': company_ids,
+            'name': [name for _, name in companies],
+        },
+        **{name: [metrics[name] for metrics in per_company] for name in METRICS},
+        'total': _metrics(total),
+    }
@@ -12,4 +12,20 @@ urlpatterns = [
     path('reports/', views.reports, name='reports'),
     path('reports/employee-wise/', views.employee_wise_report, name='employee_wise_report'),
     path('reports/export-csv/', views.export_report_csv, name='export_report_csv'),
+    path('reports/export-pdf/', views.export_report_pdf, name='export_report_pdf'),
+    path('reports/comparison/', views.comparison_report, name='comparison_report'),
+    path('reports/ot-anomalies/', views.ot_anomaly_report, name='ot_anomaly_report'),
+    path('reports/projection/', views.payroll_projection_report, name='payroll_projection'),
+    path('reports/supervisors/', views.supervisor_activity_report, name='supervisor_activity'),
+    path('reports/trends/', views.attendance_trends_data, name='attendance_trends'),
+    path('reports/completeness/', views.completeness_heatmap, name='completeness_heatmap'),
+    path('muster-roll/', views.muster_roll, name='muster_roll'),
+    path('muster-roll/export-csv/', views.export_muster_csv, name='export_muster_csv'),
+    path('payroll-periods/', views.payroll_periods, name='payroll_periods'),
+    path('report-jobs/', views.report_jobs, name='report_jobs'),
+    path('report-jobs/new/', views.report_job_create, name='report_job_create'),
+    path('report-jobs/all-companies/', views.company_bundle_job_create, name='company_bundle_job_create'),
+    path('report-jobs/<int:pk>/', views.report_job_detail, name='report_job_detail'),
+    path('report-jobs/<int:pk>/status/', views.report_job_status, name='report_job_status'),
+    path('report-jobs/<int:pk>/download/', views.report_job_download, name='report_job_download'),
 ]
@@ -1,18 +1,43 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
 from django.db.models import Q, Count, Sum, F, DecimalField
 from django.db.models.functions import Coalesce
-from django.http import JsonResponse, HttpResponse
+from django.http import FileResponse, Http404, JsonResponse, HttpResponse
+from django.urls import reverse
+from django.utils.text import slugify
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 from datetime import date, datetime, timedelta
 from dateutil.relativedelta import relativedelta
 from decimal import Decimal
 from accounts.decorators import admin_required
-from .models import Attendance
+from .models import Attendance, DailyAttendanceSummary, PayrollPeriod, ReportJob
 from .forms import AttendanceForm, BulkAttendanceForm, AttendanceReportFilterForm
+from .exports import export_response, report_content, report_queryset, skip_gzip, stream_csv
+from .anomalies import (
+    ANOMALY_DAYS, ANOMALY_SORT_FIELDS, MIN_EXCESS_HOURS, OT_FACTOR, ROLLING_DAYS, ot_anomalies
+)
+from .completeness import COMPLETENESS_DAYS, COMPLETENESS_SORT_FIELDS, NEARLY_COMPLETE, completeness_grid
+from .comparison import comparison_periods, period_comparison
+from .muster import iter_muster_csv_rows, month_range, muster_rows, muster_totals
+from .pdf_exports import pdf_response
+from .projection import RUN_RATE_DAYS, payroll_projection
+from .trends import BUCKETS as TREND_BUCKETS, attendance_trends, trend_range
+from .supervisor_activity import LATE_MARKING_TIME, SORT_FIELDS as ACTIVITY_SORT_FIELDS, supervisor_activity
+from .pagination import KeysetPage, keyset_page, page_urls
+from .payroll import PayrollFrame
+from .rows import list_rows, report_rows
+from .streaming import streamed_response
+from .rollups import employee_period_totals, summary_totals
+from . import report_cache
+from .jobs import can_access_job, submit_company_bundle_job, submit_report_job
+from .periods import (
+    PeriodError, close_period, closed_period_for, period_company_totals, period_employee_snapshots
+)
 from employees.models import Employee
 from companies.models import Company
-import csv
 import requests
 import logging
 
@@ -119,7 +144,14 @@ def mark_attendance(request):
             attendance = form.save(commit=False)
             attendance.marked_by = request.user
             try:
-                attendance.save()
+                # The period check holds off a concurrent close until the record is saved
+                with transaction.atomic():
+                    period = PayrollPeriod.covering(attendance.date, lock=True)
+                    if period is None:
+                        attendance.save()
+                if period:
+                    messages.error(request, f'Payroll period {period} is closed. Attendance cannot be marked for {attendance.date}.')
+                    return redirect('attendance:mark_attendance')
                 messages.success(request, f'Attendance marked for {attendance.employee.get_full_name()}')
                 return redirect('attendance:mark_attendance')
             except Exception as e:
@@ -147,6 +179,7 @@ def mark_attendance(request):
 
 
 @login_required
+@transaction.atomic
 def bulk_mark_attendance(request):
     """Bulk attendance marking interface - Only Supervisor and Super Admin"""
     
@@ -219,6 +252,12 @@ def bulk_mark_attendance(request):
                 messages.error(request, 'Invalid date.')
                 return redirect('attendance:bulk_mark_attendance')
         
+        # Closed payroll periods are locked - the check holds off a concurrent close until every record is saved
+        period = PayrollPeriod.covering(selected_date, lock=True)
+        if period:
+            messages.error(request, f'Payroll period {period} is closed. Attendance cannot be marked for {selected_date}.')
+            return redirect('attendance:bulk_mark_attendance')
+        
         count = 0
         
         # Re-filter employees for the POST
@@ -280,7 +319,9 @@ def bulk_mark_attendance(request):
                 
                 # Send WhatsApp notification for new attendance
                 if created:
-                    send_whatsapp_notification(employee, attendance)
+                    transaction.on_commit(
+                        lambda employee=employee, attendance=attendance: send_whatsapp_notification(employee, attendance)
+                    )
                 
                 count += 1
         
@@ -303,7 +344,17 @@ def bulk_mark_attendance(request):
     return render(request, 'attendance/bulk_mark_attendance.html', context)
 
 
+def attendance_list_etag(request):
+    """ETag of the attendance list - the filters, the user and the versions of the listed months"""
+    start_date, end_date = validate_date_range(request.GET.get('start_date', ''), request.GET.get('end_date', ''))
+    return report_cache.page_etag(
+        'attendance_list', request, {**request.GET.dict(), 'today': date.today()}, start_date, end_date
+    )
+
+
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=attendance_list_etag)
 def attendance_list(request):
     """List attendance records with filters"""
     # Get filter parameters and enforce 3-month restriction
@@ -319,9 +370,7 @@ def attendance_list(request):
     min_allowed_date = get_min_allowed_date().strftime('%Y-%m-%d')
     
     # Base queryset - always filter by 3-month range
-    attendance_records = Attendance.objects.select_related(
-        'employee', 'employee__company', 'marked_by'
-    ).filter(
+    attendance_records = Attendance.objects.filter(
         date__gte=min_allowed_date
     )
     
@@ -346,8 +395,12 @@ def attendance_list(request):
     if company_id:
         attendance_records = attendance_records.filter(employee__company_id=company_id)
     
-    # Order by date descending
-    attendance_records = attendance_records.order_by('-date', 'employee__first_name')
+    # One page, newest first, seeking from the cursor in the URL
+    page = keyset_page(
+        attendance_records, list_rows,
+        after=request.GET.get('after', ''),
+        before=request.GET.get('before', '')
+    )
     
     # Get data for filters
     if request.user.is_supervisor():
@@ -362,7 +415,9 @@ def attendance_list(request):
         companies = Company.objects.all()
     
     context = {
-        'attendance_records': attendance_records[:100],  # Limit for performance
+        'attendance_records': page.rows,
+        'total_records': attendance_records.count(),
+        **page_urls(request.GET, page),
         'employees': employees,
         'companies': companies,
         'start_date': start_date,
@@ -375,32 +430,17 @@ def attendance_list(request):
     return render(request, 'attendance/attendance_list.html', context)
 
 
-@login_required
-@admin_required
-def reports(request):
-    """Generate attendance reports with salary calculations - Admin only"""
-    # Get filter parameters and enforce 3-month restriction
-    from_date_raw = request.GET.get('from_date', '')
-    to_date_raw = request.GET.get('to_date', '')
-    from_date, to_date = validate_date_range(from_date_raw, to_date_raw)
-    
-    company_id = request.GET.get('company', '')
-    employee_id = request.GET.get('employee', '')
-    
-    # Get min allowed date for template
-    min_allowed_date = get_min_allowed_date().strftime('%Y-%m-%d')
-    
+def build_report(user, from_date, to_date, company_id='', employee_id='', after='', before=''):
+    """One page of detail rows and the totals of the whole range for the reports view"""
     # Base queryset
-    attendance_records = Attendance.objects.select_related(
-        'employee', 'employee__company', 'marked_by'
-    ).filter(
+    attendance_records = Attendance.objects.filter(
         date__gte=from_date,
         date__lte=to_date
-    ).order_by('employee', 'date')
+    )
     
     # Filter by admin's assigned companies
-    if request.user.role == 'ADMIN' and request.user.assigned_companies.exists():
-        admin_companies = request.user.assigned_companies.all()
+    if user.role == 'ADMIN' and user.assigned_companies.exists():
+        admin_companies = user.assigned_companies.all()
         attendance_records = attendance_records.filter(employee__company__in=admin_companies)
     
     # Apply filters
@@ -409,33 +449,105 @@ def reports(request):
     if employee_id:
         attendance_records = attendance_records.filter(employee_id=employee_id)
     
-    # Calculate detailed report data
-    report_data = []
-    total_salary = Decimal('0.00')
-    total_ot = Decimal('0.00')
-    total_grand = Decimal('0.00')
+    # The page is found by seeking through the keyset index, so its cost does not grow with depth
+    page = keyset_page(attendance_records, report_rows, after=after, before=before)
     
-    for record in attendance_records:
-        day_salary = record.day_salary
-        ot_amount = record.ot_amount
-        total_amount = record.total_amount
-        
-        report_data.append({
-            'record': record,
-            'day_salary': day_salary,
-            'ot_amount': ot_amount,
-            'total_amount': total_amount,
-        })
-        
-        total_salary += day_salary
-        total_ot += ot_amount
-        total_grand += total_amount
+    # Totals are aggregated separately over the whole range
+    period = None if employee_id else closed_period_for(from_date, to_date)
+    if period:
+        # Closed period - totals are frozen in the company snapshots
+        if user.role == 'ADMIN' and user.assigned_companies.exists():
+            totals = period_company_totals(period, user.assigned_companies.all(), company_id)
+        else:
+            totals = period_company_totals(period, company_id=company_id)
+        present_count = totals['present_count']
+        half_day_count = totals['half_day_count']
+        absent_count = totals['absent_count']
+        ot_count = totals['ot_count']
+        total_salary = totals['salary_amount']
+        total_ot = totals['ot_amount']
+        total_grand = totals['total_amount']
+    elif employee_id:
+        # At most a few months of one employee - priced by the vectorized payroll engine
+        totals = PayrollFrame.load(attendance_records).totals()
+        present_count = totals['present_count']
+        half_day_count = totals['half_day_count']
+        absent_count = totals['absent_count']
+        ot_count = totals['ot_count']
+        total_salary = totals['salary_amount']
+        total_ot = totals['ot_amount']
+        total_grand = totals['total_amount']
+    else:
+        # Company-level totals come from the daily rollup in O(days)
+        summaries = DailyAttendanceSummary.objects.filter(date__gte=from_date, date__lte=to_date)
+        if user.role == 'ADMIN' and user.assigned_companies.exists():
+            summaries = summaries.filter(company__in=user.assigned_companies.all())
+        if company_id:
+            summaries = summaries.filter(company_id=company_id)
+        totals = summary_totals(summaries)
+        present_count = totals['present_count']
+        half_day_count = totals['half_day_count']
+        absent_count = totals['absent_count']
+        ot_count = totals['ot_count']
+        total_salary = totals['salary_amount']
+        total_ot = totals['ot_amount']
+        total_grand = totals['total_amount']
     
-    # Calculate summary statistics
-    present_count = attendance_records.filter(status='PRESENT').count()
-    half_day_count = attendance_records.filter(status='HALF_DAY').count()
-    absent_count = attendance_records.filter(status='ABSENT').count()
-    ot_count = attendance_records.filter(has_ot=True).count()
+    return {
+        'report_data': page.rows,
+        'next_cursor': page.next_cursor,
+        'prev_cursor': page.prev_cursor,
+        'total_salary': total_salary,
+        'total_ot': total_ot,
+        'total_grand': total_grand,
+        'present_count': present_count,
+        'half_day_count': half_day_count,
+        'absent_count': absent_count,
+        'ot_count': ot_count,
+        'total_records': totals['total_count'],
+        'closed_period': period,
+    }
+
+
+def reports_etag(request):
+    """ETag of the reports page - unchanged while its company-months and filters are"""
+    from_date, to_date = validate_date_range(request.GET.get('from_date', ''), request.GET.get('to_date', ''))
+    return report_cache.page_etag(
+        'reports', request, {**request.GET.dict(), 'today': date.today()}, from_date, to_date
+    )
+
+
+@login_required
+@admin_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=reports_etag)
+def reports(request):
+    """Generate attendance reports with salary calculations - Admin only"""
+    # Get filter parameters and enforce 3-month restriction
+    from_date_raw = request.GET.get('from_date', '')
+    to_date_raw = request.GET.get('to_date', '')
+    from_date, to_date = validate_date_range(from_date_raw, to_date_raw)
+    
+    company_id = request.GET.get('company', '')
+    employee_id = request.GET.get('employee', '')
+    
+    # Get min allowed date for template
+    min_allowed_date = get_min_allowed_date().strftime('%Y-%m-%d')
+    
+    # Reuse the result of an identical earlier request while its company-months are unchanged
+    after = request.GET.get('after', '')
+    before = request.GET.get('before', '')
+    cache_key = report_cache.result_key(
+        'reports', request.user,
+        {'company': company_id, 'employee': employee_id, 'after': after, 'before': before},
+        from_date, to_date
+    )
+    result = report_cache.get_result('reports', cache_key)
+    cache_status = 'HIT' if result is not None else 'MISS'
+    if result is None:
+        result = build_report(request.user, from_date, to_date, company_id, employee_id, after, before)
+        report_cache.set_result(cache_key, result)
+    page = KeysetPage(result['report_data'], result['next_cursor'], result['prev_cursor'])
     
     # Get data for filters - respect admin company mapping
     if request.user.role == 'ADMIN' and request.user.assigned_companies.exists():
@@ -447,15 +559,8 @@ def reports(request):
         employees = Employee.objects.filter(is_active=True)
     
     context = {
-        'report_data': report_data,
-        'total_salary': total_salary,
-        'total_ot': total_ot,
-        'total_grand': total_grand,
-        'present_count': present_count,
-        'half_day_count': half_day_count,
-        'absent_count': absent_count,
-        'ot_count': ot_count,
-        'total_records': len(report_data),
+        **result,
+        **page_urls(request.GET, page),
         'companies': companies,
         'employees': employees,
         'from_date': from_date,
@@ -464,7 +569,11 @@ def reports(request):
         'selected_company': company_id,
         'selected_employee': employee_id,
     }
-    return render(request, 'attendance/reports.html', context)
+    response = streamed_response(
+        request, 'attendance/reports.html', 'attendance/report_rows.html', context, result['report_data']
+    )
+    response['X-Report-Cache'] = cache_status
+    return response
 
 
 @login_required
@@ -479,126 +588,176 @@ def export_report_csv(request):
     company_id = request.GET.get('company', '')
     employee_id = request.GET.get('employee', '')
     
-    # Base queryset
-    attendance_records = Attendance.objects.select_related(
-        'employee', 'employee__company', 'marked_by'
-    ).filter(
-        date__gte=from_date,
-        date__lte=to_date
-    ).order_by('employee', 'date')
+    # Respect admin company mapping
+    admin_companies = None
+    if request.user.role == 'ADMIN' and request.user.assigned_companies.exists():
+        admin_companies = request.user.assigned_companies.all()
     
-    if company_id:
-        attendance_records = attendance_records.filter(employee__company_id=company_id)
-    if employee_id:
-        attendance_records = attendance_records.filter(employee_id=employee_id)
+    # Columns are picked by the exporter, rows are streamed
+    attendance_records = report_queryset(from_date, to_date, company_id, employee_id, companies=admin_companies)
     
-    # Create CSV response
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="attendance_report_{from_date}_to_{to_date}.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow([
-        'Date', 'Employee Code', 'Employee Name', 'Company', 
-        'Status', 'OT', 'OT Hours', 'Day Rate', 'Day Salary', 
-        'OT Rate', 'OT Amount', 'Total Amount', 'Marked By'
-    ])
-    
-    total_salary = Decimal('0.00')
-    total_ot = Decimal('0.00')
-    total_grand = Decimal('0.00')
-    
-    for record in attendance_records:
-        day_salary = record.day_salary
-        ot_amount = record.ot_amount
-        total_amount = record.total_amount
-        
-        total_salary += day_salary
-        total_ot += ot_amount
-        total_grand += total_amount
-        
-        writer.writerow([
-            record.date,
-            record.employee.employee_code,
-            record.employee.get_full_name(),
-            record.employee.company.name,
-            record.get_status_display(),
-            'Yes' if record.has_ot else 'No',
-            record.ot_hours if record.has_ot else '',
-            record.employee.salary_per_day,
-            day_salary,
-            record.employee.ot_per_hour,
-            ot_amount,
-            total_amount,
-            record.marked_by.get_full_name() if record.marked_by else ''
-        ])
-    
-    # Add totals row
-    writer.writerow([])
-    writer.writerow(['', '', '', '', '', '', '', 'TOTALS:', total_salary, '', total_ot, total_grand, ''])
+    # mode=copy lets PostgreSQL build the whole file with COPY ... TO STDOUT;
+    # other databases fall back to the row-by-row Python writer
+    content = report_content(attendance_records, request.GET.get('mode', ''))
     
-    return response
+    # Stream the CSV so memory stays flat and the first bytes go out immediately
+    return export_response(
+        content,
+        f'attendance_report_{from_date}_to_{to_date}.csv',
+        compress=request.GET.get('compress', '')
+    )
 
 
 @login_required
-@admin_required  
-def employee_wise_report(request):
-    """Employee-wise summary report"""
+@admin_required
+def export_report_pdf(request):
+    """Export attendance report to PDF, rendered page by page from a streamed queryset"""
     # Enforce 3-month restriction
     from_date_raw = request.GET.get('from_date', '')
     to_date_raw = request.GET.get('to_date', '')
     from_date, to_date = validate_date_range(from_date_raw, to_date_raw)
     
     company_id = request.GET.get('company', '')
-    min_allowed_date = get_min_allowed_date().strftime('%Y-%m-%d')
-    
-    # Get employees - respect admin company mapping
-    employees = Employee.objects.filter(is_active=True).select_related('company')
+    employee_id = request.GET.get('employee', '')
     
-    # Filter by admin's assigned companies
+    # Respect admin company mapping
+    companies = Company.objects.all()
+    admin_companies = None
     if request.user.role == 'ADMIN' and request.user.assigned_companies.exists():
-        admin_companies = request.user.assigned_companies.all()
-        employees = employees.filter(company__in=admin_companies)
+        admin_companies = companies = request.user.assigned_companies.all()
+    
+    attendance_records = report_queryset(from_date, to_date, company_id, employee_id, companies=admin_companies)
     
+    subtitle = f'{from_date} to {to_date}'
     if company_id:
-        employees = employees.filter(company_id=company_id)
+        company = companies.filter(pk=company_id).first()
+        if company:
+            subtitle = f'{company.name} | {subtitle}'
+    subtitle = f'{subtitle} | Generated {datetime.now():%d-%m-%Y %H:%M}'
+    
+    return pdf_response(
+        attendance_records,
+        f'attendance_report_{from_date}_to_{to_date}.pdf',
+        'Attendance Report',
+        subtitle
+    )
+
+
+def build_employee_summary(user, from_date, to_date, company_id='', period=None):
+    """Per employee rows and grand totals for the employee-wise report"""
+    admin_companies = None
+    if user.role == 'ADMIN' and user.assigned_companies.exists():
+        admin_companies = user.assigned_companies.all()
     
     # Build summary for each employee
     employee_summary = []
-    grand_total_salary = Decimal('0.00')
-    grand_total_ot = Decimal('0.00')
-    grand_total = Decimal('0.00')
-    
-    for emp in employees:
-        records = Attendance.objects.filter(
-            employee=emp,
-            date__gte=from_date,
-            date__lte=to_date
-        )
-        
-        present_days = records.filter(status='PRESENT').count()
-        absent_days = records.filter(status='ABSENT').count()
-        ot_days = records.filter(has_ot=True).count()
-        # Handle None values for ot_hours
-        total_ot_hours = sum([r.ot_hours or Decimal('0.00') for r in records.filter(has_ot=True)])
-        
-        total_salary = present_days * emp.salary_per_day
-        total_ot_amount = total_ot_hours * emp.ot_per_hour
-        total_amount = total_salary + total_ot_amount
+    
+    if period:
+        for snapshot in period_employee_snapshots(period, admin_companies, company_id):
+            employee_summary.append({
+                'name': snapshot.employee_name,
+                'code': snapshot.employee_code,
+                'company_name': snapshot.company_name,
+                'salary_per_day': snapshot.salary_per_day,
+                'ot_per_hour': snapshot.ot_per_hour,
+                'present_days': snapshot.present_days,
+                'half_days': snapshot.half_days,
+                'absent_days': snapshot.absent_days,
+                'ot_days': snapshot.ot_days,
+                'total_ot_hours': snapshot.ot_hours,
+                'total_salary': snapshot.salary_amount,
+                'total_ot_amount': snapshot.ot_amount,
+                'total_amount': snapshot.total_amount,
+            })
+    else:
+        # Get employees - respect admin company mapping
+        employees = Employee.objects.filter(is_active=True).select_related('company')
+        if admin_companies is not None:
+            employees = employees.filter(company__in=admin_companies)
+        if company_id:
+            employees = employees.filter(company_id=company_id)
         
-        employee_summary.append({
-            'employee': emp,
-            'present_days': present_days,
-            'absent_days': absent_days,
-            'ot_days': ot_days,
-            'total_ot_hours': total_ot_hours,
-            'total_salary': total_salary,
-            'total_ot_amount': total_ot_amount,
-            'total_amount': total_amount,
-        })
+        # Whole months come from the monthly rollup, only partial months hit raw attendance
+        period_totals = employee_period_totals(employees, from_date, to_date)
         
-        grand_total_salary += total_salary
-        grand_total_ot += total_ot_amount
-        grand_total += total_amount
+        for emp in employees:
+            totals = period_totals.get(emp.pk, {})
+            total_salary = totals.get('salary_amount', Decimal('0.00'))
+            total_ot_amount = totals.get('ot_amount', Decimal('0.00'))
+            
+            employee_summary.append({
+                'name': emp.get_full_name(),
+                'code': emp.employee_code,
+                'company_name': emp.company.name,
+                'salary_per_day': emp.salary_per_day,
+                'ot_per_hour': emp.ot_per_hour,
+                'present_days': totals.get('present_days', 0),
+                'half_days': totals.get('half_days', 0),
+                'absent_days': totals.get('absent_days', 0),
+                'ot_days': totals.get('ot_days', 0),
+                'total_ot_hours': totals.get('ot_hours', Decimal('0.00')),
+                'total_salary': total_salary,
+                'total_ot_amount': total_ot_amount,
+                'total_amount': total_salary + total_ot_amount,
+            })
+    
+    grand_total_salary = sum((item['total_salary'] for item in employee_summary), Decimal('0.00'))
+    grand_total_ot = sum((item['total_ot_amount'] for item in employee_summary), Decimal('0.00'))
+    grand_total = grand_total_salary + grand_total_ot
+    
+    return {
+        'employee_summary': employee_summary,
+        'grand_total_salary': grand_total_salary,
+        'grand_total_ot': grand_total_ot,
+        'grand_total': grand_total,
+    }
+
+
+def employee_wise_report_etag(request):
+    """ETag of the employee-wise report, over the closed period when one is selected"""
+    period_id = request.GET.get('period', '')
+    if period_id:
+        period = get_object_or_404(PayrollPeriod, pk=period_id)
+        from_date, to_date = period.from_date, period.to_date
+    else:
+        from_date, to_date = validate_date_range(request.GET.get('from_date', ''), request.GET.get('to_date', ''))
+    return report_cache.page_etag(
+        'employee_wise_report', request, {**request.GET.dict(), 'today': date.today()}, from_date, to_date
+    )
+
+
+@login_required
+@admin_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=employee_wise_report_etag)
+def employee_wise_report(request):
+    """Employee-wise summary report"""
+    company_id = request.GET.get('company', '')
+    min_allowed_date = get_min_allowed_date().strftime('%Y-%m-%d')
+    
+    # Closed payroll periods are served from their frozen snapshots, so they
+    # stay available after they fall outside the 3-month window
+    period_id = request.GET.get('period', '')
+    if period_id:
+        period = get_object_or_404(PayrollPeriod, pk=period_id)
+        from_date = period.from_date.strftime('%Y-%m-%d')
+        to_date = period.to_date.strftime('%Y-%m-%d')
+    else:
+        # Enforce 3-month restriction
+        from_date_raw = request.GET.get('from_date', '')
+        to_date_raw = request.GET.get('to_date', '')
+        from_date, to_date = validate_date_range(from_date_raw, to_date_raw)
+        period = closed_period_for(from_date, to_date)
+    
+    cache_key = report_cache.result_key(
+        'employee_wise_report', request.user,
+        {'company': company_id, 'period': period.pk if period else ''}, from_date, to_date
+    )
+    result = report_cache.get_result('employee_wise_report', cache_key)
+    cache_status = 'HIT' if result is not None else 'MISS'
+    if result is None:
+        result = build_employee_summary(request.user, from_date, to_date, company_id, period)
+        report_cache.set_result(cache_key, result)
     
     # Get companies for filter dropdown - respect admin company mapping
     if request.user.role == 'ADMIN' and request.user.assigned_companies.exists():
@@ -607,20 +766,373 @@ def employee_wise_report(request):
         companies = Company.objects.all()
     
     context = {
-        'employee_summary': employee_summary,
-        'grand_total_salary': grand_total_salary,
-        'grand_total_ot': grand_total_ot,
-        'grand_total': grand_total,
+        **result,
         'companies': companies,
         'from_date': from_date,
         'to_date': to_date,
         'min_allowed_date': min_allowed_date,
         'selected_company': company_id,
+        'closed_period': period,
+    }
+    response = streamed_response(
+        request, 'attendance/employee_wise_report.html', 'attendance/employee_wise_rows.html',
+        context, result['employee_summary']
+    )
+    response['X-Report-Cache'] = cache_status
+    return response
+
+
+def get_report_month(month_str):
+    """First day of a YYYY-MM month, kept within the 3-month window (default: this month)"""
+    today = date.today()
+    try:
+        month = datetime.strptime(month_str, '%Y-%m').date()
+    except ValueError:
+        month = today
+    return min(max(month, get_min_allowed_date()), today).replace(day=1)
+
+
+def get_muster_company(request):
+    """Company of the muster roll and the companies to pick from - respects admin company mapping"""
+    if request.user.role == 'ADMIN' and request.user.assigned_companies.exists():
+        companies = request.user.assigned_companies.all()
+    else:
+        companies = Company.objects.all()
+    company_id = request.GET.get('company', '')
+    if company_id:
+        return get_object_or_404(companies, pk=company_id), companies
+    return companies.order_by('name').first(), companies
+
+
+def muster_roll_etag(request):
+    """ETag of the muster roll - unchanged while the company-month and filters are"""
+    first, last = month_range(get_report_month(request.GET.get('month', '')))
+    return report_cache.page_etag(
+        'muster_roll', request, {**request.GET.dict(), 'today': date.today()}, first, last
+    )
+
+
+@login_required
+@admin_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=muster_roll_etag)
+def muster_roll(request):
+    """Monthly muster roll - employees by days of the month"""
+    month = get_report_month(request.GET.get('month', ''))
+    company, companies = get_muster_company(request)
+    first, last = month_range(month)
+    
+    context = {
+        'company': company,
+        'companies': companies,
+        'month': month,
+        'min_month': get_min_allowed_date().strftime('%Y-%m'),
+        'max_month': date.today().strftime('%Y-%m'),
+        'day_numbers': range(1, last.day + 1),
+        'totals': muster_totals(company.pk, month) if company else None,
+    }
+    # Employees are pivoted one at a time while the rows stream out
+    rows = muster_rows(company.pk, month) if company else []
+    return streamed_response(
+        request, 'attendance/muster_roll.html', 'attendance/muster_rows.html', context, rows
+    )
+
+
+@login_required
+@admin_required
+def export_muster_csv(request):
+    """Export the monthly muster roll of a company to CSV"""
+    month = get_report_month(request.GET.get('month', ''))
+    company, companies = get_muster_company(request)
+    if company is None:
+        raise Http404('No company to export')
+    
+    filename = f'muster_roll_{slugify(company.name) or company.pk}_{month:%Y-%m}.csv'
+    return export_response(
+        stream_csv(iter_muster_csv_rows(company.pk, month)),
+        filename,
+        compress=request.GET.get('compress', '')
+    )
+
+
+def get_comparison_params(request):
+    """Group by, company and the (current, previous) periods of the comparison report"""
+    # The previous month has to start inside the reporting window too
+    earliest = (get_min_allowed_date() + relativedelta(months=1)).replace(day=1)
+    month = max(get_report_month(request.GET.get('month', '')), earliest)
+    group_by = request.GET.get('group_by', '')
+    if group_by not in ('company', 'employee'):
+        group_by = 'company'
+    current, previous = comparison_periods(month, date.today())
+    return month, group_by, request.GET.get('company', ''), current, previous
+
+
+def comparison_report_etag(request):
+    """ETag of the comparison report - unchanged while both periods are"""
+    month, group_by, company_id, current, previous = get_comparison_params(request)
+    return report_cache.page_etag(
+        'comparison_report', request, {**request.GET.dict(), 'today': date.today()}, previous[0], current[1]
+    )
+
+
+@login_required
+@admin_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=comparison_report_etag)
+def comparison_report(request):
+    """This month against last month per company or employee - Admin only"""
+    month, group_by, company_id, current, previous = get_comparison_params(request)
+    
+    attendance_records = Attendance.objects.all()
+    if request.user.role == 'ADMIN' and request.user.assigned_companies.exists():
+        companies = request.user.assigned_companies.all()
+        attendance_records = attendance_records.filter(employee__company__in=companies)
+    else:
+        companies = Company.objects.all()
+    if company_id:
+        attendance_records = attendance_records.filter(employee__company_id=company_id)
+    
+    # Both periods come from one grouped query
+    rows, totals = period_comparison(attendance_records, current, previous, group_by)
+    
+    context = {
+        'rows': rows,
+        'totals': totals,
+        'companies': companies,
+        'month': month,
+        'min_month': (get_min_allowed_date() + relativedelta(months=1)).strftime('%Y-%m'),
+        'max_month': date.today().strftime('%Y-%m'),
+        'current': current,
+        'previous': previous,
+        'group_by': group_by,
+        'selected_company': company_id,
+    }
+    return streamed_response(
+        request, 'attendance/comparison_report.html', 'attendance/comparison_rows.html', context, rows
+    )
+
+
+def get_anomaly_range():
+    """Date range of the OT anomaly report - the last ANOMALY_DAYS days inside the 3-month window"""
+    today = date.today()
+    return max(today - timedelta(days=ANOMALY_DAYS), get_min_allowed_date()), today
+
+
+def ot_anomaly_report_etag(request):
+    """ETag of the OT anomaly report - unchanged while the covered company-months are"""
+    from_date, to_date = get_anomaly_range()
+    return report_cache.page_etag(
+        'ot_anomaly_report', request, {**request.GET.dict(), 'today': to_date}, from_date, to_date
+    )
+
+
+@login_required
+@admin_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=ot_anomaly_report_etag)
+def ot_anomaly_report(request):
+    """Employees whose OT is far above their own or their company's usual - Admin only"""
+    from_date, to_date = get_anomaly_range()
+    company_id = request.GET.get('company', '')
+    sort = request.GET.get('sort', '')
+    if sort not in ANOMALY_SORT_FIELDS:
+        sort = 'cost'
+    
+    attendance_records = Attendance.objects.all()
+    if request.user.role == 'ADMIN' and request.user.assigned_companies.exists():
+        companies = request.user.assigned_companies.all()
+        attendance_records = attendance_records.filter(employee__company__in=companies)
+    else:
+        companies = Company.objects.all()
+    if company_id:
+        attendance_records = attendance_records.filter(employee__company_id=company_id)
+    
+    # Baselines come from window functions in one scan of the range
+    rows = ot_anomalies(attendance_records, from_date, to_date, sort)
+    
+    context = {
+        'rows': rows,
+        'anomaly_days': sum(row['anomaly_days'] for row in rows),
+        'excess_hours': sum(row['excess_hours'] for row in rows),
+        'excess_cost': sum(row['excess_cost'] for row in rows),
+        'companies': companies,
+        'from_date': from_date,
+        'to_date': to_date,
+        'selected_company': company_id,
+        'sort': sort,
+        'rolling_days': ROLLING_DAYS,
+        'ot_factor': OT_FACTOR,
+        'min_excess_hours': MIN_EXCESS_HOURS,
+    }
+    return streamed_response(
+        request, 'attendance/ot_anomalies.html', 'attendance/ot_anomaly_rows.html', context, rows
+    )
+
+
+def payroll_projection_etag(request):
+    """ETag of the payroll projection - unchanged while the run-rate window and month are"""
+    today = date.today()
+    return report_cache.page_etag(
+        'payroll_projection', request, {'today': today}, today - timedelta(days=RUN_RATE_DAYS), today
+    )
+
+
+@login_required
+@admin_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=payroll_projection_etag)
+def payroll_projection_report(request):
+    """Projected month-end labour cost per company - Admin only"""
+    today = date.today()
+    if request.user.role == 'ADMIN' and request.user.assigned_companies.exists():
+        companies = request.user.assigned_companies.all()
+    else:
+        companies = Company.objects.all()
+    
+    # Served from the daily rollup, cached per company until its next attendance write
+    projections = payroll_projection(companies, today)
+    
+    context = {
+        'projections': projections,
+        'totals': {
+            name: sum(row[name] for row in projections)
+            for name in ('mtd_salary', 'mtd_ot', 'mtd_total', 'run_rate', 'projected', 'low', 'high')
+        },
+        'today': today,
+        'month_end': month_range(today)[1],
+        'run_rate_days': RUN_RATE_DAYS,
+    }
+    return render(request, 'attendance/payroll_projection.html', context)
+
+
+def supervisor_activity_etag(request):
+    """ETag of the supervisor activity report - unchanged while its company-months and filters are"""
+    from_date, to_date = validate_date_range(request.GET.get('from_date', ''), request.GET.get('to_date', ''))
+    return report_cache.page_etag(
+        'supervisor_activity', request, {**request.GET.dict(), 'today': date.today()}, from_date, to_date
+    )
+
+
+@login_required
+@admin_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=supervisor_activity_etag)
+def supervisor_activity_report(request):
+    """Records marked, marking time, late marking and edits per supervisor - Admin only"""
+    from_date, to_date = validate_date_range(request.GET.get('from_date', ''), request.GET.get('to_date', ''))
+    company_id = request.GET.get('company', '')
+    sort = request.GET.get('sort', '')
+    if sort not in ACTIVITY_SORT_FIELDS:
+        sort = 'name'
+    
+    attendance_records = Attendance.objects.filter(date__gte=from_date, date__lte=to_date)
+    if request.user.role == 'ADMIN' and request.user.assigned_companies.exists():
+        companies = request.user.assigned_companies.all()
+        attendance_records = attendance_records.filter(employee__company__in=companies)
+    else:
+        companies = Company.objects.all()
+    if company_id:
+        attendance_records = attendance_records.filter(employee__company_id=company_id)
+    
+    # One grouped query over the period; the median needs a second read off PostgreSQL
+    rows = supervisor_activity(attendance_records, sort)
+    records = sum(row['records'] for row in rows)
+    
+    context = {
+        'rows': rows,
+        'records': records,
+        'late_rate': sum(row['late_count'] for row in rows) * 100 / records if records else None,
+        'edit_rate': sum(row['edited_count'] for row in rows) * 100 / records if records else None,
+        'companies': companies,
+        'from_date': from_date,
+        'to_date': to_date,
+        'min_allowed_date': get_min_allowed_date().strftime('%Y-%m-%d'),
+        'selected_company': company_id,
+        'sort': sort,
+        'late_marking_time': LATE_MARKING_TIME,
+    }
+    return streamed_response(
+        request, 'attendance/supervisor_activity.html', 'attendance/supervisor_activity_rows.html', context, rows
+    )
+
+
+def attendance_trends_etag(request):
+    """ETag of the trend data - unchanged while the covered company-months are"""
+    from_date, to_date = trend_range(date.today())
+    return report_cache.page_etag(
+        'attendance_trends', request, {**request.GET.dict(), 'today': to_date}, from_date, to_date
+    )
+
+
+@login_required
+@admin_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=attendance_trends_etag)
+def attendance_trends_data(request):
+    """JSON trend series (attendance rate, headcount present, OT cost) per company - Admin only"""
+    company_id = request.GET.get('company', '')
+    bucket = request.GET.get('bucket', '')
+    if bucket not in TREND_BUCKETS:
+        bucket = 'day'
+    
+    if request.user.role == 'ADMIN' and request.user.assigned_companies.exists():
+        companies = request.user.assigned_companies.all()
+    else:
+        companies = Company.objects.all()
+    if company_id:
+        companies = companies.filter(pk=company_id)
+    
+    return JsonResponse(attendance_trends(companies, date.today(), bucket))
+
+
+def get_completeness_range():
+    """Date range of the completeness heatmap - the last COMPLETENESS_DAYS days inside the 3-month window"""
+    today = date.today()
+    return max(today - timedelta(days=COMPLETENESS_DAYS - 1), get_min_allowed_date()), today
+
+
+def completeness_heatmap_etag(request):
+    """ETag of the completeness heatmap - unchanged while its company-months and rosters are"""
+    from_date, to_date = get_completeness_range()
+    return report_cache.page_etag(
+        'completeness_heatmap', request, {**request.GET.dict(), 'today': to_date}, from_date, to_date
+    )
+
+
+@login_required
+@admin_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=completeness_heatmap_etag)
+def completeness_heatmap(request):
+    """Share of active employees marked per company and day - Admin only"""
+    from_date, to_date = get_completeness_range()
+    sort = request.GET.get('sort', '')
+    if sort not in COMPLETENESS_SORT_FIELDS:
+        sort = 'name'
+    
+    if request.user.role == 'ADMIN' and request.user.assigned_companies.exists():
+        companies = request.user.assigned_companies.all()
+    else:
+        companies = Company.objects.all()
+    
+    # Two queries for the whole grid: the daily rollup and the active headcounts
+    rows, dates = completeness_grid(companies, from_date, to_date, sort)
+    
+    context = {
+        'rows': rows,
+        'dates': dates,
+        'from_date': from_date,
+        'to_date': to_date,
+        'sort': sort,
+        'nearly_complete': NEARLY_COMPLETE * 100,
     }
-    return render(request, 'attendance/employee_wise_report.html', context)
+    return streamed_response(
+        request, 'attendance/completeness_heatmap.html', 'attendance/completeness_rows.html', context, rows
+    )
 
 
 @login_required
+@transaction.atomic
 def edit_attendance(request, pk):
     """Edit attendance record - Super Admin only"""
     # Only Super Admin can edit attendance
@@ -630,6 +1142,12 @@ def edit_attendance(request, pk):
     
     attendance = get_object_or_404(Attendance, pk=pk)
     
+    # Locked lookup - a period cannot be closed over the record before this request commits
+    period = PayrollPeriod.covering(attendance.date, lock=True)
+    if period:
+        messages.error(request, f'Payroll period {period} is closed. Its attendance records cannot be edited.')
+        return redirect('attendance:attendance_list')
+    
     if request.method == 'POST':
         # Get form data
         status = request.POST.get('status')
@@ -659,6 +1177,7 @@ def edit_attendance(request, pk):
 
 
 @login_required
+@transaction.atomic
 def delete_attendance(request, pk):
     """Delete attendance record - Super Admin only"""
     # Only Super Admin can delete attendance
@@ -667,9 +1186,151 @@ def delete_attendance(request, pk):
         return redirect('attendance:attendance_list')
     
     attendance = get_object_or_404(Attendance, pk=pk)
+    
+    # Locked lookup - a period cannot be closed over the record before this request commits
+    period = PayrollPeriod.covering(attendance.date, lock=True)
+    if period:
+        messages.error(request, f'Payroll period {period} is closed. Its attendance records cannot be deleted.')
+        return redirect('attendance:attendance_list')
+    
     employee_name = attendance.employee.get_full_name()
     attendance_date = attendance.date
     
     attendance.delete()
     messages.success(request, f'Attendance record for {employee_name} on {attendance_date} has been deleted.')
     return redirect('attendance:attendance_list')
+
+
+@login_required
+@admin_required
+def payroll_periods(request):
+    """List closed payroll periods and close a new one - closing is Super Admin only"""
+    if request.method == 'POST':
+        if not request.user.is_superadmin():
+            messages.error(request, "Only Super Admin can close payroll periods.")
+            return redirect('attendance:payroll_periods')
+        
+        try:
+            from_date = datetime.strptime(request.POST.get('from_date', ''), '%Y-%m-%d').date()
+            to_date = datetime.strptime(request.POST.get('to_date', ''), '%Y-%m-%d').date()
+        except ValueError:
+            messages.error(request, 'Please enter a valid date range.')
+            return redirect('attendance:payroll_periods')
+        
+        if to_date >= date.today():
+            messages.error(request, 'Only past dates can be closed.')
+            return redirect('attendance:payroll_periods')
+        
+        try:
+            period = close_period(from_date, to_date, request.user, request.POST.get('remarks', ''))
+        except PeriodError as e:
+            messages.error(request, str(e))
+            return redirect('attendance:payroll_periods')
+        
+        messages.success(request, f'Payroll period {period} closed. Its attendance is now locked.')
+        return redirect('attendance:payroll_periods')
+    
+    periods = PayrollPeriod.objects.select_related('closed_by').annotate(
+        employee_count=Count('employee_snapshots')
+    )
+    
+    # Suggest the previous month as the next period to close
+    last_month_end = date.today().replace(day=1) - timedelta(days=1)
+    
+    context = {
+        'periods': periods,
+        'suggested_from': last_month_end.replace(day=1).strftime('%Y-%m-%d'),
+        'suggested_to': last_month_end.strftime('%Y-%m-%d'),
+    }
+    return render(request, 'attendance/payroll_periods.html', context)
+
+
+@login_required
+@admin_required
+def report_job_create(request):
+    """Queue the reports filters as a background CSV export"""
+    if request.method != 'POST':
+        return redirect('attendance:report_jobs')
+    
+    from_date, to_date = validate_date_range(request.POST.get('from_date', ''), request.POST.get('to_date', ''))
+    job, created = submit_report_job(
+        request.user, from_date, to_date,
+        company_id=request.POST.get('company', ''),
+        employee_id=request.POST.get('employee', ''),
+        mode=request.POST.get('mode', ''),
+        compress=request.POST.get('compress', ''),
+    )
+    if created:
+        messages.success(request, f'Report job #{job.pk} queued. This page updates when the file is ready.')
+    else:
+        messages.info(request, f'The same report is already {job.get_status_display().lower()} as job #{job.pk}.')
+    return redirect('attendance:report_job_detail', pk=job.pk)
+
+
+@login_required
+@admin_required
+def company_bundle_job_create(request):
+    """Queue an export of every company over the reports date range into one ZIP"""
+    if request.method != 'POST':
+        return redirect('attendance:report_jobs')
+    
+    from_date, to_date = validate_date_range(request.POST.get('from_date', ''), request.POST.get('to_date', ''))
+    job, created = submit_company_bundle_job(request.user, from_date, to_date)
+    if created:
+        messages.success(request, f'Export of all companies queued as job #{job.pk}. This page updates when the ZIP is ready.')
+    else:
+        messages.info(request, f'The same export is already {job.get_status_display().lower()} as job #{job.pk}.')
+    return redirect('attendance:report_job_detail', pk=job.pk)
+
+
+def _get_report_job(request, pk):
+    job = get_object_or_404(ReportJob.objects.select_related('requested_by'), pk=pk)
+    if not can_access_job(request.user, job):
+        raise Http404
+    return job
+
+
+@login_required
+@admin_required
+def report_jobs(request):
+    """Recent background report jobs of the user"""
+    jobs = ReportJob.objects.select_related('requested_by')
+    if not request.user.is_superadmin():
+        jobs = jobs.filter(requested_by=request.user)
+    return render(request, 'attendance/report_jobs.html', {'jobs': jobs[:50]})
+
+
+@login_required
+@admin_required
+def report_job_detail(request, pk):
+    """Progress page of a report job - polls report_job_status until the file is ready"""
+    job = _get_report_job(request, pk)
+    return render(request, 'attendance/report_job_detail.html', {'job': job})
+
+
+@login_required
+@admin_required
+def report_job_status(request, pk):
+    """JSON progress of a report job"""
+    job = _get_report_job(request, pk)
+    return JsonResponse({
+        'id': job.pk,
+        'status': job.status,
+        'status_display': job.get_status_display(),
+        'progress': job.progress,
+        'rows_done': job.rows_done,
+        'total_rows': job.total_rows,
+        'error': job.error,
+        'download_url': reverse('attendance:report_job_download', args=[job.pk]) if job.status == 'DONE' else '',
+    })
+
+
+@login_required
+@admin_required
+def report_job_download(request, pk):
+    """Download the file of a finished report job"""
+    job = _get_report_job(request, pk)
+    if job.status != 'DONE' or not job.file:
+        messages.error(request, 'This report is not ready yet.')
+        return redirect('attendance:report_job_detail', pk=job.pk)
+    return skip_gzip(FileResponse(job.file.open('rb'), as_attachment=True, filename=job.filename))
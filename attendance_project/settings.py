@@ -173,6 +173,15 @@ CACHES = {
         'OPTIONS': {
             'MAX_ENTRIES': 1000
         }
+    },
+    # Report versions, results and stats - shared by the web, worker and command
+    # processes (the table is created by a migration; Redis or Memcached work too)
+    'reports': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'report_cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 20000
+        }
     }
 }
 
@@ -1,4 +1,7 @@
-from django.contrib import admin
+from dateutil.relativedelta import relativedelta
+from django.contrib import admin, messages
+from django.utils import timezone
+from attendance.jobs import submit_salary_slip_job
 from .models import Company
 
 
@@ -8,8 +11,24 @@ class CompanyAdmin(admin.ModelAdmin):
     list_filter = ['created_at']
     search_fields = ['name', 'email', 'contact_number']
     readonly_fields = ['created_at', 'updated_at', 'created_by']
+    actions = ['generate_salary_slips']
     
     def save_model(self, request, obj, form, change):
         if not change:  # If creating new object
             obj.created_by = request.user
         super().save_model(request, obj, form, change)
+    
+    @admin.action(description='Generate salary slips for last month')
+    def generate_salary_slips(self, request, queryset):
+        """Queue one salary slip job per company for the report worker"""
+        month = timezone.localdate().replace(day=1) - relativedelta(months=1)
+        queued = 0
+        for company in queryset:
+            _, created = submit_salary_slip_job(request.user, month, company.pk)
+            queued += created
+        self.message_user(
+            request,
+            f'Queued salary slips for {month:%B %Y} in {queued} companies. '
+            f'Archives appear under Report Jobs once the report worker has run.',
+            messages.SUCCESS
+        )
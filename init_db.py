@@ -28,6 +28,8 @@ def init_database():
     print("\n[1/3] Running database migrations...")
     call_command('makemigrations')
     call_command('migrate')
+    call_command('rebuild_daily_summary')
+    call_command('build_monthly_summary', '--all')
     print("✓ Migrations completed successfully")
     
     # Create superuser if not exists